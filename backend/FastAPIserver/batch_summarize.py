@@ -0,0 +1,82 @@
+"""تلخيص دفعة مباريات (مثلاً بعد جولة كاملة) بنماذج محملة مرة واحدة.
+
+    python batch_summarize.py ../DownloadedMatches
+    python batch_summarize.py matches.txt --whisper-model small --report batch_report.json
+
+المدخل مجلد فيديوهات، أو ملف نصي (مسار في كل سطر)، أو JSON: قائمة مسارات أو {"video": ..., "output": ...}.
+"""
+import os
+import sys
+import json
+import glob
+import argparse
+from pipeline import PipelineScheduler, BatchScheduler
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+VIDEO_EXTENSIONS = (".mp4", ".mkv", ".mov", ".ts", ".webm")
+
+
+def collect_videos(source, output_dir):
+    """قائمة (فيديو، ملخص) من مجلد أو manifest."""
+    if os.path.isdir(source):
+        entries = sorted(p for p in glob.glob(os.path.join(source, "*")) if p.lower().endswith(VIDEO_EXTENSIONS))
+    elif source.endswith(".json"):
+        with open(source, "r", encoding="utf-8") as f:
+            entries = json.load(f)
+    else:
+        with open(source, "r", encoding="utf-8") as f:
+            entries = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+    items = []
+    for entry in entries:
+        video = entry["video"] if isinstance(entry, dict) else entry
+        output = entry.get("output") if isinstance(entry, dict) else None
+        items.append((os.path.abspath(video), output or os.path.join(output_dir, f"ملخص {os.path.basename(video)}")))
+    return items
+
+
+def main():
+    parser = argparse.ArgumentParser(description="تلخيص عدة مباريات مع مشاركة النماذج وتداخل المراحل")
+    parser.add_argument("source", help="مجلد فيديوهات أو ملف manifest (.txt / .json)")
+    parser.add_argument("--output-dir", default=os.path.abspath(os.path.join(BASE_DIR, "../summarises")))
+    parser.add_argument("--jobs-root", default=os.path.join(BASE_DIR, "jobs"))
+    parser.add_argument("--model", default=os.path.join(BASE_DIR, "models", "best.pt"))
+    parser.add_argument("--whisper-model", default=os.environ.get("WHISPER_MODEL_SIZE", "medium"))
+    parser.add_argument("--whisper-backend", default=os.environ.get("WHISPER_BACKEND", "openai"))
+    parser.add_argument("--whisper-scope", default=os.environ.get("WHISPER_SCOPE", "full"))
+    parser.add_argument("--whisper-language", default=os.environ.get("WHISPER_LANGUAGE", "ar"),
+                        help="لغة التعليق (auto: كشف تلقائي مرة واحدة لكل مباراة)")
+    parser.add_argument("--classifier-prefilter", action="store_true",
+                        default=os.environ.get("CLASSIFIER_PREFILTER", "0") == "1",
+                        help="تخطي المقاطع البعيدة لفظياً عن العبارات المرجعية قبل التصنيف")
+    parser.add_argument("--classifier-backend", choices=("torch", "onnx"),
+                        default=os.environ.get("CLASSIFIER_BACKEND", "torch"))
+    parser.add_argument("--sampling", default=os.environ.get("FRAME_SAMPLING", "fixed"))
+    parser.add_argument("--ball-roi", action="store_true", default=os.environ.get("BALL_ROI", "0") == "1",
+                        help="كشف الكرة المفقودة على قص حول موضعها المتوقع")
+    parser.add_argument("--final-workers", type=int, default=2, help="عدد المباريات التي تُقص وتُحزم بالتوازي")
+    parser.add_argument("--keep-workspace", action="store_true")
+    parser.add_argument("--report", default="batch_report.json")
+    args = parser.parse_args()
+
+    items = collect_videos(args.source, args.output_dir)
+    if not items:
+        print("❌ لا توجد فيديوهات في المدخل.")
+        sys.exit(1)
+    print(f"📋 {len(items)} مباراة في الدفعة")
+
+    scheduler = PipelineScheduler(args.model, whisper_model_size=args.whisper_model,
+                                  whisper_backend=args.whisper_backend, whisper_scope=args.whisper_scope,
+                                  whisper_language=None if args.whisper_language in ("", "auto") else args.whisper_language,
+                                  classifier_prefilter=args.classifier_prefilter,
+                                  classifier_backend=args.classifier_backend,
+                                  sampling=args.sampling, ball_roi=args.ball_roi)
+    batch = BatchScheduler(scheduler, args.jobs_root, keep_workspace=args.keep_workspace,
+                           final_workers=args.final_workers)
+    report = batch.run(items)
+    batch.save_report(args.report)
+    sys.exit(0 if report["failed"] == 0 else 1)
+
+
+if __name__ == "__main__":
+    main()
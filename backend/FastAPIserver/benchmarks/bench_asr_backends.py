@@ -0,0 +1,84 @@
+"""مقارنة محركات التفريغ على نفس الصوت: الزمن، الذاكرة القصوى، وتطابق أزمنة الكلمات.
+
+    python benchmarks/bench_asr_backends.py --video clip.mp4 --model small --backends openai faster
+
+كل محرك يعمل في عملية مستقلة حتى تكون قيمة RSS القصوى خاصة به.
+"""
+import os
+import re
+import sys
+import time
+import argparse
+import difflib
+import resource
+import multiprocessing
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from voice_analys.Whisper import load_audio_from_ffmpeg
+
+
+def _run_backend(name, model_size, samples, queue):
+    from voice_analys import WhisperTranscriber
+    t0 = time.time()
+    transcriber = WhisperTranscriber(model_size=model_size, backend=name)
+    load_seconds = time.time() - t0
+    t0 = time.time()
+    result = transcriber._transcribe(samples)
+    elapsed = time.time() - t0
+    words = WhisperTranscriber.words_from_result(result)
+    # ru_maxrss بالكيلوبايت على لينكس
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    queue.put({"name": name, "load": load_seconds, "elapsed": elapsed, "rss": peak_rss_mb, "words": words})
+
+
+def _normalize(word):
+    return re.sub(r"[^\w]", "", word.lower())
+
+
+def timestamp_agreement(reference, candidate, tolerance=0.2):
+    """محاذاة الكلمات نصياً ثم مقارنة أزمنة البداية للكلمات المتطابقة."""
+    ref_tokens = [_normalize(w["word"]) for w in reference]
+    cand_tokens = [_normalize(w["word"]) for w in candidate]
+    matcher = difflib.SequenceMatcher(None, ref_tokens, cand_tokens, autojunk=False)
+    diffs = []
+    for block in matcher.get_matching_blocks():
+        for k in range(block.size):
+            diffs.append(abs(reference[block.a + k]["start"] - candidate[block.b + k]["start"]))
+    if not diffs:
+        return 0.0, 0.0, 0.0
+    matched = len(diffs) / max(1, len(reference))
+    within = sum(d <= tolerance for d in diffs) / len(diffs)
+    return matched, within, sum(diffs) / len(diffs)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--video", required=True)
+    parser.add_argument("--model", default="small")
+    parser.add_argument("--backends", nargs="+", default=["openai", "faster"])
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    samples = load_audio_from_ffmpeg(args.video)
+    audio_seconds = len(samples) / 16000
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    for name in args.backends:
+        queue = ctx.Queue()
+        proc = ctx.Process(target=_run_backend, args=(name, args.model, samples, queue))
+        proc.start()
+        results.append(queue.get())
+        proc.join()
+
+    reference = results[0]
+    print(f"🎧 مدة الصوت: {audio_seconds:.1f}ث | المرجع: {reference['name']}")
+    print(f"{'backend':>8} {'load':>7} {'elapsed':>9} {'x realtime':>11} {'peak RSS':>10} {'words':>6} "
+          f"{'matched':>8} {'<=tol':>6} {'mean Δ':>7}")
+    for r in results:
+        matched, within, mean_diff = timestamp_agreement(reference["words"], r["words"], args.tolerance)
+        print(f"{r['name']:>8} {r['load']:>6.1f}s {r['elapsed']:>8.1f}s {audio_seconds / r['elapsed']:>10.2f}x "
+              f"{r['rss']:>8.0f}MB {len(r['words']):>6} {matched:>7.1%} {within:>5.1%} {mean_diff:>6.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""مقارنة MomentClassifier بين PyTorch و ONNX INT8: تطابق التصنيفات والسرعة.
+
+    python benchmarks/bench_classifier_backend.py --transcription transcription.json --threads 4
+
+يخرج بكود 1 إذا كانت نسبة تطابق التصنيفات أقل من --min-agreement.
+"""
+import os
+import sys
+import time
+import json
+import argparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from voice_analys import MomentClassifier
+
+
+def run(backend, words, threads):
+    # بدون تخزين مؤقت وبدون فلتر معجمي حتى نقيس النموذج نفسه على كل المقاطع
+    classifier = MomentClassifier(backend=backend, num_threads=threads, cache_path=None, prefilter=False)
+    segments = classifier.generate_segments(words)
+    t0 = time.perf_counter()
+    moments = classifier.classify_segments(segments)
+    elapsed = time.perf_counter() - t0
+    return moments, len(segments), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--transcription", required=True)
+    parser.add_argument("--threads", type=int, default=os.cpu_count())
+    parser.add_argument("--min-agreement", type=float, default=0.98)
+    args = parser.parse_args()
+
+    with open(args.transcription, encoding="utf-8") as f:
+        words = json.load(f)
+
+    results = {}
+    for backend in ("torch", "onnx"):
+        moments, count, elapsed = run(backend, words, args.threads)
+        results[backend] = moments
+        print(f"⏱️ {backend}: {count} مقطع في {elapsed:.2f}ث ({count / elapsed:.0f} مقطع/ث)، {len(moments)} لحظة")
+
+    torch_labels = {(m["start"], m["end"], m["text"]): m["label"] for m in results["torch"]}
+    onnx_labels = {(m["start"], m["end"], m["text"]): m["label"] for m in results["onnx"]}
+    keys = set(torch_labels) | set(onnx_labels)
+    agree = sum(1 for k in keys if torch_labels.get(k) == onnx_labels.get(k))
+    agreement = agree / len(keys) if keys else 1.0
+    print(f"🎯 تطابق التصنيفات: {agreement:.2%} ({agree}/{len(keys)})")
+
+    if agreement < args.min_agreement:
+        print("❌ التطابق أقل من الحد المطلوب")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""قياس زمن رسم الإطار الواحد: الرسم القديم (نسخ الإطار + خريطة الفرق لكل إطار + استدعاء لكل شكل)
+مقابل RenderPlan (الفرق محسومة مسبقاً + polylines/fillPoly واحد لكل لون، مع/بدون الرسم في المكان).
+
+    python benchmarks/bench_draw.py --frames 500 --players 22 --width 1920 --height 1080
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import cv2
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from trackers import RenderPlan, draw_tracks
+
+
+def legacy_draw(frame, tracks, frame_teams):
+    """نسخة مختصرة من draw_annotations_single_frame كما كانت قبل RenderPlan (المرجع للمقارنة)."""
+    frame = frame.copy()
+    player_team_map = {r["player_id"]: r.get("team", -1) for r in frame_teams if r.get("player_id") is not None}
+    team_colors = {0: (0, 0, 255), 1: (0, 255, 255), -1: (128, 128, 128)}
+
+    def ellipse(bbox, color):
+        width = bbox[2] - bbox[0]
+        cv2.ellipse(frame, center=(int((bbox[0] + bbox[2]) / 2), int(bbox[3])), axes=(int(width), int(0.35 * width)),
+                    angle=0.0, startAngle=-45, endAngle=235, color=color, thickness=2, lineType=cv2.LINE_4)
+
+    for track_id, player in tracks["players"].items():
+        ellipse(player["bbox"], team_colors.get(player_team_map.get(track_id, -1), (128, 128, 128)))
+    for ball in tracks["ball"].values():
+        x, y = int((ball["bbox"][0] + ball["bbox"][2]) / 2), int(ball["bbox"][1])
+        points = np.array([[x, y], [x - 10, y - 20], [x + 10, y - 20]])
+        cv2.drawContours(frame, [points], 0, (0, 255, 0), cv2.FILLED)
+        cv2.drawContours(frame, [points], 0, (0, 0, 0), 2)
+    for referee in tracks["referees"].values():
+        ellipse(referee["bbox"], (255, 0, 255))
+    for goalkeeper in tracks["goalkeeper"].values():
+        ellipse(goalkeeper["bbox"], (255, 255, 0))
+    return frame
+
+
+def synthetic_match(num_frames, num_players, width, height, seed=0):
+    rng = random.Random(seed)
+
+    def box():
+        x, y = rng.uniform(0, width - 60), rng.uniform(30, height - 120)
+        return [x, y, x + rng.uniform(25, 60), y + rng.uniform(60, 120)]
+
+    frames, team_records = [], []
+    for i in range(num_frames):
+        tracks = {
+            "players": {pid: {"bbox": box()} for pid in range(num_players)},
+            "referees": {100: {"bbox": box()}, 101: {"bbox": box()}},
+            "goalkeeper": {200: {"bbox": box()}, 201: {"bbox": box()}},
+            "ball": {1: {"bbox": box()}},
+        }
+        frames.append(tracks)
+        team_records.append([{"frame_index": i, "player_id": pid, "team": pid % 2} for pid in range(num_players)])
+    return frames, team_records
+
+
+def bench(name, fn, frames, base):
+    work = base.copy()
+    t0 = time.perf_counter()
+    for i, tracks in enumerate(frames):
+        fn(work, i, tracks)
+    ms = 1000 * (time.perf_counter() - t0) / len(frames)
+    print(f"  {name:<28} {ms:7.3f} ms/إطار")
+    return ms
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--frames", type=int, default=500)
+    parser.add_argument("--players", type=int, default=22)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    args = parser.parse_args()
+
+    frames, team_records = synthetic_match(args.frames, args.players, args.width, args.height)
+    plan = RenderPlan.from_records(r for records in team_records for r in records)
+    base = np.random.default_rng(0).integers(0, 255, (args.height, args.width, 3), dtype=np.uint8)
+
+    print(f"🎨 {args.frames} إطار {args.width}x{args.height}، {args.players} لاعب + 2 حكام + 2 حراس + كرة")
+    legacy = bench("القديم (نسخ + شكل بشكل)", lambda f, i, t: legacy_draw(f, t, team_records[i]), frames, base)
+    per_frame = bench("دفعات + خريطة لكل إطار", lambda f, i, t: draw_tracks(
+        f, t, {r["player_id"]: r["team"] for r in team_records[i]}.get), frames, base)
+    copied = bench("RenderPlan (مع نسخ)", lambda f, i, t: plan.draw(f, t, i), frames, base)
+    in_place = bench("RenderPlan (في المكان)", lambda f, i, t: plan.draw(f, t, i, in_place=True), frames, base)
+    print(f"⚡ التسريع: {legacy / copied:.2f}x مع النسخ، {legacy / in_place:.2f}x في المكان")
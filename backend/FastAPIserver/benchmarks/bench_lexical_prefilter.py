@@ -0,0 +1,57 @@
+"""استرجاع الفلتر المعجمي: كم لحظة يصنفها MomentClassifier بدون الفلتر ويفقدها الفلتر، لكل قيمة min_similarity.
+
+    python benchmarks/bench_lexical_prefilter.py --transcription transcription.json --similarities 0.3 0.4 0.5
+
+يخرج بكود 1 إذا قل الاسترجاع عن --min-recall لكل القيم (أي لا توجد قيمة آمنة لتفعيل الفلتر افتراضياً).
+"""
+import os
+import sys
+import time
+import json
+import argparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from voice_analys import MomentClassifier
+from voice_analys.lexical_filter import LexicalPrefilter
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--transcription", required=True)
+    parser.add_argument("--similarities", type=float, nargs="+", default=[0.3, 0.4, 0.5])
+    parser.add_argument("--min-recall", type=float, default=0.99)
+    args = parser.parse_args()
+
+    with open(args.transcription, encoding="utf-8") as f:
+        words = json.load(f)
+
+    classifier = MomentClassifier(cache_path=None, prefilter=False)
+    segments = classifier.generate_segments(words)
+    t0 = time.perf_counter()
+    reference = classifier.classify_segments(segments)
+    full_seconds = time.perf_counter() - t0
+    reference_keys = {(m["start"], m["end"], m["label"]) for m in reference}
+    print(f"📋 بدون فلتر: {len(segments)} مقطع ← {len(reference)} لحظة في {full_seconds:.2f}ث")
+
+    best = 0.0
+    for similarity in args.similarities:
+        classifier.prefilter = LexicalPrefilter(classifier.reference_phrases, similarity)
+        t0 = time.perf_counter()
+        moments = classifier.classify_segments(segments)
+        elapsed = time.perf_counter() - t0
+        keys = {(m["start"], m["end"], m["label"]) for m in moments}
+        recall = len(keys & reference_keys) / len(reference_keys) if reference_keys else 1.0
+        best = max(best, recall)
+        print(f"  min_similarity={similarity}: استرجاع {recall:.2%}، تخطي {classifier.prefilter.skipped}"
+              f"/{classifier.prefilter.checked} مقطع، {elapsed:.2f}ث")
+        for m in sorted(reference, key=lambda m: m["start"]):
+            if (m["start"], m["end"], m["label"]) not in keys:
+                print(f"    ❌ مفقودة: [{m['label']}] {m['text']}")
+
+    if best < args.min_recall:
+        print("❌ لا توجد قيمة تحقق الاسترجاع المطلوب")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""تحقق عشوائي من أن filter_and_merge المفهرس يطابق النسخة القديمة O(V·A) تماماً، ثم قياس السرعة.
+
+    python benchmarks/bench_moments_merger.py --trials 2000 --video 2000 --audio 50000
+
+يخرج بكود 1 عند أول اختلاف ويطبع المدخلات التي سببته.
+"""
+import os
+import sys
+import copy
+import time
+import random
+import argparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from mareg_voice_vidoe import ImportantMomentsMerger
+
+VIDEO_EVENTS = ["ركلات ترجيح", "فرصة خطيرة أو هدف", "هجمة", "ركنية"]
+AUDIO_LABELS = ["goal", "card", "chance", "foul", "excitement"]
+
+
+class NaiveMerger(ImportantMomentsMerger):
+    """النسخة الأصلية كما كانت قبل الفهرسة (المرجع للمقارنة)."""
+
+    def filter_and_merge(self):
+        filtered = []
+        for moment in self.processed_video_moments:
+            labels = moment["events"]
+            merged_audio_labels = []
+            for audio in self.audio_moments:
+                if (
+                    abs(audio["start"] - moment["end"]) <= self.merge_penalty_gap or
+                    abs(audio["end"] - moment["start"]) <= self.merge_penalty_gap or
+                    (audio["start"] <= moment["end"] and audio["end"] >= moment["start"])
+                ):
+                    merged_audio_labels.append(audio["label"])
+
+            has_penalty = any("ركلات ترجيح" in e for e in labels)
+            has_chance_or_goal = any("فرصة خطيرة أو هدف" in e for e in labels)
+            if has_penalty:
+                if merged_audio_labels:
+                    moment["type"] = "video+audio"
+                    moment["events"] = list(set(labels + merged_audio_labels))
+                filtered.append(moment)
+            elif has_chance_or_goal:
+                if merged_audio_labels:
+                    moment["type"] = "video+audio"
+                    moment["events"] = list(set(labels + merged_audio_labels))
+                    filtered.append(moment)
+            else:
+                filtered.append(moment)
+
+        for audio in self.audio_moments:
+            if audio.get("label") == "card":
+                already_added = any(
+                    audio["start"] == m["start"] and audio["end"] == m["end"] and "audio" in m["type"]
+                    for m in filtered
+                )
+                if not already_added:
+                    filtered.append({
+                        "start": audio["start"],
+                        "end": audio["end"],
+                        "type": "audio",
+                        "events": [audio["label"]],
+                        "text": audio.get("text", "")
+                    })
+        return filtered
+
+
+def random_moments(rng, n_video, n_audio, horizon):
+    # قيم على شبكة 0.25 حتى تتكرر حالات المساواة على الحدود، مع بعض الفترات المعكوسة والمكررة
+    def point():
+        return rng.randrange(int(horizon * 4)) / 4
+
+    video = []
+    for _ in range(n_video):
+        start = point()
+        length = round(rng.choice([0, 1, 3, 10]) * rng.random() * 4) / 4
+        video.append({
+            "start": start,
+            "end": start + length,
+            "type": "video",
+            "events": rng.sample(VIDEO_EVENTS, rng.randint(1, 2)),
+        })
+    audio = []
+    for _ in range(n_audio):
+        if audio and rng.random() < 0.05:
+            audio.append(dict(rng.choice(audio)))
+            continue
+        start = point()
+        length = rng.choice([0, 0.5, 1, 2, 8, 30]) if rng.random() > 0.03 else -rng.choice([0.5, 2])
+        audio.append({"label": rng.choice(AUDIO_LABELS), "text": "", "start": start, "end": start + length})
+    for v in video:
+        if audio and rng.random() < 0.1:
+            # بطاقة بنفس حدود لحظة فيديو حتى نختبر فحص already_added
+            audio.append({"label": "card", "text": "", "start": v["start"], "end": v["end"]})
+    rng.shuffle(audio)
+    return video, audio
+
+
+def run_merger(cls, video, audio, gap):
+    merger = cls(video_json_path="", audio_json_path="", video_file_path="", merge_penalty_gap=gap)
+    merger.processed_video_moments = copy.deepcopy(video)
+    merger.audio_moments = copy.deepcopy(audio)
+    t0 = time.perf_counter()
+    result = merger.filter_and_merge()
+    return result, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--trials", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--video", type=int, default=1000, help="عدد لحظات الفيديو في اختبار السرعة")
+    parser.add_argument("--audio", type=int, default=20000, help="عدد اللحظات الصوتية في اختبار السرعة")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    for trial in range(args.trials):
+        video, audio = random_moments(rng, rng.randint(0, 30), rng.randint(0, 60), horizon=rng.choice([20, 200]))
+        gap = rng.choice([0, 0.25, 1, 2.5])
+        expected, _ = run_merger(NaiveMerger, video, audio, gap)
+        actual, _ = run_merger(ImportantMomentsMerger, video, audio, gap)
+        if expected != actual:
+            print(f"❌ اختلاف في المحاولة {trial} (gap={gap})")
+            print("video =", video)
+            print("audio =", audio)
+            sys.exit(1)
+    print(f"✅ {args.trials} محاولة عشوائية متطابقة")
+
+    video, audio = random_moments(rng, args.video, args.audio, horizon=5400)
+    naive, naive_time = run_merger(NaiveMerger, video, audio, 1.0)
+    fast, fast_time = run_merger(ImportantMomentsMerger, video, audio, 1.0)
+    assert naive == fast
+    print(f"⏱️ V={args.video} A={args.audio}: القديم {naive_time:.2f}ث، المفهرس {fast_time:.3f}ث "
+          f"({naive_time / max(fast_time, 1e-9):.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
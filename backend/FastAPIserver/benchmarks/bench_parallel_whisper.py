@@ -0,0 +1,36 @@
+"""قياس تسريع التفريغ متعدد العمليات مقابل عدد الأنوية.
+
+    python benchmarks/bench_parallel_whisper.py --video match.mp4 --model small --workers 1 2 4 8
+"""
+import os
+import sys
+import argparse
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from voice_analys import ParallelWhisperTranscriber
+from voice_analys.Whisper import load_audio_from_ffmpeg
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--video", required=True)
+    parser.add_argument("--model", default="medium")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--threads-per-worker", type=int, default=2)
+    args = parser.parse_args()
+
+    samples = load_audio_from_ffmpeg(args.video)
+    baseline = None
+    print(f"{'workers':>8} {'cores':>6} {'elapsed':>9} {'speedup':>8} {'x realtime':>11}")
+    for workers in args.workers:
+        transcriber = ParallelWhisperTranscriber(args.model, num_workers=workers,
+                                                 threads_per_worker=args.threads_per_worker)
+        transcriber.transcribe_samples(samples)
+        stats = transcriber.stats
+        baseline = baseline or stats["elapsed_seconds"]
+        print(f"{workers:>8} {workers * args.threads_per_worker:>6} {stats['elapsed_seconds']:>8.1f}s "
+              f"{baseline / stats['elapsed_seconds']:>7.2f}x {stats['realtime_factor']:>10.2f}x")
+
+
+if __name__ == "__main__":
+    main()
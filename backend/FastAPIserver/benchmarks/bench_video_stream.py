@@ -0,0 +1,66 @@
+"""قياس إنتاجية /video مع عدة مشاهدين متزامنين.
+
+شغّل الخادم ثم:
+    python benchmarks/bench_video_stream.py --url http://127.0.0.1:8000 --name "ملخص x.mp4" --viewers 32
+
+للمقارنة قبل/بعد: شغّل نفس الأمر على الخادم من النسخة القديمة ثم الجديدة.
+"""
+import time
+import argparse
+import random
+from urllib.parse import quote
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+
+def viewer(url, file_size, range_size, requests_per_viewer, seed):
+    rng = random.Random(seed)
+    session = requests.Session()
+    total = 0
+    latencies = []
+    for _ in range(requests_per_viewer):
+        # محاكاة مشغل فيديو: قفزات عشوائية ثم طلب نطاق
+        start = rng.randrange(0, max(file_size - range_size, 1))
+        end = min(start + range_size - 1, file_size - 1)
+        t0 = time.perf_counter()
+        response = session.get(url, headers={"Range": f"bytes={start}-{end}"}, stream=True)
+        for chunk in response.iter_content(chunk_size=256 * 1024):
+            total += len(chunk)
+        latencies.append(time.perf_counter() - t0)
+    return total, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--name", required=True)
+    parser.add_argument("--viewers", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--range-size", type=int, default=4 * 1024 * 1024)
+    args = parser.parse_args()
+
+    url = f"{args.url}/video?name={quote(args.name)}"
+    head = requests.head(url)
+    file_size = int(head.headers["Content-Length"])
+    print(f"📹 حجم الملف: {file_size / 1e6:.1f} MB، مشاهدين: {args.viewers}")
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.viewers) as pool:
+        results = list(pool.map(
+            lambda seed: viewer(url, file_size, args.range_size, args.requests, seed),
+            range(args.viewers)
+        ))
+    elapsed = time.perf_counter() - t0
+
+    total_bytes = sum(r[0] for r in results)
+    latencies = sorted(l for r in results for l in r[1])
+    p50 = latencies[len(latencies) // 2]
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"⏱️ الزمن: {elapsed:.2f}ث")
+    print(f"🚀 الإنتاجية: {total_bytes / elapsed / 1e6:.1f} MB/s")
+    print(f"📊 زمن الطلب p50={p50 * 1000:.0f}ms p95={p95 * 1000:.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+from .summary_catalog import SummaryCatalog, probe_duration
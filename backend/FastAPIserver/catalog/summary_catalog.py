@@ -0,0 +1,139 @@
+import os
+import json
+import time
+import sqlite3
+import subprocess
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS summaries (
+    filename TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    duration REAL,
+    created_at REAL NOT NULL,
+    thumbnail_path TEXT,
+    moment_count INTEGER DEFAULT 0,
+    video_moments INTEGER DEFAULT 0,
+    audio_moments INTEGER DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_summaries_created_at ON summaries (created_at DESC);
+"""
+
+
+def probe_duration(video_path):
+    """المدة الحقيقية للفيديو بالثواني عبر ffprobe."""
+    cmd = [
+        "ffprobe", "-v", "error",
+        "-show_entries", "format=duration",
+        "-of", "default=noprint_wrappers=1:nokey=1",
+        video_path
+    ]
+    try:
+        output = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout.strip()
+        return float(output)
+    except (subprocess.CalledProcessError, OSError, ValueError):
+        return None
+
+
+def count_moments(moments_json):
+    if not moments_json or not os.path.exists(moments_json):
+        return 0, 0, 0
+    with open(moments_json, "r", encoding="utf-8") as f:
+        moments = json.load(f)
+    video = sum(1 for m in moments if "video" in m.get("type", ""))
+    audio = sum(1 for m in moments if "audio" in m.get("type", ""))
+    return len(moments), video, audio
+
+
+class SummaryCatalog:
+    """فهرس دائم للملخصات (SQLite) يُملأ عند انتهاء التلخيص حتى لا يمسح /summaries المجلد مع كل طلب."""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def add_summary(self, path, moments_json=None, thumbnail_path=None, created_at=None, duration=None):
+        moment_count, video_moments, audio_moments = count_moments(moments_json)
+        st = os.stat(path)
+        if duration is None:
+            duration = probe_duration(path)
+        with self._connect() as conn:
+            conn.execute(
+                """INSERT OR REPLACE INTO summaries
+                   (filename, path, size, duration, created_at, thumbnail_path, moment_count, video_moments, audio_moments)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (os.path.basename(path), os.path.abspath(path), st.st_size, duration,
+                 created_at or st.st_mtime, thumbnail_path, moment_count, video_moments, audio_moments)
+            )
+        print(f"🗂️ تمت إضافة الملخص إلى الفهرس: {os.path.basename(path)}")
+
+    def set_thumbnail(self, filename, thumbnail_path):
+        with self._connect() as conn:
+            conn.execute("UPDATE summaries SET thumbnail_path = ? WHERE filename = ?", (thumbnail_path, filename))
+
+    def remove(self, filename):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM summaries WHERE filename = ?", (filename,))
+
+    def get(self, filename):
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM summaries WHERE filename = ?", (filename,)).fetchone()
+        return dict(row) if row else None
+
+    def _where(self, query=None, since=None, until=None):
+        clauses, args = [], []
+        if query:
+            # % و _ في نص المستخدم حرفية وليست أنماط LIKE
+            escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            clauses.append("filename LIKE ? ESCAPE '\\'")
+            args.append(f"%{escaped}%")
+        if since is not None:
+            clauses.append("created_at >= ?")
+            args.append(since)
+        if until is not None:
+            clauses.append("created_at < ?")
+            args.append(until)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", args
+
+    def list(self, page=1, page_size=50, query=None, since=None, until=None):
+        where, args = self._where(query, since, until)
+        offset = max(page - 1, 0) * page_size
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT * FROM summaries{where} ORDER BY created_at DESC LIMIT ? OFFSET ?",
+                args + [page_size, offset]
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def count(self, query=None, since=None, until=None):
+        where, args = self._where(query, since, until)
+        with self._connect() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM summaries{where}", args).fetchone()[0]
+
+    def sync_folder(self, folder):
+        """إضافة الملخصات الموجودة مسبقاً في المجلد (قبل وجود الفهرس) وحذف ما لم يعد موجوداً."""
+        if not os.path.isdir(folder):
+            return 0
+        with self._connect() as conn:
+            known = {row["filename"]: row["path"] for row in conn.execute("SELECT filename, path FROM summaries")}
+
+        added = 0
+        for filename in os.listdir(folder):
+            if filename.endswith(VIDEO_EXTENSIONS) and filename not in known:
+                path = os.path.join(folder, filename)
+                self.add_summary(path)
+                added += 1
+
+        for filename, path in known.items():
+            if not os.path.exists(path):
+                self.remove(filename)
+        return added
@@ -0,0 +1 @@
+from .packager import HLSPackager, hls_dir_for
@@ -0,0 +1,154 @@
+import os
+import json
+import shutil
+import hashlib
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+# سلم الجودات الافتراضي: (الارتفاع، معدل الفيديو kbps، معدل الصوت kbps)
+DEFAULT_LADDER = [
+    (1080, 5000, 128),
+    (720, 2800, 128),
+    (480, 1400, 96),
+    (360, 800, 64),
+]
+
+# مستويات H.264 (المستوى، level_idc، أقصى حجم إطار بالـ macroblocks، أقصى macroblocks في الثانية)
+H264_LEVELS = [
+    ("3.0", 30, 1620, 40500),
+    ("3.1", 31, 3600, 108000),
+    ("3.2", 32, 5120, 216000),
+    ("4.0", 40, 8192, 245760),
+    ("4.2", 42, 8704, 522240),
+    ("5.0", 50, 22080, 589824),
+    ("5.1", 51, 36864, 983040),
+    ("5.2", 52, 36864, 2073600),
+]
+
+
+def h264_level(width, height, fps):
+    """أدنى مستوى H.264 يتسع لحجم الإطار ومعدل الإطارات (ثابت لكل جودة حتى يطابق CODECS في master)."""
+    frame_mbs = ((width + 15) // 16) * ((height + 15) // 16)
+    for name, idc, max_fs, max_mbps in H264_LEVELS:
+        if frame_mbs <= max_fs and frame_mbs * fps <= max_mbps:
+            return name, idc
+    return H264_LEVELS[-1][:2]
+
+
+def hls_dir_for(summary_path):
+    """مجلد HLS الخاص بملخص: summarises/hls/<اسم الملخص بدون الامتداد>/"""
+    stem = os.path.splitext(os.path.basename(summary_path))[0]
+    return os.path.join(os.path.dirname(os.path.abspath(summary_path)), "hls", stem)
+
+
+class HLSPackager:
+    """تحويل الملخص النهائي إلى HLS بعدة جودات تُرمّز بالتوازي مع master playlist."""
+
+    def __init__(self, video_path, output_dir=None, ladder=None, segment_time=4, max_workers=None, preset="veryfast"):
+        self.video_path = video_path
+        self.output_dir = output_dir or hls_dir_for(video_path)
+        self.ladder = ladder or DEFAULT_LADDER
+        self.segment_time = segment_time
+        self.max_workers = max_workers
+        self.preset = preset
+
+    def version(self):
+        """بصمة قصيرة للملخص وإعدادات الترميز في أسماء المقاطع: إعادة التجهيز تنتج أسماء جديدة
+        فلا يبقى عند المشغلات مقطع قديم مخزن بـ immutable تحت نفس الاسم."""
+        st = os.stat(self.video_path)
+        key = json.dumps([st.st_size, st.st_mtime_ns, self.ladder, self.segment_time, self.preset])
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()[:8]
+
+    def probe(self):
+        cmd = [
+            "ffprobe", "-v", "error",
+            "-select_streams", "v:0",
+            "-show_entries", "stream=width,height,r_frame_rate",
+            "-of", "json",
+            self.video_path
+        ]
+        stream = json.loads(subprocess.run(cmd, capture_output=True, text=True, check=True).stdout)["streams"][0]
+        num, den = stream.get("r_frame_rate", "25/1").split("/")
+        fps = float(num) / float(den) if float(den) else 25.0
+        return stream["width"], stream["height"], fps
+
+    def source_rung(self, source_height):
+        """جودة بارتفاع المصدر نفسه (زوجي لـ libx264)، بمعدل مُقاس بعدد البكسلات من أقرب درجة أعلى في السلم."""
+        height = source_height // 2 * 2
+        higher = [r for r in self.ladder if r[0] > height]
+        ref_height, ref_video, ref_audio = min(higher) if higher else max(self.ladder)
+        return height, int(ref_video * (height / ref_height) ** 2), ref_audio
+
+    def select_renditions(self, source_height):
+        """لا نرفع الدقة فوق المصدر أبداً. إن بقيت أقل من جودتين والمصدر ليس على درجة من السلم نضيف جودة
+        بارتفاعه (مثلاً 400p ← 400p + 360p، و 240p ← 240p فقط). مصدر بارتفاع أدنى درجة تماماً يبقى بجودة واحدة."""
+        renditions = [r for r in self.ladder if r[0] <= source_height]
+        if len(renditions) < 2 and (not renditions or renditions[0][0] != source_height):
+            renditions.insert(0, self.source_rung(source_height))
+        return renditions[:4]
+
+    @staticmethod
+    def rendition_width(width, height, rendition_height):
+        return int(round(width * rendition_height / height / 2)) * 2
+
+    def encode_rendition(self, height, video_kbps, audio_kbps, fps, level="4.0", version=""):
+        rendition_dir = os.path.join(self.output_dir, f"{height}p")
+        os.makedirs(rendition_dir, exist_ok=True)
+        # إطار مفتاحي ثابت عند بداية كل مقطع حتى تتطابق حدود المقاطع بين الجودات
+        gop = max(int(round(fps * self.segment_time)), 1)
+        cmd = [
+            "ffmpeg", "-y",
+            "-i", self.video_path,
+            "-vf", f"scale=-2:{height}",
+            "-c:v", "libx264", "-preset", self.preset, "-profile:v", "main", "-level:v", level,
+            "-b:v", f"{video_kbps}k", "-maxrate", f"{int(video_kbps * 1.07)}k", "-bufsize", f"{video_kbps * 2}k",
+            "-g", str(gop), "-keyint_min", str(gop), "-sc_threshold", "0",
+            "-c:a", "aac", "-b:a", f"{audio_kbps}k", "-ac", "2",
+            "-f", "hls",
+            "-hls_time", str(self.segment_time),
+            "-hls_playlist_type", "vod",
+            "-hls_segment_filename", os.path.join(rendition_dir, f"seg_{version}_%05d.ts"),
+            os.path.join(rendition_dir, "index.m3u8")
+        ]
+        result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        if result.returncode != 0:
+            raise RuntimeError(f"❌ فشل ترميز جودة {height}p")
+        return height
+
+    def write_master_playlist(self, renditions, width, height, fps=25.0):
+        lines = ["#EXTM3U", "#EXT-X-VERSION:3"]
+        for rendition_height, video_kbps, audio_kbps in renditions:
+            rendition_width = self.rendition_width(width, height, rendition_height)
+            bandwidth = (video_kbps + audio_kbps) * 1000
+            # H.264 Main (avc1.4d40xx بمستوى الجودة) + AAC-LC
+            _, level_idc = h264_level(rendition_width, rendition_height, fps)
+            codecs = f"avc1.4d40{level_idc:02x},mp4a.40.2"
+            lines.append(
+                f"#EXT-X-STREAM-INF:BANDWIDTH={bandwidth},RESOLUTION={rendition_width}x{rendition_height},"
+                f'CODECS="{codecs}"'
+            )
+            lines.append(f"{rendition_height}p/index.m3u8")
+        master_path = os.path.join(self.output_dir, "master.m3u8")
+        with open(master_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        return master_path
+
+    def package(self):
+        width, height, fps = self.probe()
+        renditions = self.select_renditions(height)
+
+        # نبدأ من مجلد نظيف حتى لا تبقى مقاطع قديمة من ترميز سابق
+        if os.path.isdir(self.output_dir):
+            shutil.rmtree(self.output_dir)
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        print(f"📡 تجهيز HLS بـ {len(renditions)} جودات: {', '.join(f'{r[0]}p' for r in renditions)}")
+        version = self.version()
+        with ThreadPoolExecutor(max_workers=self.max_workers or len(renditions)) as pool:
+            list(pool.map(lambda r: self.encode_rendition(
+                r[0], r[1], r[2], fps, h264_level(self.rendition_width(width, height, r[0]), r[0], fps)[0], version
+            ), renditions))
+
+        master_path = self.write_master_playlist(renditions, width, height, fps)
+        print(f"✅ تم حفظ HLS في: {master_path}")
+        return master_path
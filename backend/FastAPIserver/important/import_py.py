@@ -27,6 +27,11 @@ class ImportantMomentsDetector:
         return False
 
     def analyze(self):
+        self.analyze_frames()
+        self.save_events()
+
+    def analyze_frames(self):
+        """تطبيق القواعد على كل إطار وتعبئة self.important_frames (بدون تجميع)."""
         with open(self.detection_file, 'rb') as f:
             try:
                 while True:
@@ -63,7 +68,9 @@ class ImportantMomentsDetector:
                         self.important_frames.append(frame_result)
             except EOFError:
                 pass
+        return self.important_frames
 
+    def save_events(self):
         grouped_events = self.group_events()
 
         with open(self.output_json, 'w', encoding='utf-8') as out_f:
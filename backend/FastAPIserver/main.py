@@ -1,7 +1,8 @@
 
 from fastapi import FastAPI, HTTPException, Request, Body
-from fastapi.responses import StreamingResponse, JSONResponse, FileResponse
+from fastapi.responses import StreamingResponse, JSONResponse, FileResponse, RedirectResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 import os
 import logging
 from typing import List, Dict
@@ -16,66 +17,82 @@ from read import parallel_extract, process_and_save_video
 from trackers import Tracker
 import time
 from important import ImportantMomentsDetector
-from match_sum import MatchSummarizer
+from match_sum import MatchSummarizer, KeyframeIndex
 from team_assigner import TeamAssigner
 from voice_analys import MomentClassifier, WhisperTranscriber
 import cv2
 from mareg_voice_vidoe import ImportantMomentsMerger
 import os
 import glob
-
-def summarize():
-    # ✅ اختيار أحدث فيديو من DownloadedMatches
-    downloaded_matches_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "../DownloadedMatches"))
-    print("ccccccccccccccccccccccccccccccccccccccccccccccccccccccccccccccccccccccccccccccccccc")
+from workspace import JobWorkspace
+from pipeline import PipelineScheduler
+from streaming import RangeFileResponse
+from catalog import SummaryCatalog
+from previews import PreviewGenerator
+import threading
+
+JOBS_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "jobs"))
+# محرك التفريغ وحجم النموذج الافتراضيان (openai أو faster)، ويمكن تغيير الحجم لكل مهمة
+WHISPER_BACKEND = os.environ.get("WHISPER_BACKEND", "openai")
+WHISPER_MODEL_SIZE = os.environ.get("WHISPER_MODEL_SIZE", "medium")
+# full: تفريغ المباراة كاملة، excitement: تفريغ النوافذ المحيطة بلحظات الإثارة الصوتية فقط
+WHISPER_SCOPE = os.environ.get("WHISPER_SCOPE", "full")
+# لغة التعليق لكل مقاطع Whisper (auto: كشف تلقائي مرة واحدة لكل مباراة)
+WHISPER_LANGUAGE = os.environ.get("WHISPER_LANGUAGE", "ar")
+WHISPER_LANGUAGE = None if WHISPER_LANGUAGE in ("", "auto") else WHISPER_LANGUAGE
+# تخطي المقاطع البعيدة لفظياً عن العبارات المرجعية قبل التصنيف (يُقاس استرجاعه بـ benchmarks/bench_lexical_prefilter.py)
+CLASSIFIER_PREFILTER = os.environ.get("CLASSIFIER_PREFILTER", "0") == "1"
+# محرك تمثيل الجمل للتصنيف: torch أو onnx (INT8 على المعالج، يفشل التشغيل إذا لم يطابق torch)
+CLASSIFIER_BACKEND = os.environ.get("CLASSIFIER_BACKEND", "torch")
+# fixed: إطار كل frame_step على طول المباراة، adaptive: مرور خشن ثم كثيف داخل النوافذ المهمة فقط
+FRAME_SAMPLING = os.environ.get("FRAME_SAMPLING", "fixed")
+# تقسيم الفرع المرئي إلى أجزاء زمنية متوازية (0 = بدون تقسيم). SHARD_WORKERS=0 يترك الأجزاء لعقد خارجية
+MATCH_SHARDS = int(os.environ.get("MATCH_SHARDS", "0"))
+SHARD_WORKERS = int(os.environ["SHARD_WORKERS"]) if os.environ.get("SHARD_WORKERS") else None
+# كشف الكرة على قص بالدقة الكاملة حول موضعها المتوقع (كالمان) عندما يفوتها الكشف على الإطار الكامل
+BALL_ROI = os.environ.get("BALL_ROI", "0") == "1"
+
+def find_latest_video(downloaded_matches_dir):
     video_files = glob.glob(os.path.join(downloaded_matches_dir, "*.mp4"))
     if not video_files:
         raise FileNotFoundError("❌ لا يوجد أي فيديو في مجلد DownloadedMatches.")
-    latest_video_path = max(video_files, key=os.path.getmtime)
-
-    # ✅ إعداد اسم الإخراج داخل summarises باسم "ملخص ..."
-    summarises_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "../summarises"))
-    video_name = os.path.basename(latest_video_path)
-    output_name = f"ملخص {video_name}"
-    output_video_path = os.path.join(summarises_dir, output_name)
-
-    video_file = latest_video_path
-    output_file = output_video_path
-
-    tracker = Tracker(os.path.join(os.path.dirname(__file__), 'models', 'best.pt'))
-
-    parallel_extract(video_file, "output_frame")
-    tracker.detect_frames_from_folder("output_frame", "stubs/detection_file")
-    tracker.get_object_tracks("stubs/detection_file", "stubs/tracks_file")
-    tracker.interpolate_ball_positions_from_track_file("stubs/tracks_file", "stubs/tracks_file_inter_ball")
-
-    importent = ImportantMomentsDetector("stubs/tracks_file", "important_frames.json")
-    importent.analyze()
-
-    transcriber = WhisperTranscriber(model_size="medium")
-    text = transcriber.transcribe_video(video_file)
-
-    classifier = MomentClassifier()
-    classifier.process("transcription.json")
+    return max(video_files, key=os.path.getmtime)
 
-    merger = ImportantMomentsMerger(
-        video_json_path="important_frames.json",
-        audio_json_path="important_moments.json",
-        video_file_path=video_file,
-        merge_threshold=1,
-        merge_penalty_gap=1  # اذا رجعتها 10 بنزل الملخص إلى 31 دقيقة
-    )
+def summarize(video_file=None, output_file=None, job_id=None, jobs_root=JOBS_ROOT, keep_workspace=False,
+              whisper_model_size=None, whisper_backend=None):
+    # ✅ إذا لم يُحدد الفيديو نختار أحدث فيديو من DownloadedMatches (السلوك القديم)
+    if video_file is None:
+        downloaded_matches_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "../DownloadedMatches"))
+        video_file = find_latest_video(downloaded_matches_dir)
 
-    merger.run("merged_moments.json")
-
-    summarizer = MatchSummarizer(
-        video_path=video_file,
-        moments_json="merged_moments.json",
-        output_path=output_file,
-        time_window=0  # ثواني قبل وبعد كل لحظة
-    )
-
-    summarizer.summarize()
+    # ✅ إعداد اسم الإخراج داخل summarises باسم "ملخص ..."
+    if output_file is None:
+        summarises_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "../summarises"))
+        video_name = os.path.basename(video_file)
+        output_file = os.path.join(summarises_dir, f"ملخص {video_name}")
+
+    # ✅ كل مهمة تعمل داخل مجلد مستقل ويُحذف تلقائياً بعد الانتهاء (ويبقى عند الفشل للاستئناف)
+    if job_id is None:
+        ws = JobWorkspace.for_video(jobs_root, video_file, keep=keep_workspace)
+    else:
+        ws = JobWorkspace(jobs_root, job_id=job_id, keep=keep_workspace)
+
+    with ws:
+        # ✅ الفرع الصوتي يعمل بالتوازي مع الفرع المرئي، والدمج يبدأ بمجرد انتهاء الاثنين.
+        # المراحل المكتملة في محاولة سابقة لا يُعاد تشغيلها.
+        scheduler = PipelineScheduler(os.path.join(os.path.dirname(__file__), 'models', 'best.pt'),
+                                      whisper_model_size=whisper_model_size or WHISPER_MODEL_SIZE,
+                                      whisper_backend=whisper_backend or WHISPER_BACKEND,
+                                      whisper_scope=WHISPER_SCOPE,
+                                      whisper_language=WHISPER_LANGUAGE,
+                                      classifier_prefilter=CLASSIFIER_PREFILTER,
+                                      classifier_backend=CLASSIFIER_BACKEND,
+                                      sampling=FRAME_SAMPLING,
+                                      shards=MATCH_SHARDS, shard_workers=SHARD_WORKERS,
+                                      ball_roi=BALL_ROI)
+        scheduler.run(video_file, ws, output_file)
+
+    return output_file
 
 ##############################################################
 # Add the parent directory to the path to allow importing downloadmatch
@@ -108,15 +125,34 @@ logger.info(f"Summaries folder path: {SUMMARIES_FOLDER}")
 # THUMBNAIL_FOLDER is only used for DownloadedMatches videos
 THUMBNAIL_FOLDER = VIDEO_FOLDER  # Store thumbnails for DownloadedMatches videos only
 
-def generate_thumbnail(video_path, thumbnail_path):
-    if not os.path.exists(thumbnail_path):
-        try:
-            subprocess.run([
-                'ffmpeg', '-y', '-i', video_path,
-                '-ss', '00:00:01.000', '-vframes', '1', thumbnail_path
-            ], check=True)
-        except Exception as e:
-            logger.error(f"Failed to generate thumbnail for {video_path}: {e}")
+PLACEHOLDER_THUMBNAIL_URL = 'https://via.placeholder.com/320x180.png?text=No+Thumbnail'
+SUMMARY_CATALOG = SummaryCatalog(os.path.join(SUMMARIES_FOLDER, "catalog.sqlite3"))
+
+def backfill_catalog():
+    SUMMARY_CATALOG.sync_folder(SUMMARIES_FOLDER)
+    # ✅ الملخصات القديمة بدون معاينات: ننشئها هنا مرة واحدة بدلاً من وقت الطلب
+    page = 1
+    while True:
+        rows = SUMMARY_CATALOG.list(page=page, page_size=200)
+        if not rows:
+            break
+        for row in rows:
+            if not row['thumbnail_path'] or not os.path.exists(row['thumbnail_path']):
+                thumb_path = PreviewGenerator(row['path']).generate()
+                if thumb_path:
+                    SUMMARY_CATALOG.set_thumbnail(row['filename'], thumb_path)
+        page += 1
+
+@app.on_event("startup")
+async def sync_summary_catalog():
+    # ✅ إضافة الملخصات القديمة (الموجودة قبل الفهرس) في الخلفية حتى لا يتأخر تشغيل الخادم
+    threading.Thread(target=backfill_catalog, daemon=True).start()
+
+def format_duration(seconds):
+    if seconds is None:
+        return "0:00"
+    seconds = int(round(seconds))
+    return f"{seconds // 60}:{seconds % 60:02d}"
 
 @app.get("/video")
 @app.head("/video")
@@ -129,99 +165,149 @@ async def stream_video(name: str, request: Request):
         if not os.path.exists(file_path):
             raise HTTPException(status_code=404, detail="File not found")
 
-        file_size = os.path.getsize(file_path)
         if not decoded_name.lower().endswith((".mp4", ".avi", ".mov", ".mkv")):
             raise HTTPException(status_code=400, detail="Invalid file type")
 
-        range_header = request.headers.get('range')
-        start = 0
-        end = file_size - 1
-        if range_header:
-            try:
-                range_str = range_header.replace('bytes=', '')
-                if '-' in range_str:
-                    start_str, end_str = range_str.split('-')
-                    start = int(start_str) if start_str else 0
-                    end = int(end_str) if end_str else file_size - 1
-                else:
-                    start = int(range_str)
-            except ValueError:
-                start, end = 0, file_size - 1
-
-        content_length = end - start + 1
         headers = {
-            "Content-Length": str(content_length),
-            "Content-Type": "video/mp4",
-            "Accept-Ranges": "bytes",
             "Access-Control-Allow-Origin": "*",
             "Access-Control-Allow-Methods": "GET, HEAD",
-            "Access-Control-Allow-Headers": "Range",
-            "Access-Control-Expose-Headers": "Content-Range, Accept-Ranges, Content-Length",
-            "Cache-Control": "no-cache",
+            "Access-Control-Allow-Headers": "Range, If-Range, If-None-Match, If-Modified-Since",
+            "Access-Control-Expose-Headers": "Content-Range, Accept-Ranges, Content-Length, ETag, Last-Modified",
         }
-        if range_header:
-            headers["Content-Range"] = f"bytes {start}-{end}/{file_size}"
-
-        if request.method == "HEAD":
-            return JSONResponse(content={"size": file_size, "range": f"{start}-{end}"}, headers=headers)
-
-        async def video_stream():
-            chunk_size = 8192
-            with open(file_path, 'rb') as f:
-                f.seek(start)
-                remaining = content_length
-                while remaining > 0:
-                    chunk = f.read(min(chunk_size, remaining))
-                    if not chunk:
-                        break
-                    yield chunk
-                    remaining -= len(chunk)
-
-        return StreamingResponse(video_stream(), media_type="video/mp4", headers=headers, status_code=206 if range_header else 200)
 
+        # ✅ الإرسال بدون نسخ (zero-copy) إن دعمه الخادم، وإلا بقطع كبيرة داخل threadpool بدل حلقة الأحداث
+        return RangeFileResponse(file_path, request, media_type="video/mp4", headers=headers)
+
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error streaming video: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+HLS_FOLDER = os.path.join(SUMMARIES_FOLDER, "hls")
+
+@app.get("/hls/{summary}/{path:path}")
+async def get_hls_file(summary: str, path: str):
+    # ✅ منع الخروج من مجلد HLS عبر ../
+    base_dir = os.path.realpath(os.path.join(HLS_FOLDER, unquote(summary)))
+    file_path = os.path.realpath(os.path.join(base_dir, unquote(path)))
+    if not file_path.startswith(os.path.realpath(HLS_FOLDER) + os.sep) or not os.path.isfile(file_path):
+        raise HTTPException(status_code=404, detail="File not found")
+
+    if file_path.endswith(".m3u8"):
+        # القوائم تشير لأسماء مقاطع بإصدار التجهيز: تُعاد مراجعتها دائماً حتى لا تشير لمقاطع محذوفة بعد إعادة التجهيز
+        return FileResponse(file_path, media_type="application/vnd.apple.mpegurl",
+                            headers={"Cache-Control": "no-cache"})
+    if file_path.endswith(".ts"):
+        return FileResponse(file_path, media_type="video/mp2t",
+                            headers={"Cache-Control": "public, max-age=31536000, immutable"})
+    raise HTTPException(status_code=400, detail="Invalid file type")
+
+LIVE_FOLDER = os.path.join(SUMMARIES_FOLDER, "live")
+
+@app.get("/live/{summary}/{path:path}")
+async def get_live_file(summary: str, path: str):
+    base_dir = os.path.realpath(os.path.join(LIVE_FOLDER, unquote(summary)))
+    file_path = os.path.realpath(os.path.join(base_dir, unquote(path)))
+    if not file_path.startswith(os.path.realpath(LIVE_FOLDER) + os.sep) or not os.path.isfile(file_path):
+        raise HTTPException(status_code=404, detail="File not found")
+
+    if file_path.endswith(".m3u8"):
+        # القائمة تكبر أثناء المعالجة فلا يجب تخزينها مؤقتاً
+        return FileResponse(file_path, media_type="application/vnd.apple.mpegurl",
+                            headers={"Cache-Control": "no-cache"})
+    if file_path.endswith(".ts"):
+        return FileResponse(file_path, media_type="video/mp2t",
+                            headers={"Cache-Control": "public, max-age=31536000, immutable"})
+    raise HTTPException(status_code=400, detail="Invalid file type")
+
+@app.get("/summaries/live")
+async def get_live_summaries():
+    """الملخصات التي ما زالت قيد المعالجة (أو اكتملت) مع رابط قائمة HLS التدريجية."""
+    live = []
+    if not os.path.isdir(LIVE_FOLDER):
+        return live
+    for name in sorted(os.listdir(LIVE_FOLDER)):
+        playlist_path = os.path.join(LIVE_FOLDER, name, "index.m3u8")
+        if not os.path.exists(playlist_path):
+            continue
+        with open(playlist_path, encoding="utf-8") as f:
+            complete = "#EXT-X-ENDLIST" in f.read()
+        live.append({
+            'title': name,
+            'live_url': f'http://192.168.84.116:8000/live/{quote(name)}/index.m3u8',
+            'complete': complete
+        })
+    return live
+
+PREVIEWS_FOLDER = os.path.join(SUMMARIES_FOLDER, "previews")
+PREVIEW_CACHE_CONTROL = "public, max-age=604800"
+
 @app.get('/thumbnails/{filename}')
 async def get_thumbnail(filename: str):
-    thumb_path = os.path.join(SUMMARIES_FOLDER, filename)
-    if os.path.exists(thumb_path):
-        return FileResponse(thumb_path, media_type='image/jpeg')
-    return FileResponse('/path/to/default.jpg', media_type='image/jpeg')
+    # ✅ الصور المصغرة تُنشأ مسبقاً عند إنشاء الملخص، هنا نقدمها فقط مع ترويسات تخزين مؤقت
+    stem = os.path.splitext(os.path.basename(unquote(filename)))[0]
+    for thumb_path in (os.path.join(PREVIEWS_FOLDER, stem, "thumbnail.jpg"),
+                       os.path.join(SUMMARIES_FOLDER, f"{stem}.jpg")):
+        if os.path.isfile(thumb_path):
+            return FileResponse(thumb_path, media_type='image/jpeg',
+                                headers={"Cache-Control": PREVIEW_CACHE_CONTROL})
+    return RedirectResponse(PLACEHOLDER_THUMBNAIL_URL)
+
+@app.get("/previews/{summary}/{filename}")
+async def get_preview_file(summary: str, filename: str):
+    media_types = {"sprite.jpg": "image/jpeg", "thumbs.vtt": "text/vtt", "thumbnail.jpg": "image/jpeg"}
+    file_path = os.path.join(PREVIEWS_FOLDER, os.path.basename(unquote(summary)), filename)
+    if filename not in media_types or not os.path.isfile(file_path):
+        raise HTTPException(status_code=404, detail="File not found")
+    return FileResponse(file_path, media_type=media_types[filename],
+                        headers={"Cache-Control": PREVIEW_CACHE_CONTROL})
 
 @app.get("/summaries")
-async def get_summaries():
+async def get_summaries(page: int = 1, page_size: int = 50, q: str = None, since: str = None, until: str = None):
     try:
+        # ✅ الإجابة من الفهرس مباشرة بدون مسح المجلد أو تشغيل ffmpeg أثناء الطلب
+        page = max(page, 1)
+        page_size = min(max(page_size, 1), 500)
+        since_ts = datetime.datetime.fromisoformat(since).timestamp() if since else None
+        until_ts = datetime.datetime.fromisoformat(until).timestamp() if until else None
+
+        rows = SUMMARY_CATALOG.list(page=page, page_size=page_size, query=q, since=since_ts, until=until_ts)
+        total = SUMMARY_CATALOG.count(query=q, since=since_ts, until=until_ts)
+
         summaries = []
-        if not os.path.exists(SUMMARIES_FOLDER):
-            return []
-
-        for filename in os.listdir(SUMMARIES_FOLDER):
-            if filename.endswith((".mp4", ".avi", ".mov", ".mkv")):
-                path = os.path.join(SUMMARIES_FOLDER, filename)
-                size = os.path.getsize(path)
-                minutes = round(size / (1024 * 1024 * 5), 2)
-
-                encoded_filename = quote(filename)
-                video_url = f'http://192.168.84.116:8000/video?name={encoded_filename}'
-
-                thumb_name = f'{os.path.splitext(filename)[0]}.jpg'
-                thumb_path = os.path.join(SUMMARIES_FOLDER, thumb_name)
-                generate_thumbnail(path, thumb_path)
-                thumbnail_url = f'http://192.168.84.116:8000/thumbnails/{quote(thumb_name)}'
-                if not os.path.exists(thumb_path):
-                    thumbnail_url = 'https://via.placeholder.com/320x180.png?text=No+Thumbnail'
-
-                summaries.append({
-                    'title': filename,
-                    'description': f'ملخص {filename}',
-                    'date': datetime.datetime.now().strftime('%Y-%m-%d'),
-                    'duration': f'{int(minutes)}:{int((minutes % 1) * 60):02d}',
-                    'video_url': video_url,
-                    'thumbnail_url': thumbnail_url
-                })
-        return summaries
+        for row in rows:
+            filename = row['filename']
+            video_url = f'http://192.168.84.116:8000/video?name={quote(filename)}'
+
+            stem = os.path.splitext(filename)[0]
+            thumbnail_url = PLACEHOLDER_THUMBNAIL_URL
+            if row['thumbnail_path']:
+                thumbnail_url = f'http://192.168.84.116:8000/thumbnails/{quote(stem)}.jpg'
+
+            preview_vtt_url = None
+            if os.path.exists(os.path.join(PREVIEWS_FOLDER, stem, "thumbs.vtt")):
+                preview_vtt_url = f'http://192.168.84.116:8000/previews/{quote(stem)}/thumbs.vtt'
+
+            hls_name = stem
+            hls_url = None
+            if os.path.exists(os.path.join(HLS_FOLDER, hls_name, "master.m3u8")):
+                hls_url = f'http://192.168.84.116:8000/hls/{quote(hls_name)}/master.m3u8'
+
+            summaries.append({
+                'title': filename,
+                'description': f'ملخص {filename}',
+                'date': datetime.datetime.fromtimestamp(row['created_at']).strftime('%Y-%m-%d'),
+                'duration': format_duration(row['duration']),
+                'video_url': video_url,
+                'thumbnail_url': thumbnail_url,
+                'hls_url': hls_url,
+                'preview_vtt_url': preview_vtt_url,
+                'moment_count': row['moment_count']
+            })
+        return JSONResponse(content=summaries, headers={"X-Total-Count": str(total)})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error getting summaries: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -238,19 +324,20 @@ async def download_video_endpoint(data: dict = Body(...)):
         raise HTTPException(status_code=500, detail=result.get('error', 'Unknown error'))
 
     try:
-        # تنفيذ التلخيص
+        # تنفيذ التلخيص على الملف الذي تم تنزيله فعلاً (وليس أحدث ملف في المجلد)
+        video_path = result.get('filepath')
+        if not video_path or not os.path.exists(video_path):
+            raise FileNotFoundError("❌ لم يتم العثور على الفيديو الذي تم تنزيله.")
+
         logger.info("🔁 Starting summarization...")
-        summarize()
+        # حجم نموذج Whisper يمكن اختياره لكل طلب (مثلاً small للمباريات الطويلة)
+        await run_in_threadpool(summarize, video_path, whisper_model_size=data.get('whisper_model'))
         logger.info("✅ Summarization completed.")
 
-        # حذف أحدث فيديو تم تنزيله
-        video_files = [f for f in os.listdir(VIDEO_FOLDER) if f.endswith((".mp4", ".mkv", ".avi"))]
-        if video_files:
-            latest_video_path = max([os.path.join(VIDEO_FOLDER, f) for f in video_files], key=os.path.getmtime)
-            os.remove(latest_video_path)
-            logger.info(f"🗑️ Deleted downloaded video: {latest_video_path}")
-        else:
-            logger.warning("⚠️ No video found to delete after summarization.")
+        # حذف الفيديو الذي تم تنزيله لهذه المهمة فقط، مع فهرس إطاراته المفتاحية
+        os.remove(video_path)
+        KeyframeIndex(video_path).remove_cache()
+        logger.info(f"🗑️ Deleted downloaded video: {video_path}")
 
         return {
             "success": True,
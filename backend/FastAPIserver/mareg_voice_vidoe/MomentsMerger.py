@@ -1,4 +1,5 @@
 import json
+import bisect
 import cv2
 from typing import List, Dict
 
@@ -29,6 +30,11 @@ class ImportantMomentsMerger:
         cap.release()
 
     def load_data(self):
+        self.load_video_data()
+        with open(self.audio_json_path, 'r', encoding='utf-8') as f:
+            self.audio_moments = json.load(f)
+
+    def load_video_data(self):
         with open(self.video_json_path, 'r', encoding='utf-8') as f:
             all_moments = json.load(f)
             self.video_moments = [
@@ -36,8 +42,20 @@ class ImportantMomentsMerger:
                 if moment.get("confidence", 0) > 0
             ]
 
-        with open(self.audio_json_path, 'r', encoding='utf-8') as f:
-            self.audio_moments = json.load(f)
+    @staticmethod
+    def needs_audio(moment: Dict) -> bool:
+        """فرصة/هدف بدون ركلات ترجيح لا تُقبل إلا بتأكيد صوتي (نفس شرط filter_and_merge)."""
+        labels = moment.get("events", [])
+        return (not any("ركلات ترجيح" in e for e in labels)
+                and any("فرصة خطيرة أو هدف" in e for e in labels))
+
+    def run_video_only(self, output_path: str):
+        """لحظات الفيديو التي ستبقى في الملخص مهما كانت نتيجة الصوت، قبل انتهاء Whisper (للنشر المبكر)."""
+        self.load_fps_from_video()
+        self.load_video_data()
+        self.processed_video_moments = self.process_video_moments()
+        self.merged_moments = [m for m in self.processed_video_moments if not self.needs_audio(m)]
+        self.save_output(output_path)
 
     def convert_frames_to_seconds(self, frame: int) -> float:
         return frame / self.fps
@@ -74,34 +92,57 @@ class ImportantMomentsMerger:
             for moment in merged_video
         ]
 
+    def build_audio_index(self):
+        """ترتيب اللحظات الصوتية مرة واحدة حسب البداية حتى يكون البحث عن المتقاطعات بـ bisect بدل المرور على الكل."""
+        order = sorted(range(len(self.audio_moments)), key=lambda i: self.audio_moments[i]["start"])
+        self._audio_order = order
+        self._audio_starts = [self.audio_moments[i]["start"] for i in order]
+        lengths = [a["end"] - a["start"] for a in self.audio_moments]
+        # أطول مدة (وأكبر مدة معكوسة إن وُجدت end < start) تحدد حدود نافذة البحث
+        self._audio_max_len = max([0] + lengths)
+        self._audio_max_inverted = max([0] + [-l for l in lengths])
+        self._audio_indexed = self.audio_moments
+
+    @staticmethod
+    def _is_near(audio: Dict, video_moment: Dict, gap: float) -> bool:
+        # إذا تقاطع زمنياً أو قريب ضمن العتبة
+        return (
+            abs(audio["start"] - video_moment["end"]) <= gap or
+            abs(audio["end"] - video_moment["start"]) <= gap or
+            (audio["start"] <= video_moment["end"] and audio["end"] >= video_moment["start"])
+        )
+
+    def audio_indices_near(self, video_moment: Dict, gap: float) -> List[int]:
+        """فهارس اللحظات الصوتية القريبة بترتيبها الأصلي. المرشحون هم من تقع بدايتهم في
+        [start - gap - أطول مدة، end + gap] ثم يطبق نفس الشرط الدقيق عليهم."""
+        if getattr(self, "_audio_indexed", None) is not self.audio_moments:
+            self.build_audio_index()
+        v_start, v_end = video_moment["start"], video_moment["end"]
+        low = min(v_start - gap - self._audio_max_len, v_end - gap)
+        high = max(v_end, v_start + self._audio_max_inverted) + gap
+        # هامش صغير حتى لا يُستبعد مرشح بسبب تقريب الأعداد العشرية؛ الشرط الدقيق يحسم بعده
+        eps = 1e-9 * (1.0 + abs(low) + abs(high))
+        lo = bisect.bisect_left(self._audio_starts, low - eps)
+        hi = bisect.bisect_right(self._audio_starts, high + eps)
+        return sorted(
+            i for i in self._audio_order[lo:hi]
+            if self._is_near(self.audio_moments[i], video_moment, gap)
+        )
+
     def find_audio_nearby(self, video_moment: Dict, gap: float) -> List[str]:
         """ترجع قائمة بالأحداث الصوتية القريبة زمنياً من لحظة الفيديو"""
-        matched_labels = []
-        for audio in self.audio_moments:
-            # إذا تقاطع زمنياً أو قريب ضمن العتبة
-            if (
-                abs(audio["start"] - video_moment["end"]) <= gap or
-                abs(audio["end"] - video_moment["start"]) <= gap or
-                (audio["start"] <= video_moment["end"] and audio["end"] >= video_moment["start"])
-            ):
-                matched_labels.append(audio["label"])
-        return matched_labels
+        return [self.audio_moments[i]["label"] for i in self.audio_indices_near(video_moment, gap)]
 
     def filter_and_merge(self):
         filtered = []
         used_audio_indices = set()
+        self.build_audio_index()
 
         for moment in self.processed_video_moments:
             labels = moment["events"]
-            merged_audio_labels = []
-            for i, audio in enumerate(self.audio_moments):
-                if (
-                    abs(audio["start"] - moment["end"]) <= self.merge_penalty_gap or
-                    abs(audio["end"] - moment["start"]) <= self.merge_penalty_gap or
-                    (audio["start"] <= moment["end"] and audio["end"] >= moment["start"])
-                ):
-                    merged_audio_labels.append(audio["label"])
-                    used_audio_indices.add(i)  # سجلنا هذه اللحظة الصوتية كمستخدمة
+            nearby = self.audio_indices_near(moment, self.merge_penalty_gap)
+            merged_audio_labels = [self.audio_moments[i]["label"] for i in nearby]
+            used_audio_indices.update(nearby)  # سجلنا هذه اللحظات الصوتية كمستخدمة
 
             has_penalty = any("ركلات ترجيح" in e for e in labels)
             has_chance_or_goal = any("فرصة خطيرة أو هدف" in e for e in labels)
@@ -122,16 +163,12 @@ class ImportantMomentsMerger:
                 filtered.append(moment)
 
         # ✅ نضيف كل اللحظات الصوتية من نوع "card" سواء تم دمجها أو لا
+        # (بداية، نهاية) لكل لحظة فيها صوت تمت إضافتها، بدل المرور على filtered لكل بطاقة
+        added_audio_spans = {(m["start"], m["end"]) for m in filtered if "audio" in m["type"]}
         for i, audio in enumerate(self.audio_moments):
             if audio.get("label") == "card":
                 # نتأكد فقط ما تم إضافتها مسبقًا مع فيديو
-                already_added = any(
-                    audio["start"] == m["start"] and
-                    audio["end"] == m["end"] and
-                    "audio" in m["type"]
-                    for m in filtered
-                )
-                if not already_added:
+                if (audio["start"], audio["end"]) not in added_audio_spans:
                     filtered.append({
                         "start": audio["start"],
                         "end": audio["end"],
@@ -139,6 +176,7 @@ class ImportantMomentsMerger:
                         "events": [audio["label"]],
                         "text": audio.get("text", "")
                     })
+                    added_audio_spans.add((audio["start"], audio["end"]))
 
         return filtered
 
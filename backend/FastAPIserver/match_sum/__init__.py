@@ -1 +1,3 @@
-from .match_sumrazion import MatchSummarizer
\ No newline at end of file
+from .match_sumrazion import MatchSummarizer
+from .keyframes import KeyframeIndex
+from .progressive import ProgressivePublisher, live_dir_for
\ No newline at end of file
@@ -0,0 +1,188 @@
+import os
+import json
+import bisect
+import subprocess
+
+# مطابقة ترميز المصدر عند إعادة ترميز أطراف المقاطع حتى يعمل الدمج بـ concat copy
+ENCODERS = {
+    "h264": "libx264",
+    "hevc": "libx265",
+}
+# ملفات التعريف التي يمكن للمرمّز إنتاجها بنفس اسمها في ffprobe (غيرها ← القص بـ copy)
+PROFILES = {
+    "h264": {
+        "Constrained Baseline": "baseline",
+        "Baseline": "baseline",
+        "Main": "main",
+        "High": "high",
+        "High 10": "high10",
+        "High 4:2:2": "high422",
+        "High 4:4:4 Predictive": "high444",
+    },
+    "hevc": {
+        "Main": "main",
+        "Main 10": "main10",
+        "Main Still Picture": "mainstillpicture",
+    },
+}
+AUDIO_ENCODERS = {
+    "aac": "aac",
+    "opus": "libopus",
+    "mp3": "libmp3lame",
+    "vorbis": "libvorbis",
+    "ac3": "ac3",
+}
+
+
+class KeyframeIndex:
+    """فهرس الإطارات المفتاحية للفيديو المصدر. يُبنى مرة واحدة بـ ffprobe ويُخزن في ملف JSON."""
+
+    # يُرفع عند تغيير الحقول المقروءة من ffprobe حتى لا يُستخدم فهرس قديم ناقص
+    CACHE_VERSION = 2
+
+    def __init__(self, video_path, cache_dir=None):
+        self.video_path = video_path
+        self.cache_dir = cache_dir or os.path.join(os.path.dirname(os.path.abspath(video_path)), ".keyframes")
+        self.keyframes = []
+        self.stream_info = {}
+
+    @property
+    def cache_path(self):
+        return os.path.join(self.cache_dir, os.path.basename(self.video_path) + ".json")
+
+    def remove_cache(self):
+        """حذف فهرس الفيديو (ومجلد .keyframes إذا أصبح فارغاً). يُستدعى عند حذف الفيديو المصدر."""
+        if os.path.exists(self.cache_path):
+            os.remove(self.cache_path)
+        if os.path.isdir(self.cache_dir) and not os.listdir(self.cache_dir):
+            os.rmdir(self.cache_dir)
+
+    def _source_key(self):
+        st = os.stat(self.video_path)
+        return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+    def load_or_build(self):
+        if os.path.exists(self.cache_path):
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+            if cached.get("source") == self._source_key() and cached.get("version") == self.CACHE_VERSION:
+                self.keyframes = cached["keyframes"]
+                self.stream_info = cached["stream_info"]
+                return self
+
+        self.build()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(self.cache_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "version": self.CACHE_VERSION,
+                "source": self._source_key(),
+                "stream_info": self.stream_info,
+                "keyframes": self.keyframes,
+            }, f)
+        return self
+
+    def build(self):
+        print("🔑 بناء فهرس الإطارات المفتاحية...")
+        # قراءة الحزم فقط (بدون فك ترميز) أسرع بكثير من -skip_frame nokey
+        cmd = [
+            "ffprobe", "-v", "error",
+            "-select_streams", "v:0",
+            "-show_entries", "packet=pts_time,flags",
+            "-of", "csv=p=0",
+            self.video_path
+        ]
+        output = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
+
+        keyframes = []
+        for line in output.splitlines():
+            parts = line.strip().split(",")
+            if len(parts) < 2 or parts[0] in ("", "N/A"):
+                continue
+            if "K" in parts[1]:
+                keyframes.append(float(parts[0]))
+        self.keyframes = sorted(keyframes)
+        self.stream_info = self._probe_streams()
+        print(f"✅ تم العثور على {len(self.keyframes)} إطار مفتاحي")
+
+    def _probe_streams(self):
+        cmd = [
+            "ffprobe", "-v", "error",
+            "-show_entries", "stream=codec_type,codec_name,codec_tag_string,pix_fmt,profile,level,time_base,"
+                                     "sample_rate,channels",
+            "-of", "json",
+            self.video_path
+        ]
+        streams = json.loads(subprocess.run(cmd, capture_output=True, text=True, check=True).stdout)["streams"]
+        info = {}
+        for stream in streams:
+            if stream.get("codec_type") in ("video", "audio") and stream["codec_type"] not in info:
+                info[stream["codec_type"]] = stream
+        return info
+
+    def next_keyframe(self, t):
+        """أول إطار مفتاحي عند t أو بعده."""
+        i = bisect.bisect_left(self.keyframes, t)
+        return self.keyframes[i] if i < len(self.keyframes) else None
+
+    def prev_keyframe(self, t):
+        """آخر إطار مفتاحي عند t أو قبله."""
+        i = bisect.bisect_right(self.keyframes, t)
+        return self.keyframes[i - 1] if i > 0 else None
+
+    def split(self, start, end):
+        """تقسيم المقطع إلى أجزاء: رأس يُعاد ترميزه، وسط يُنسخ كما هو (GOPs كاملة)، وذيل يُعاد ترميزه."""
+        k1 = self.next_keyframe(start)
+        k2 = self.prev_keyframe(end)
+        if k1 is None or k2 is None or k1 >= k2:
+            # لا يوجد GOP كامل داخل المقطع → نعيد ترميز المقطع كله (قصير بطبيعته)
+            return [(start, end, "encode")]
+
+        parts = []
+        if k1 > start:
+            parts.append((start, k1, "encode"))
+        parts.append((k1, k2, "copy"))
+        if end > k2:
+            parts.append((k2, end, "encode"))
+        return parts
+
+    def supports_smart_cut(self):
+        """الأطراف المعاد ترميزها تُدمج مع الأوساط المنسوخة فقط إذا كان لدينا مرمّز بنفس ترميز المصدر
+        (فيديو وصوت) وبنفس ملف التعريف والمستوى. VP9/AV1 من yt-dlp مثلاً غير مدعوم ← القص بـ copy."""
+        video = self.stream_info.get("video", {})
+        audio = self.stream_info.get("audio")
+        codec = video.get("codec_name")
+        return (codec in ENCODERS
+                and video.get("profile") in PROFILES[codec]
+                and (video.get("level") or 0) > 0
+                and (not audio or audio.get("codec_name") in AUDIO_ENCODERS))
+
+    def encode_args(self):
+        """معاملات إعادة الترميز المطابقة للمصدر (يُفترض أن supports_smart_cut() صحيحة)."""
+        video = self.stream_info.get("video", {})
+        audio = self.stream_info.get("audio", {})
+        codec = video["codec_name"]
+        args = ["-c:v", ENCODERS[codec], "-preset", "veryfast", "-crf", "18",
+                "-profile:v", PROFILES[codec][video["profile"]]]
+        # ffprobe يعطي level لـ h264 ×10 (40 = 4.0) ولـ hevc ×30 (120 = 4.0)
+        if codec == "h264":
+            args += ["-level:v", f"{video['level'] / 10:g}"]
+        else:
+            args += ["-x265-params", f"level-idc={video['level'] / 30:g}"]
+        if video.get("codec_tag_string") in ("avc1", "avc3", "hvc1", "hev1"):
+            args += ["-tag:v", video["codec_tag_string"]]
+        if video.get("pix_fmt"):
+            args += ["-pix_fmt", video["pix_fmt"]]
+        if audio:
+            args += ["-c:a", AUDIO_ENCODERS[audio["codec_name"]]]
+            if audio.get("sample_rate"):
+                args += ["-ar", str(audio["sample_rate"])]
+            if audio.get("channels"):
+                args += ["-ac", str(audio["channels"])]
+        return args + self.timescale_args()
+
+    def timescale_args(self):
+        """توحيد مقياس الزمن بين الأجزاء المنسوخة والمعاد ترميزها لتجنب أخطاء الطوابع الزمنية عند الدمج."""
+        time_base = self.stream_info.get("video", {}).get("time_base", "")
+        if time_base.startswith("1/"):
+            return ["-video_track_timescale", time_base[2:]]
+        return []
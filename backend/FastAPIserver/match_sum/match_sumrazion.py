@@ -1,44 +1,180 @@
 import os
 import json
+import shutil
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from .keyframes import KeyframeIndex
 
 class MatchSummarizer:
-    def __init__(self, video_path, moments_json, output_path, time_window=3):
+    # أقصر جزء جديد يستحق النشر في البث التدريجي (ثواني)
+    MIN_LIVE_SECONDS = 1.0
+
+    def __init__(self, video_path, moments_json, output_path, time_window=3, temp_dir="temp_clips",
+                 max_workers=None, merge_gap=0.0, cut_mode="copy", keyframe_cache_dir=None,
+                 publisher=None):
         self.video_path = video_path
         self.moments_json = moments_json
         self.output_path = output_path
         self.time_window = time_window
         self.moments = []
-        self.temp_dir = "temp_clips"
+        self.temp_dir = temp_dir
+        # عدد عمليات ffmpeg المتزامنة (القص بـ copy يعتمد على القرص أكثر من المعالج)
+        self.max_workers = max_workers or min(8, os.cpu_count() or 1)
+        self.merge_gap = merge_gap  # دمج المقاطع التي تفصلها فجوة أقل من هذه القيمة (ثواني)
+        # "copy": قص سريع يلتصق بأقرب إطار مفتاحي، "smart": دقيق على مستوى الإطار مع إعادة ترميز الأطراف فقط
+        if cut_mode not in ("copy", "smart"):
+            raise ValueError(f"❌ cut_mode غير مدعوم: {cut_mode}")
+        self.cut_mode = cut_mode
+        self.keyframe_cache_dir = keyframe_cache_dir
+        self.keyframe_index = None
+        self.smart_cut = None  # يُحسم مرة واحدة: مرمّز مطابق + فك ترميز سليم لعينة مدمجة
+        # ProgressivePublisher اختياري لنشر المقاطع فور قصها (يبدأه المستدعي: start() أو start(resume=True))
+        self.publisher = publisher
 
     def load_important_frames(self):
         with open(self.moments_json, 'r', encoding='utf-8') as f:
             self.moments = json.load(f)
 
+    def build_windows(self):
+        """تحويل اللحظات إلى نوافذ زمنية مرتبة ودمج المتداخلة أو المتجاورة حتى لا تُقص مرتين."""
+        windows = sorted(
+            (max(moment["start"] - self.time_window, 0), moment["end"] + self.time_window)
+            for moment in self.moments
+        )
+
+        merged = []
+        for start, end in windows:
+            if merged and start <= merged[-1][1] + self.merge_gap:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        return [(start, end) for start, end in merged]
+
+    def cut_clip(self, start, end, clip_path, mode="copy"):
+        cmd = [
+            "ffmpeg",
+            "-y",
+            "-ss", str(start),
+            "-t", str(end - start),
+            "-i", self.video_path,
+        ]
+        if mode == "encode":
+            cmd += self.keyframe_index.encode_args()
+        else:
+            cmd += ["-c", "copy", "-avoid_negative_ts", "make_zero"]
+            if self.keyframe_index is not None:
+                cmd += self.keyframe_index.timescale_args()
+        cmd.append(clip_path)
+        result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return result.returncode
+
+    def verify_smart_cut(self, windows):
+        """فك ترميز كامل لأول نافذة مقسمة (رأس وذيل معاد ترميزهما + وسط منسوخ) بعد دمجها بـ concat كما في الملخص.
+        أي خطأ من المفكك يعني أن الأجزاء غير متوافقة عند نقاط الربط."""
+        pieces = next((p for p in (self.keyframe_index.split(s, e) for s, e in windows) if len(p) > 1), None)
+        if pieces is None:
+            return True
+
+        probe_dir = os.path.join(self.temp_dir, "smart_cut_probe")
+        os.makedirs(probe_dir, exist_ok=True)
+        try:
+            list_path = os.path.join(probe_dir, "list.txt")
+            with open(list_path, "w", encoding="utf-8") as list_file:
+                for j, (start, end, mode) in enumerate(pieces):
+                    name = f"part_{j}.mp4"
+                    if self.cut_clip(start, end, os.path.join(probe_dir, name), mode) != 0:
+                        return False
+                    list_file.write(f"file '{name}'\n")
+            result = subprocess.run(
+                ["ffmpeg", "-v", "error", "-f", "concat", "-safe", "0", "-i", list_path, "-f", "null", "-"],
+                capture_output=True, text=True
+            )
+            if result.stderr.strip():
+                print(result.stderr.strip().splitlines()[0])
+            return result.returncode == 0 and not result.stderr.strip()
+        finally:
+            shutil.rmtree(probe_dir, ignore_errors=True)
+
+    def plan_parts(self, windows, prefix="clip"):
+        """قائمة الأجزاء المطلوب قصها بالترتيب: (البداية، النهاية، الطريقة، اسم الملف، رقم النافذة)."""
+        parts = []
+        for i, (start, end) in enumerate(windows):
+            if self.smart_cut:
+                pieces = self.keyframe_index.split(start, end)
+            else:
+                pieces = [(start, end, "copy")]
+
+            if len(pieces) == 1:
+                parts.append((pieces[0][0], pieces[0][1], pieces[0][2], f"{prefix}_{i:04d}.mp4", i))
+            else:
+                for j, (part_start, part_end, mode) in enumerate(pieces):
+                    parts.append((part_start, part_end, mode, f"{prefix}_{i:04d}_{j}.mp4", i))
+        return parts
+
     def generate_clips_with_audio(self):
         os.makedirs(self.temp_dir, exist_ok=True)
         list_file_path = os.path.join(self.temp_dir, "clips_list.txt")
 
-        with open(list_file_path, "w", encoding="utf-8") as list_file:
-            for i, moment in enumerate(self.moments):
-                start = max(moment["start"] - self.time_window, 0)
-                end = moment["end"] + self.time_window
-                duration = end - start
-                clip_path = os.path.join(self.temp_dir, f"clip_{i:04d}.mp4")
-
-                cmd = [
-                    "ffmpeg",
-                    "-y",
-                    "-ss", str(start),
-                    "-t", str(duration),
-                    "-i", self.video_path,
-                    "-c", "copy",
-                    clip_path
-                ]
-                subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        windows = self.build_windows()
+        if len(windows) != len(self.moments):
+            print(f"🔗 تم دمج {len(self.moments)} لحظة في {len(windows)} مقطع بعد إزالة التداخل")
+
+        if self.cut_mode == "smart" and self.smart_cut is None:
+            if self.keyframe_index is None:
+                self.keyframe_index = KeyframeIndex(self.video_path, self.keyframe_cache_dir).load_or_build()
+            self.smart_cut = self.keyframe_index.supports_smart_cut()
+            if not self.smart_cut:
+                codecs = {k: (v.get("codec_name"), v.get("profile"), v.get("level"))
+                          for k, v in self.keyframe_index.stream_info.items()}
+                print(f"⚠️ لا يوجد مرمّز مطابق لترميز المصدر {codecs}: القص بـ copy بدل smart")
+            elif not self.verify_smart_cut(windows):
+                self.smart_cut = False
+                print("⚠️ فك ترميز عينة القص الدقيق فشل عند نقاط الربط: القص بـ copy بدل smart")
+
+        parts = self.plan_parts(windows)
+        clip_names = [name for _, _, _, name, _ in parts]
+
+        # ما لم يُنشر بعد من كل نافذة: نافذة جديدة بالكامل تُنشر مقاطعها كما هي، ونافذة منشورة جزئياً
+        # (وسّعتها لحظة صوتية حول لقطة من النشر المبكر) يُقص ويُنشر الجزء الجديد منها فقط حتى لا تتكرر اللقطات
+        fully_new, gaps, gap_window = set(), [], []
+        if self.publisher is not None:
+            for i, (start, end) in enumerate(windows):
+                uncovered = self.publisher.uncovered(start, end)
+                if uncovered == [(start, end)]:
+                    fully_new.add(i)
+                    continue
+                for gap in uncovered:
+                    if gap[1] - gap[0] > self.MIN_LIVE_SECONDS:
+                        gaps.append(gap)
+                        gap_window.append(i)
+        # أجزاء البث تُرتب بعد أجزاء نافذتها حتى يبقى النشر بالترتيب الزمني للمباراة
+        jobs = [(part, part[4], part[4] in fully_new) for part in parts]
+        for part in self.plan_parts(gaps, prefix="live"):
+            jobs.append((part, gap_window[part[4]], True))
+        jobs.sort(key=lambda job: job[1])  # ترتيب مستقر: داخل النافذة تبقى أجزاء الملخص ثم أجزاء البث
+
+        # القص يتم بالتوازي، لكن ترتيب القائمة ثابت حسب رقم المقطع
+        codes = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = [
+                pool.submit(self.cut_clip, start, end, os.path.join(self.temp_dir, name), mode)
+                for (start, end, mode, name, _), _, _ in jobs
+            ]
+            for future, ((_, _, _, name, index), window, publish) in zip(futures, jobs):
+                # ننتظر بالترتيب حتى يُنشر كل مقطع فور جاهزيته دون الإخلال بترتيب الملخص
+                codes[name] = future.result()
+                if publish and codes[name] == 0:
+                    published = windows[window] if window in fully_new else gaps[index]
+                    self.publisher.append(os.path.join(self.temp_dir, name), window=published)
 
+        failed = [name for name, code in codes.items() if code != 0]
+        if failed:
+            raise RuntimeError(f"❌ فشل قص {len(failed)} مقطع: {', '.join(failed[:5])}")
+
+        with open(list_file_path, "w", encoding="utf-8") as list_file:
+            for name in clip_names:
                 # اكتب فقط اسم الملف بدون مسار المجلد داخل قائمة الدمج
-                list_file.write(f"file 'clip_{i:04d}.mp4'\n")
+                list_file.write(f"file '{name}'\n")
 
         return list_file_path
 
@@ -52,9 +188,16 @@ class MatchSummarizer:
             "-c", "copy",
             self.output_path
         ]
-        subprocess.run(cmd)
+        # فشل الدمج يجب أن يُفشل المرحلة حتى لا يُسجل الملخص كمكتمل
+        subprocess.run(cmd, check=True)
         print(f"✅ تم حفظ ملخص المباراة في: {self.output_path}")
 
+    def publish(self):
+        """قص اللحظات ونشرها في البث التدريجي فقط، بدون دمج ملخص نهائي (النشر المبكر)."""
+        self.load_important_frames()
+        print(f"📡 نشر مبكر لـ {len(self.moments)} لحظة")
+        self.generate_clips_with_audio()
+
     def summarize(self):
         print("🔄 جاري تحميل اللحظات المهمة...")
         self.load_important_frames()
@@ -65,3 +208,6 @@ class MatchSummarizer:
 
         print("🎬 جاري دمج المقاطع في فيديو واحد...")
         self.concatenate_clips(list_file_path)
+
+        if self.publisher is not None:
+            self.publisher.finish()
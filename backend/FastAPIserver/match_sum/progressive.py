@@ -0,0 +1,139 @@
+import os
+import csv
+import json
+import math
+import subprocess
+
+
+def live_dir_for(summary_path):
+    """مجلد البث التدريجي لملخص: summarises/live/<اسم الملخص بدون الامتداد>/"""
+    stem = os.path.splitext(os.path.basename(summary_path))[0]
+    return os.path.join(os.path.dirname(os.path.abspath(summary_path)), "live", stem)
+
+
+class ProgressivePublisher:
+    """نشر المقاطع أولاً بأول في قائمة HLS من نوع EVENT حتى يمكن مشاهدة اللقطات قبل انتهاء الملخص كاملاً.
+    الحالة تُحفظ في state.json حتى تكمل مرحلة لاحقة (أو محاولة مستأنفة) نفس القائمة."""
+
+    def __init__(self, live_dir, segment_time=6):
+        self.live_dir = live_dir
+        self.segment_time = segment_time
+        self.playlist_path = os.path.join(live_dir, "index.m3u8")
+        self.state_path = os.path.join(live_dir, "state.json")
+        self.entries = []  # (اسم المقطع، المدة، هل يبدأ مقطع جديد)
+        self.windows = []  # [بداية، نهاية] بالثواني لكل مقطع منشور من المباراة
+        self.clip_count = 0
+        self.finished = False
+
+    def start(self, resume=False):
+        """resume=True يكمل القائمة المنشورة سابقاً بدل مسحها."""
+        os.makedirs(self.live_dir, exist_ok=True)
+        if resume and os.path.exists(self.state_path):
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            self.entries = [tuple(e) for e in state["entries"]]
+            self.windows = state["windows"]
+            self.clip_count = state["clip_count"]
+        else:
+            for name in os.listdir(self.live_dir):
+                os.remove(os.path.join(self.live_dir, name))
+        self.finished = False
+        self._write_playlist()
+        return self
+
+    def covers(self, start, end):
+        """هل المقطع [start, end] منشور مسبقاً بالكامل؟"""
+        return not self.uncovered(start, end)
+
+    def uncovered(self, start, end):
+        """أجزاء [start, end] غير المنشورة بعد (مثلاً نافذة نهائية وسّعتها لحظة صوتية حول لقطة منشورة مبكراً)."""
+        gaps = []
+        cursor = start
+        for s, e in sorted(self.windows):
+            if e <= cursor or s >= end:
+                continue
+            if s > cursor:
+                gaps.append((cursor, s))
+            cursor = max(cursor, e)
+        if cursor < end:
+            gaps.append((cursor, end))
+        return gaps
+
+    @property
+    def target_duration(self):
+        # يجب ألا يقل عن أطول جزء فعلي؛ القص بـ copy يقطع عند الإطارات المفتاحية فقد يتجاوز segment_time
+        return max([self.segment_time] + [math.ceil(duration) for _, duration, _ in self.entries])
+
+    def _save_state(self):
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"entries": self.entries, "windows": self.windows, "clip_count": self.clip_count}, f)
+        os.replace(tmp_path, self.state_path)
+
+    def _write_playlist(self):
+        lines = [
+            "#EXTM3U",
+            "#EXT-X-VERSION:3",
+            "#EXT-X-PLAYLIST-TYPE:EVENT",
+            f"#EXT-X-TARGETDURATION:{self.target_duration}",
+            "#EXT-X-MEDIA-SEQUENCE:0",
+        ]
+        for name, duration, discontinuity in self.entries:
+            if discontinuity:
+                lines.append("#EXT-X-DISCONTINUITY")
+            lines.append(f"#EXTINF:{duration:.3f},")
+            lines.append(name)
+        if self.finished:
+            lines.append("#EXT-X-ENDLIST")
+
+        # كتابة ذرية حتى لا يقرأ المشغل قائمة ناقصة
+        tmp_path = self.playlist_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, self.playlist_path)
+
+    def append(self, clip_path, window=None):
+        """تحويل مقطع mp4 جاهز إلى مقاطع TS (بدون إعادة ترميز) وإضافتها لنهاية القائمة.
+        window: (بداية، نهاية) المقطع في المباراة حتى لا يُنشر مرة أخرى لاحقاً."""
+        prefix = f"clip_{self.clip_count:04d}"
+        list_path = os.path.join(self.live_dir, f"{prefix}.csv")
+        cmd = [
+            "ffmpeg", "-y",
+            "-i", clip_path,
+            "-c", "copy",
+            "-f", "segment",
+            "-segment_time", str(self.segment_time),
+            "-segment_format", "mpegts",
+            "-segment_list", list_path,
+            "-segment_list_type", "csv",
+            os.path.join(self.live_dir, f"{prefix}_%03d.ts")
+        ]
+        result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        if result.returncode != 0:
+            raise RuntimeError(f"❌ فشل نشر المقطع: {clip_path}")
+
+        with open(list_path, newline="", encoding="utf-8") as f:
+            rows = list(csv.reader(f))
+        os.remove(list_path)
+
+        # مقطع أقدم زمنياً من المنشور (لقطة أكدها الصوت بعد النشر المبكر) لا يمكن إدراجه في وسط قائمة EVENT:
+        # يُضاف في النهاية بعد DISCONTINUITY كأي مقطع جديد، ونسجل ذلك صراحة
+        if window is not None and self.windows and window[0] < max(e for _, e in self.windows):
+            print(f"⏪ المقطع {window[0]:.1f}-{window[1]:.1f}ث أقدم من آخر مقطع منشور: يُضاف في نهاية البث")
+
+        for i, (name, seg_start, seg_end) in enumerate(rows):
+            duration = float(seg_end) - float(seg_start)
+            # كل مقطع من المباراة يبدأ بطوابع زمنية جديدة → DISCONTINUITY عند أول جزء منه
+            self.entries.append((name, duration, i == 0 and self.clip_count > 0))
+
+        self.clip_count += 1
+        if window is not None and list(window) not in self.windows:
+            self.windows.append(list(window))
+        self._save_state()
+        self._write_playlist()
+        print(f"📡 تم نشر المقطع {self.clip_count} ({len(rows)} جزء)")
+
+    def finish(self):
+        self.finished = True
+        self._write_playlist()
+        print(f"✅ اكتمل البث التدريجي: {self.playlist_path}")
@@ -0,0 +1,4 @@
+from .dag import Stage, StageRunner, file_fingerprint
+from .stages import build_pipeline
+from .scheduler import PipelineScheduler, run_audio_branch, run_video_branch
+from .batch import BatchScheduler
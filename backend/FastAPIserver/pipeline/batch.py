@@ -0,0 +1,184 @@
+import os
+import json
+import time
+import queue
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+from .stages import build_pipeline
+from .scheduler import _limit_cpu
+
+
+def _audio_worker(tasks, results, model_path, options, num_threads):
+    """عملية صوتية واحدة لكل الدفعة: Whisper والمصنف يُحملان مرة واحدة وتُعالج المباريات بالترتيب."""
+    _limit_cpu(num_threads)
+    models = {}
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        index, video_file, ws, output_file = task
+        started = time.time()
+        try:
+            build_pipeline(video_file, ws, output_file, model_path, models=models, **options).run(group="audio")
+            results.put((index, None, started, time.time()))
+        except Exception as e:
+            results.put((index, f"{type(e).__name__}: {e}", started, time.time()))
+    for model in models.values():
+        if hasattr(model, "close"):
+            model.close()
+
+
+class BatchScheduler:
+    """تلخيص عدة مباريات بنماذج محملة مرة واحدة مع تداخل المراحل بين المباريات:
+    - عملية صوتية دائمة تفرغ كل المباريات بالترتيب (Whisper للمباراة B يعمل أثناء كشف A)
+    - استخراج إطارات المباراة التالية مسبقاً أثناء الكشف على الحالية
+    - الدمج والقص و HLS في خيوط منفصلة حتى لا تؤخر المباراة التالية"""
+
+    def __init__(self, scheduler, jobs_root, keep_workspace=False, final_workers=2):
+        self.scheduler = scheduler  # PipelineScheduler: نفس الإعدادات وتوزيع الأنوية لمباراة واحدة
+        self.jobs_root = jobs_root
+        self.keep_workspace = keep_workspace
+        self.final_workers = final_workers
+        self.models = {}
+        self.report = {}
+
+    @staticmethod
+    def _decode_stages(runner):
+        # الاستخراج المسبق فقط عندما لا يعتمد على مرحلة أخرى (في الوضع التكيفي يحتاج YOLO)
+        stage = runner.stages.get("extract_frames")
+        return {"extract_frames"} if stage is not None and not stage.deps else set()
+
+    def _wait_audio(self, index, results, audio_proc, audio_done):
+        while index not in audio_done:
+            try:
+                done_index, error, started, finished = results.get(timeout=5)
+            except queue.Empty:
+                if not audio_proc.is_alive():
+                    raise RuntimeError(f"❌ توقفت العملية الصوتية (exit code {audio_proc.exitcode})")
+                continue
+            audio_done[done_index] = (error, started, finished)
+        return audio_done[index]
+
+    def _finalize(self, match):
+        started = time.time()
+        match["runner"].run(group="final")
+        match["timings"]["final"] = time.time() - started
+        if not self.keep_workspace:
+            match["ws"].cleanup()
+
+    def run(self, items):
+        """items: قائمة (مسار الفيديو، مسار الملخص). ترجع تقرير الدفعة."""
+        from workspace import JobWorkspace
+
+        t0 = time.time()
+        matches = []
+        for video_file, output_file in items:
+            ws = JobWorkspace.for_video(self.jobs_root, video_file, keep=self.keep_workspace).create()
+            os.makedirs(os.path.dirname(os.path.abspath(output_file)), exist_ok=True)
+            matches.append({
+                "video": video_file,
+                "output": output_file,
+                "ws": ws,
+                "runner": self.scheduler.build(video_file, ws, output_file, models=self.models),
+                "timings": {},
+                "error": None,
+            })
+
+        ctx = multiprocessing.get_context("spawn")
+        tasks, results = ctx.Queue(), ctx.Queue()
+        for i, m in enumerate(matches):
+            tasks.put((i, m["video"], m["ws"], m["output"]))
+        tasks.put(None)
+        audio_proc = ctx.Process(
+            target=_audio_worker,
+            args=(tasks, results, self.scheduler.model_path, self.scheduler.pipeline_options(),
+                  self.scheduler.audio_threads),
+            name="batch-audio",
+        )
+        audio_proc.start()
+        print(f"🎧 العملية الصوتية للدفعة بدأت ({len(matches)} مباراة، {self.scheduler.audio_threads} أنوية)")
+
+        def decode(m):
+            started = time.time()
+            m["runner"].run(group="video", names=self._decode_stages(m["runner"]))
+            m["timings"]["decode"] = time.time() - started
+
+        audio_done = {}
+        finals = []
+        with ThreadPoolExecutor(1) as decode_pool, ThreadPoolExecutor(self.final_workers) as final_pool:
+            prefetch = {0: decode_pool.submit(decode, matches[0])} if matches else {}
+            for i, m in enumerate(matches):
+                if i + 1 < len(matches):
+                    prefetch[i + 1] = decode_pool.submit(decode, matches[i + 1])
+                print(f"🎬 [{i + 1}/{len(matches)}] {os.path.basename(m['video'])}")
+                try:
+                    prefetch[i].result()
+                    started = time.time()
+                    m["runner"].run(group="video")
+                    m["timings"]["video"] = time.time() - started
+
+                    started = time.time()
+                    error, audio_start, audio_end = self._wait_audio(i, results, audio_proc, audio_done)
+                    m["timings"]["audio_wait"] = time.time() - started
+                    m["timings"]["audio"] = audio_end - audio_start
+                    if error:
+                        raise RuntimeError(f"❌ فشل الفرع الصوتي: {error}")
+                except Exception as e:
+                    m["error"] = str(e)
+                    print(f"⚠️ فشلت المباراة {m['video']}: {e} (تم الاحتفاظ بمجلد المهمة للاستئناف)")
+                    continue
+                finals.append((m, final_pool.submit(self._finalize, m)))
+
+            for m, future in finals:
+                try:
+                    future.result()
+                    m["timings"]["finished_at"] = time.time() - t0
+                except Exception as e:
+                    m["error"] = str(e)
+                    print(f"⚠️ فشل التلخيص النهائي للمباراة {m['video']}: {e}")
+
+        audio_proc.join()
+        self.report = self.build_report(matches, time.time() - t0)
+        return self.report
+
+    @staticmethod
+    def build_report(matches, wall_seconds):
+        from catalog import probe_duration
+
+        per_match = []
+        busy = 0.0
+        media_seconds = 0.0
+        for m in matches:
+            timings = {k: round(v, 1) for k, v in m["timings"].items()}
+            busy += sum(v for k, v in m["timings"].items() if k in ("decode", "video", "audio", "final"))
+            duration = probe_duration(m["video"]) or 0.0
+            media_seconds += duration
+            per_match.append({
+                "video": m["video"],
+                "summary": m["output"] if m["error"] is None else None,
+                "duration_seconds": round(duration, 1),
+                "timings": timings,
+                "error": m["error"],
+            })
+        succeeded = sum(1 for m in matches if m["error"] is None)
+        return {
+            "matches": len(matches),
+            "succeeded": succeeded,
+            "failed": len(matches) - succeeded,
+            "wall_seconds": round(wall_seconds, 1),
+            "matches_per_hour": round(succeeded * 3600 / wall_seconds, 2) if wall_seconds else 0.0,
+            "realtime_factor": round(media_seconds / wall_seconds, 2) if wall_seconds else 0.0,
+            # مجموع أزمنة المراحل كما لو شُغلت بالتتابع ÷ الزمن الفعلي = مكسب التداخل بين المباريات
+            "stage_seconds": round(busy, 1),
+            "overlap_speedup": round(busy / wall_seconds, 2) if wall_seconds else 0.0,
+            "per_match": per_match,
+        }
+
+    def save_report(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report, f, ensure_ascii=False, indent=2)
+        r = self.report
+        print(f"📊 الدفعة: {r['succeeded']}/{r['matches']} مباراة في {r['wall_seconds']}ث "
+              f"({r['matches_per_hour']} مباراة/ساعة، {r['realtime_factor']}x الزمن الحقيقي، "
+              f"تداخل {r['overlap_speedup']}x)")
+        print(f"💾 تقرير الدفعة: {path}")
@@ -0,0 +1,155 @@
+import os
+import json
+import time
+import hashlib
+
+
+def file_fingerprint(path, sample_size=1024 * 1024):
+    """بصمة سريعة لملف أو مجلد: الحجم + وقت التعديل + hash لأول وآخر 1MB.
+    لا نحسب hash كامل لأن ملف المباراة قد يكون عدة جيجابايت."""
+    if not os.path.exists(path):
+        return None
+
+    if os.path.isdir(path):
+        h = hashlib.sha256()
+        count = 0
+        total = 0
+        for name in sorted(os.listdir(path)):
+            st = os.stat(os.path.join(path, name))
+            h.update(f"{name}:{st.st_size}".encode("utf-8"))
+            count += 1
+            total += st.st_size
+        return {"type": "dir", "count": count, "size": total, "sha256": h.hexdigest()}
+
+    st = os.stat(path)
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        h.update(f.read(sample_size))
+        if st.st_size > sample_size:
+            f.seek(max(st.st_size - sample_size, sample_size))
+            h.update(f.read(sample_size))
+    return {"type": "file", "size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": h.hexdigest()}
+
+
+class Stage:
+    def __init__(self, name, func, inputs=(), outputs=(), params=None, deps=(), group=None):
+        self.name = name
+        self.func = func            # تُستدعى بدون معاملات
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.params = params or {}
+        self.deps = list(deps)
+        self.group = group          # يسمح بتشغيل مجموعة من المراحل فقط (مثلاً الفرع الصوتي)
+
+
+class StageRunner:
+    """مشغّل DAG صغير: يسجل manifest لكل مرحلة مكتملة ويستأنف من أول مرحلة غير صالحة."""
+
+    def __init__(self, manifest_dir):
+        self.manifest_dir = manifest_dir
+        self.stages = {}  # بترتيب الإضافة
+        os.makedirs(self.manifest_dir, exist_ok=True)
+
+    def add(self, stage):
+        if stage.name in self.stages:
+            raise ValueError(f"❌ المرحلة {stage.name} معرّفة مسبقاً.")
+        for dep in stage.deps:
+            if dep not in self.stages:
+                raise ValueError(f"❌ المرحلة {stage.name} تعتمد على مرحلة غير معرّفة: {dep}")
+        self.stages[stage.name] = stage
+        return stage
+
+    def _manifest_path(self, name):
+        return os.path.join(self.manifest_dir, f"{name}.json")
+
+    def load_manifest(self, name):
+        path = self._manifest_path(name)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def invalidate(self, name):
+        path = self._manifest_path(name)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def is_valid(self, name):
+        stage = self.stages[name]
+        manifest = self.load_manifest(name)
+        if manifest is None:
+            return False
+        if manifest.get("params") != stage.params:
+            return False
+        if any(not self.is_valid(dep) for dep in stage.deps):
+            return False
+        for path in stage.inputs:
+            if manifest["inputs"].get(path) != file_fingerprint(path):
+                return False
+        for path in stage.outputs:
+            # مخرج غير موجود (بصمة None) لا يُعتبر مكتملاً حتى لو سُجل كذلك في manifest قديم
+            fingerprint = file_fingerprint(path)
+            if fingerprint is None or manifest["outputs"].get(path) != fingerprint:
+                return False
+        return True
+
+    def _write_manifest(self, stage, inputs, started):
+        manifest = {
+            "stage": stage.name,
+            "params": stage.params,
+            "inputs": inputs,
+            "outputs": {path: file_fingerprint(path) for path in stage.outputs},
+            "started_at": started,
+            "completed_at": time.time(),
+        }
+        # كتابة ذرية حتى لا يبقى manifest ناقص إذا انقطعت العملية
+        tmp_path = self._manifest_path(stage.name) + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self._manifest_path(stage.name))
+
+    def run(self, group=None, force=(), names=None):
+        """تشغيل المراحل بترتيب الاعتماديات. group=None يشغّل كل المراحل، و names يقصرها على مراحل محددة."""
+        rerun = set()
+        for name, stage in self.stages.items():
+            if group is not None and stage.group != group:
+                continue
+            if names is not None and name not in names:
+                continue
+
+            upstream_rerun = any(dep in rerun for dep in stage.deps)
+            if name not in force and not upstream_rerun and self.is_valid(name):
+                print(f"⏭️ المرحلة {name} مكتملة مسبقاً، تخطي.")
+                continue
+
+            for dep in stage.deps:
+                if dep not in rerun and not self.is_valid(dep):
+                    raise RuntimeError(f"❌ لا يمكن تشغيل {name}: المرحلة {dep} غير مكتملة.")
+
+            self.invalidate(name)
+            print(f"▶️ تشغيل المرحلة: {name}")
+            started = time.time()
+            # نسجل بصمات المدخلات قبل التشغيل حتى نكتشف أي تغيير أثناء التنفيذ
+            inputs = {path: file_fingerprint(path) for path in stage.inputs}
+            stage.func()
+            missing = [path for path in stage.outputs if not os.path.exists(path)]
+            if missing:
+                # لا نسجل المرحلة كمكتملة حتى يُعاد تشغيلها في المحاولة التالية
+                raise RuntimeError(f"❌ المرحلة {name} انتهت بدون إنشاء مخرجاتها: {', '.join(missing)}")
+            self._write_manifest(stage, inputs, started)
+            rerun.add(name)
+        return rerun
+
+    def graph(self):
+        """وصف الـ DAG الحالي مع حالة كل مرحلة (للفحص والتصحيح)."""
+        return {
+            name: {
+                "group": stage.group,
+                "deps": stage.deps,
+                "inputs": stage.inputs,
+                "outputs": stage.outputs,
+                "params": stage.params,
+                "valid": self.is_valid(name),
+            }
+            for name, stage in self.stages.items()
+        }
@@ -0,0 +1,140 @@
+import os
+import time
+import multiprocessing
+from .stages import build_pipeline
+
+
+def _limit_cpu(num_threads):
+    """تحديد عدد الأنوية المتاحة للعملية الحالية (أنوية torch و affinity إن وُجدت)."""
+    if not num_threads:
+        return
+    os.environ["OMP_NUM_THREADS"] = str(num_threads)
+    os.environ["MKL_NUM_THREADS"] = str(num_threads)
+    try:
+        import torch
+        torch.set_num_threads(num_threads)
+    except ImportError:
+        pass
+    if hasattr(os, "sched_setaffinity"):
+        cpus = sorted(os.sched_getaffinity(0))
+        # نأخذ آخر الأنوية حتى لا نتصادم مع عمليات استخراج الإطارات التي تبدأ من الأول
+        os.sched_setaffinity(0, set(cpus[-num_threads:]))
+
+
+def _has_cuda():
+    try:
+        import torch
+        return torch.cuda.is_available()
+    except ImportError:
+        return False
+
+
+def run_video_branch(runner):
+    """الفرع المرئي: استخراج الإطارات ← الكشف ← التتبع ← تعويض الكرة ← اللحظات المهمة."""
+    return runner.run(group="video")
+
+
+def run_audio_branch(video_file, ws, output_file, model_path, whisper_model_size="medium", num_threads=None,
+                     whisper_workers=1, whisper_backend="openai", audio_excitement=True, whisper_scope="full",
+                     whisper_language="ar", classifier_prefilter=False, classifier_backend="torch"):
+    """الفرع الصوتي: استخراج الصوت ← Whisper ← تصنيف اللحظات. يعمل داخل عملية مستقلة."""
+    _limit_cpu(num_threads)
+    runner = build_pipeline(video_file, ws, output_file, model_path, whisper_model_size=whisper_model_size,
+                            whisper_workers=whisper_workers, whisper_backend=whisper_backend,
+                            audio_excitement=audio_excitement, whisper_scope=whisper_scope,
+                            whisper_language=whisper_language, classifier_prefilter=classifier_prefilter,
+                            classifier_backend=classifier_backend)
+    return runner.run(group="audio")
+
+
+class PipelineScheduler:
+    """يشغّل الفرع الصوتي في عملية منفصلة بالتوازي مع الفرع المرئي ثم ينتظر الاثنين قبل الدمج.
+    المراحل المكتملة من محاولة سابقة (حسب الـ manifests) يتم تخطيها."""
+
+    def __init__(self, model_path, whisper_model_size="medium", audio_threads=None, whisper_workers=None,
+                 whisper_backend="openai", audio_excitement=True, whisper_scope="full", sampling="fixed",
+                 shards=0, shard_workers=None, ball_roi=False, whisper_language="ar", classifier_prefilter=False,
+                 classifier_backend="torch"):
+        self.model_path = model_path
+        self.ball_roi = ball_roi
+        self.sampling = sampling
+        # shards > 1: تقسيم الفرع المرئي زمنياً على عدة عمال (shard_workers=0 يعني عقد خارجية فقط)
+        self.shards = shards
+        self.shard_workers = shard_workers
+        self.whisper_model_size = whisper_model_size
+        self.whisper_backend = whisper_backend
+        self.audio_excitement = audio_excitement
+        self.whisper_scope = whisper_scope
+        self.whisper_language = whisper_language  # None: كشف تلقائي مرة واحدة لكل مباراة
+        self.classifier_prefilter = classifier_prefilter
+        self.classifier_backend = classifier_backend  # torch أو onnx
+        cpu_count = multiprocessing.cpu_count()
+        # نعطي الفرع الصوتي ربع الأنوية افتراضياً والباقي لاستخراج الإطارات
+        self.audio_threads = audio_threads or max(1, cpu_count // 4)
+        self.video_processes = max(1, cpu_count - self.audio_threads - 1)
+        # على المعالج فقط: توزيع Whisper على عدة عمليات (عملية لكل نواتين من ميزانية الصوت)
+        if whisper_workers is None:
+            whisper_workers = 1 if _has_cuda() else max(1, self.audio_threads // 2)
+        self.whisper_workers = whisper_workers
+        self.timings = {}
+
+    def pipeline_options(self):
+        """إعدادات build_pipeline كقاموس قابل للتمرير لعملية أخرى (الفرع الصوتي في وضع الدفعات)."""
+        return {
+            "whisper_model_size": self.whisper_model_size,
+            "video_processes": self.video_processes,
+            "whisper_workers": self.whisper_workers,
+            "whisper_backend": self.whisper_backend,
+            "audio_excitement": self.audio_excitement,
+            "whisper_scope": self.whisper_scope,
+            "whisper_language": self.whisper_language,
+            "classifier_prefilter": self.classifier_prefilter,
+            "classifier_backend": self.classifier_backend,
+            "sampling": self.sampling,
+            "shards": self.shards,
+            "shard_workers": self.shard_workers,
+            "ball_roi": self.ball_roi,
+        }
+
+    def build(self, video_file, ws, output_file, models=None):
+        return build_pipeline(video_file, ws, output_file, self.model_path, models=models, **self.pipeline_options())
+
+    def run(self, video_file, ws, output_file):
+        runner = self.build(video_file, ws, output_file)
+        audio_done = all(runner.is_valid(name) for name, stage in runner.stages.items() if stage.group == "audio")
+
+        audio_proc = None
+        t0 = time.time()
+        if not audio_done:
+            # spawn بدلاً من fork حتى لا ترث العملية الصوتية حالة CUDA من العملية الرئيسية
+            ctx = multiprocessing.get_context("spawn")
+            audio_proc = ctx.Process(
+                target=run_audio_branch,
+                args=(video_file, ws, output_file, self.model_path, self.whisper_model_size, self.audio_threads,
+                      self.whisper_workers, self.whisper_backend, self.audio_excitement, self.whisper_scope,
+                      self.whisper_language, self.classifier_prefilter, self.classifier_backend),
+                name="audio-branch",
+            )
+            audio_proc.start()
+            print(f"🎧 بدء الفرع الصوتي في عملية منفصلة ({self.audio_threads} أنوية)")
+
+        try:
+            run_video_branch(runner)
+            self.timings["video"] = time.time() - t0
+        except BaseException:
+            if audio_proc is not None:
+                audio_proc.terminate()
+                audio_proc.join()
+            raise
+
+        if audio_proc is not None:
+            audio_proc.join()
+            if audio_proc.exitcode != 0:
+                raise RuntimeError(f"❌ فشل الفرع الصوتي (exit code {audio_proc.exitcode})")
+        self.timings["audio_total"] = time.time() - t0
+        print(f"⏱️ الفرع المرئي: {self.timings['video']:.1f}ث، انتهاء الفرعين: {self.timings['audio_total']:.1f}ث")
+
+        # الدمج والقص يبدأ بمجرد انتهاء الفرعين
+        runner.run(group="final")
+        self.timings["total"] = time.time() - t0
+        return runner
@@ -0,0 +1,287 @@
+import os
+import json
+from .dag import Stage, StageRunner
+
+
+def build_pipeline(video_file, ws, output_file, model_path, whisper_model_size="medium",
+                   video_processes=None, frame_step=2, merge_threshold=1, merge_penalty_gap=1,
+                   time_window=0, cut_mode="smart", with_hls=True, progressive=True,
+                   catalog_path=None, whisper_workers=1, whisper_backend="openai", audio_excitement=True,
+                   whisper_scope="full", sampling="fixed", shards=0, shard_workers=None, shard_overlap=6.0,
+                   models=None, ball_roi=False, whisper_language="ar", classifier_prefilter=False,
+                   classifier_backend="torch"):
+    """تعريف مراحل التلخيص كـ DAG. كل عملية (رئيسية أو صوتية) تبني نسختها الخاصة من المراحل
+    لأن دوال المراحل closures لا يمكن تمريرها بين العمليات.
+    models: قاموس نماذج مشترك بين عدة مباريات (وضع الدفعات) حتى لا يُعاد تحميل YOLO و Whisper لكل مباراة."""
+    from previews import previews_dir_for
+
+    runner = StageRunner(os.path.join(ws.path, "manifests"))
+    shared_models = models is not None
+    models = {} if models is None else models
+
+    def tracker():
+        # تحميل YOLO مرة واحدة لكل مراحل الفرع المرئي
+        if "tracker" not in models:
+            from trackers import Tracker
+            models["tracker"] = Tracker(model_path)
+        return models["tracker"]
+
+    # ---------------- الفرع المرئي ----------------
+    # sampling="adaptive": مرور خشن يحدد النوافذ المهمة ثم استخراج كثيف داخلها فقط
+    adaptive = sampling == "adaptive"
+
+    def sampler():
+        from read import AdaptiveSampler
+        return AdaptiveSampler(video_file, dense_step=frame_step, num_processes=video_processes)
+
+    def sampling_plan():
+        # الإثارة الصوتية تُحسب هنا أيضاً (رخيصة) لأن الفرع الصوتي يعمل في عملية أخرى بالتوازي
+        from voice_analys import ExcitementDetector
+        from voice_analys.Whisper import load_audio_from_ffmpeg
+        excitement_moments = ExcitementDetector().detect(load_audio_from_ffmpeg(video_file))
+        s = sampler()
+        s.save_plan(s.plan(tracker(), ws.coarse_frames_dir, ws.coarse_detection_file, excitement_moments),
+                    ws.sampling_plan_json)
+
+    def extract_frames():
+        if adaptive:
+            from read import AdaptiveSampler
+            sampler().extract_dense(AdaptiveSampler.load_plan(ws.sampling_plan_json), ws.frames_dir)
+            return
+        from read import parallel_extract
+        parallel_extract(video_file, ws.frames_dir, step=frame_step, num_processes=video_processes)
+
+    def detect():
+        # في الأخذ التكيفي الإطارات غير متتالية: frame_index من اسم الملف بوحدات frame_step
+        tracker().detect_frames_from_folder(ws.frames_dir, ws.detection_file,
+                                            index_step=frame_step if adaptive else None)
+
+    # ball_roi: إكمال الكرة المفقودة بكشف على قص حول موضعها المتوقع قبل التتبع
+    tracked_detections = ws.ball_detection_file if ball_roi else ws.detection_file
+
+    def detect_ball_roi():
+        tracker().detect_ball_roi(ws.detection_file, ws.frames_dir, ws.ball_detection_file,
+                                  report_file=ws.ball_roi_report_json)
+
+    def track():
+        tracker().get_object_tracks(tracked_detections, ws.tracks_file, reset_gap=1 if adaptive else None)
+
+    def interpolate_ball():
+        tracker().interpolate_ball_positions_from_track_file(ws.tracks_file, ws.tracks_inter_ball_file)
+
+    def important_frames():
+        from important import ImportantMomentsDetector
+        ImportantMomentsDetector(ws.tracks_file, ws.important_frames_json).analyze()
+
+    def sharded_video():
+        # كل جزء زمني يُعالج مستقلاً (عمال محليون و/أو عقد أخرى على نفس المجلد) ثم تُربط المسارات
+        from sharding import ShardQueue, plan_shards, run_local_workers, stitch_shards
+        queue = ShardQueue(ws.shards_dir)
+        plan = plan_shards(video_file, shards, frame_step=frame_step, overlap_seconds=shard_overlap,
+                           model_path=model_path)
+        queue.enqueue(plan)
+        workers = run_local_workers(queue.root, model_path, len(plan) if shard_workers is None else shard_workers)
+        try:
+            queue.wait(len(plan), workers=workers)
+        finally:
+            for w in workers:
+                w.join()
+        stitch_shards(queue, plan, ws.tracks_file, ws.important_frames_json)
+
+    if shards > 1 and (ball_roi or adaptive):
+        # الأجزاء تستخرج إطارات ثابتة الخطوة وتتتبع الكشف الخام فقط
+        raise ValueError(f"❌ التقسيم (shards={shards}) لا يدعم ball_roi ولا sampling=\"adaptive\": "
+                         f"استخدم shards=0 أو sampling=\"fixed\" بدون ball_roi")
+
+    if shards > 1:
+        # بديل عن extract_frames ← detect ← track ← important_frames بنفس ملفات الإخراج
+        runner.add(Stage("sharded_video", sharded_video, inputs=[video_file, model_path],
+                         outputs=[ws.tracks_file, ws.important_frames_json],
+                         params={"model": os.path.basename(model_path), "step": frame_step, "shards": shards,
+                                 "overlap": shard_overlap}, group="video"))
+        video_tracks_stage = video_moments_stage = "sharded_video"
+    else:
+        if adaptive:
+            runner.add(Stage("sampling_plan", sampling_plan, inputs=[video_file, model_path],
+                             outputs=[ws.sampling_plan_json],
+                             params={"model": os.path.basename(model_path), "dense_step": frame_step},
+                             group="video"))
+        runner.add(Stage("extract_frames", extract_frames,
+                         inputs=[video_file] + ([ws.sampling_plan_json] if adaptive else []), outputs=[ws.frames_dir],
+                         params={"step": frame_step, "sampling": sampling},
+                         deps=["sampling_plan"] if adaptive else [], group="video"))
+        # ملف الأوزان مدخل للكشف: استبدال models/best.pt يُبطل الكشف وكل ما بعده
+        runner.add(Stage("detect", detect, inputs=[ws.frames_dir, model_path], outputs=[ws.detection_file],
+                         params={"model": os.path.basename(model_path), "sampling": sampling},
+                         deps=["extract_frames"], group="video"))
+        if ball_roi:
+            runner.add(Stage("ball_roi", detect_ball_roi, inputs=[ws.detection_file, ws.frames_dir],
+                             outputs=[ws.ball_detection_file], deps=["detect"], group="video"))
+        runner.add(Stage("track", track, inputs=[tracked_detections], outputs=[ws.tracks_file],
+                         params={"sampling": sampling}, deps=["ball_roi" if ball_roi else "detect"], group="video"))
+        runner.add(Stage("important_frames", important_frames, inputs=[ws.tracks_file],
+                         outputs=[ws.important_frames_json], deps=["track"], group="video"))
+        video_tracks_stage, video_moments_stage = "track", "important_frames"
+    runner.add(Stage("interpolate_ball", interpolate_ball, inputs=[ws.tracks_file],
+                     outputs=[ws.tracks_inter_ball_file], deps=[video_tracks_stage], group="video"))
+
+    def publish_early():
+        # اللقطات التي لا تحتاج تأكيداً صوتياً تُنشر فور جاهزية الفرع المرئي، و Whisper ما زال يعمل
+        from mareg_voice_vidoe import ImportantMomentsMerger
+        from match_sum import MatchSummarizer, ProgressivePublisher, live_dir_for
+        ImportantMomentsMerger(
+            video_json_path=ws.important_frames_json,
+            audio_json_path=None,
+            video_file_path=video_file,
+            merge_threshold=merge_threshold,
+            merge_penalty_gap=merge_penalty_gap
+        ).run_video_only(ws.early_moments_json)
+        MatchSummarizer(
+            video_path=video_file,
+            moments_json=ws.early_moments_json,
+            output_path=None,
+            time_window=time_window,
+            temp_dir=ws.early_clips_dir,
+            cut_mode=cut_mode,
+            publisher=ProgressivePublisher(live_dir_for(output_file)).start()
+        ).publish()
+
+    if progressive:
+        runner.add(Stage("publish_early", publish_early, inputs=[video_file, ws.important_frames_json],
+                         outputs=[ws.early_moments_json],
+                         params={"time_window": time_window, "cut_mode": cut_mode, "merge_threshold": merge_threshold},
+                         deps=[video_moments_stage], group="video"))
+
+    # ---------------- الفرع الصوتي ----------------
+    # whisper_scope="excitement": تفريغ النوافذ المحيطة بلحظات الإثارة فقط بدل المباراة كاملة
+    audio_excitement = audio_excitement or whisper_scope == "excitement"
+
+    def load_excitement():
+        with open(ws.excitement_json, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def excitement():
+        from voice_analys import ExcitementDetector
+        ExcitementDetector().process(video_file, ws.excitement_json)
+
+    def transcriber():
+        # whisper_language=None: كشف تلقائي مرة واحدة للمباراة (لا لكل مقطع VAD على حدة)
+        key = ("transcriber", whisper_model_size, whisper_backend, whisper_workers, whisper_language)
+        if key not in models:
+            if whisper_workers > 1:
+                from voice_analys import ParallelWhisperTranscriber
+                models[key] = ParallelWhisperTranscriber(model_size=whisper_model_size, num_workers=whisper_workers,
+                                                         backend=whisper_backend, language=whisper_language,
+                                                         keep_pool=shared_models)
+            else:
+                from voice_analys import WhisperTranscriber
+                models[key] = WhisperTranscriber(model_size=whisper_model_size, backend=whisper_backend,
+                                                 language=whisper_language)
+        return models[key]
+
+    def transcribe():
+        regions = None
+        if whisper_scope == "excitement":
+            from voice_analys import ExcitementDetector
+            regions = ExcitementDetector.transcription_windows(load_excitement())
+        transcriber().transcribe_video(video_file, ws.transcription_json, regions=regions)
+
+    def classify():
+        # classifier_prefilter: تخطي المقاطع البعيدة لفظياً عن العبارات المرجعية قبل التمثيل
+        # classifier_backend="onnx": INT8 على المعالج، يُفحص تطابقه مع PyTorch قبل أول تصنيف
+        key = ("classifier", classifier_prefilter, classifier_backend)
+        if key not in models:
+            from voice_analys import MomentClassifier
+            models[key] = MomentClassifier(prefilter=classifier_prefilter, backend=classifier_backend)
+        moments = models[key].process(ws.transcription_json, ws.important_moments_json)
+        if audio_excitement:
+            # لحظات الإثارة الصوتية تُضاف بنفس الشكل حتى يستهلكها ImportantMomentsMerger مباشرة
+            moments = sorted(moments + load_excitement(), key=lambda m: m["start"])
+            with open(ws.important_moments_json, "w", encoding="utf-8") as f:
+                json.dump(moments, f, ensure_ascii=False, indent=2)
+
+    transcribe_inputs = [video_file]
+    transcribe_deps = []
+    classify_inputs = [ws.transcription_json]
+    if audio_excitement:
+        runner.add(Stage("excitement", excitement, inputs=[video_file], outputs=[ws.excitement_json], group="audio"))
+        classify_inputs.append(ws.excitement_json)
+    if whisper_scope == "excitement":
+        transcribe_inputs.append(ws.excitement_json)
+        transcribe_deps.append("excitement")
+
+    runner.add(Stage("transcribe", transcribe, inputs=transcribe_inputs, outputs=[ws.transcription_json],
+                     params={"model_size": whisper_model_size, "backend": whisper_backend, "vad": whisper_workers > 1,
+                             "scope": whisper_scope, "language": whisper_language},
+                     deps=transcribe_deps, group="audio"))
+    runner.add(Stage("classify", classify, inputs=classify_inputs, outputs=[ws.important_moments_json],
+                     params={"excitement": audio_excitement, "prefilter": classifier_prefilter,
+                             "backend": classifier_backend},
+                     deps=["transcribe"] + (["excitement"] if audio_excitement else []), group="audio"))
+
+    # ---------------- الدمج والتلخيص ----------------
+    def merge():
+        from mareg_voice_vidoe import ImportantMomentsMerger
+        merger = ImportantMomentsMerger(
+            video_json_path=ws.important_frames_json,
+            audio_json_path=ws.important_moments_json,
+            video_file_path=video_file,
+            merge_threshold=merge_threshold,
+            merge_penalty_gap=merge_penalty_gap
+        )
+        merger.run(ws.merged_moments_json)
+
+    def summarize_clips():
+        from match_sum import MatchSummarizer, ProgressivePublisher, live_dir_for
+        # نكمل قائمة النشر المبكر: تُضاف اللقطات المؤكدة صوتياً وما لم يُنشر بعد
+        publisher = ProgressivePublisher(live_dir_for(output_file)).start(resume=True) if progressive else None
+        summarizer = MatchSummarizer(
+            video_path=video_file,
+            moments_json=ws.merged_moments_json,
+            output_path=output_file,
+            time_window=time_window,
+            temp_dir=ws.clips_dir,
+            cut_mode=cut_mode,
+            publisher=publisher
+        )
+        summarizer.summarize()
+
+    runner.add(Stage("merge", merge, inputs=[ws.important_frames_json, ws.important_moments_json],
+                     outputs=[ws.merged_moments_json],
+                     params={"merge_threshold": merge_threshold, "merge_penalty_gap": merge_penalty_gap},
+                     deps=[video_moments_stage, "classify"], group="final"))
+    runner.add(Stage("summarize", summarize_clips, inputs=[video_file, ws.merged_moments_json],
+                     outputs=[output_file], params={"time_window": time_window, "cut_mode": cut_mode},
+                     deps=["merge"], group="final"))
+
+    def generate_previews():
+        from previews import PreviewGenerator
+        PreviewGenerator(output_file, ws.merged_moments_json, time_window=time_window).generate()
+
+    runner.add(Stage("previews", generate_previews, inputs=[output_file, ws.merged_moments_json],
+                     outputs=[os.path.join(previews_dir_for(output_file), "thumbnail.jpg")],
+                     deps=["summarize"], group="final"))
+
+    def register_summary():
+        from catalog import SummaryCatalog
+        thumb_path = os.path.join(previews_dir_for(output_file), "thumbnail.jpg")
+        SummaryCatalog(catalog_path or os.path.join(os.path.dirname(output_file), "catalog.sqlite3")).add_summary(
+            output_file,
+            moments_json=ws.merged_moments_json,
+            thumbnail_path=thumb_path if os.path.exists(thumb_path) else None
+        )
+
+    runner.add(Stage("catalog", register_summary, inputs=[output_file, ws.merged_moments_json],
+                     deps=["previews"], group="final"))
+
+    def package_hls():
+        from hls import HLSPackager
+        HLSPackager(output_file).package()
+
+    if with_hls:
+        from hls import hls_dir_for
+        runner.add(Stage("package_hls", package_hls, inputs=[output_file],
+                         outputs=[os.path.join(hls_dir_for(output_file), "master.m3u8")],
+                         deps=["summarize"], group="final"))
+
+    return runner
@@ -0,0 +1 @@
+from .preview_generator import PreviewGenerator, previews_dir_for
@@ -0,0 +1,135 @@
+import os
+import json
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+
+def previews_dir_for(summary_path):
+    """مجلد المعاينات لملخص: summarises/previews/<اسم الملخص بدون الامتداد>/"""
+    stem = os.path.splitext(os.path.basename(summary_path))[0]
+    return os.path.join(os.path.dirname(os.path.abspath(summary_path)), "previews", stem)
+
+
+def format_vtt_time(seconds):
+    hours, rem = divmod(seconds, 3600)
+    minutes, secs = divmod(rem, 60)
+    return f"{int(hours):02d}:{int(minutes):02d}:{secs:06.3f}"
+
+
+class PreviewGenerator:
+    """إنشاء الصورة المصغرة و sprite للمعاينة أثناء التمرير (مع فهرس WebVTT) مرة واحدة عند إنشاء الملخص.
+    الإطارات تؤخذ عند حدود اللحظات في الملخص بدلاً من فواصل ثابتة."""
+
+    def __init__(self, summary_path, moments_json=None, time_window=0, output_dir=None,
+                 tile_width=160, columns=10, max_frames=100):
+        self.summary_path = summary_path
+        self.moments_json = moments_json
+        self.time_window = time_window
+        self.output_dir = output_dir or previews_dir_for(summary_path)
+        self.tile_width = tile_width
+        self.columns = columns
+        self.max_frames = max_frames
+
+    @property
+    def thumbnail_path(self):
+        return os.path.join(self.output_dir, "thumbnail.jpg")
+
+    @property
+    def sprite_path(self):
+        return os.path.join(self.output_dir, "sprite.jpg")
+
+    @property
+    def vtt_path(self):
+        return os.path.join(self.output_dir, "thumbs.vtt")
+
+    def probe_duration(self):
+        from catalog import probe_duration
+        return probe_duration(self.summary_path) or 0.0
+
+    def moment_boundaries(self, duration):
+        """بدايات اللحظات داخل زمن الملخص: مجموع أطوال المقاطع السابقة (بعد دمج المتداخل كما في MatchSummarizer)."""
+        if not self.moments_json or not os.path.exists(self.moments_json):
+            step = max(duration / self.max_frames, 10.0)
+            return [i * step for i in range(int(duration // step) + 1)] if duration else [0.0]
+
+        from match_sum import MatchSummarizer
+        summarizer = MatchSummarizer(None, self.moments_json, None, time_window=self.time_window)
+        summarizer.load_important_frames()
+
+        boundaries = []
+        elapsed = 0.0
+        for start, end in summarizer.build_windows():
+            boundaries.append(elapsed)
+            elapsed += end - start
+        return [b for b in boundaries if not duration or b < duration] or [0.0]
+
+    def select_times(self, boundaries):
+        if len(boundaries) <= self.max_frames:
+            return boundaries
+        # نأخذ عينة موزعة بالتساوي من الحدود
+        indexes = np.linspace(0, len(boundaries) - 1, self.max_frames).round().astype(int)
+        return [boundaries[i] for i in sorted(set(indexes))]
+
+    def grab_frame(self, t, path, width):
+        cmd = [
+            "ffmpeg", "-y",
+            "-ss", f"{t:.3f}",
+            "-i", self.summary_path,
+            "-frames:v", "1",
+            "-vf", f"scale={width}:-2",
+            path
+        ]
+        subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return path if os.path.exists(path) else None
+
+    def generate(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        duration = self.probe_duration()
+        times = self.select_times(self.moment_boundaries(duration))
+
+        # الصورة المصغرة: بعد بداية أول لحظة بثانية (حتى لا نأخذ إطاراً انتقالياً)
+        first_offset = min(times[0] + 1.0, max(duration - 0.1, 0.0)) if duration else times[0]
+        self.grab_frame(first_offset, self.thumbnail_path, 640)
+
+        tmp_dir = os.path.join(self.output_dir, "tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        with ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1)) as pool:
+            frames = list(pool.map(
+                lambda it: self.grab_frame(it[1], os.path.join(tmp_dir, f"{it[0]:04d}.jpg"), self.tile_width),
+                enumerate(times)
+            ))
+
+        tiles = [(t, cv2.imread(path)) for t, path in zip(times, frames) if path]
+        tiles = [(t, img) for t, img in tiles if img is not None]
+        if tiles:
+            self.write_sprite(tiles, duration)
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        print(f"🖼️ تم إنشاء المعاينات ({len(tiles)} إطار) في: {self.output_dir}")
+        return self.thumbnail_path if os.path.exists(self.thumbnail_path) else None
+
+    def write_sprite(self, tiles, duration):
+        tile_h, tile_w = tiles[0][1].shape[:2]
+        rows = (len(tiles) + self.columns - 1) // self.columns
+        columns = min(self.columns, len(tiles))
+        sprite = np.zeros((rows * tile_h, columns * tile_w, 3), dtype=np.uint8)
+
+        cues = ["WEBVTT", ""]
+        sprite_name = os.path.basename(self.sprite_path)
+        for i, (t, img) in enumerate(tiles):
+            row, col = divmod(i, self.columns)
+            x, y = col * tile_w, row * tile_h
+            sprite[y:y + tile_h, x:x + tile_w] = cv2.resize(img, (tile_w, tile_h))
+
+            end = tiles[i + 1][0] if i + 1 < len(tiles) else max(duration, t + 1.0)
+            cues.append(f"{format_vtt_time(t)} --> {format_vtt_time(end)}")
+            cues.append(f"{sprite_name}#xywh={x},{y},{tile_w},{tile_h}")
+            cues.append("")
+
+        cv2.imwrite(self.sprite_path, sprite, [cv2.IMWRITE_JPEG_QUALITY, 80])
+        with open(self.vtt_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(cues))
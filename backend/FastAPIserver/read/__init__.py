@@ -1 +1,3 @@
 from .video_utils import parallel_extract,process_and_save_video
+from .adaptive_sampling import AdaptiveSampler, parallel_extract_frames
+from .renderer import AnnotatedVideoRenderer, ranges_from_moments
@@ -0,0 +1,155 @@
+import os
+import json
+import pickle
+import multiprocessing
+import cv2
+from .video_utils import get_total_frames
+
+
+def extract_selected_range(video_path, output_dir, frame_numbers, scale=1.0, seek_gap=250):
+    """استخراج إطارات محددة بأرقامها الأصلية. grab() للإطارات المتخطاة (بدون فك كامل)،
+    و seek عند القفز لمسافة كبيرة بين النوافذ."""
+    cap = cv2.VideoCapture(video_path)
+    current = None
+    saved = 0
+    for number in frame_numbers:
+        if current is None or number < current or number - current > seek_gap:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, number)
+            current = number
+        while current < number:
+            if not cap.grab():
+                break
+            current += 1
+        success, frame = cap.read()
+        current += 1
+        if not success:
+            break
+        if scale != 1.0:
+            frame = cv2.resize(frame, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        cv2.imwrite(os.path.join(output_dir, f"frame{number}.jpg"), frame)
+        saved += 1
+    cap.release()
+    return saved
+
+
+def parallel_extract_frames(video_path, output_dir, frame_numbers, scale=1.0, num_processes=None):
+    """نفس تقسيم parallel_extract لكن على قائمة إطارات محددة (أجزاء متتالية لكل عملية)."""
+    os.makedirs(output_dir, exist_ok=True)
+    frame_numbers = sorted(frame_numbers)
+    if not frame_numbers:
+        return 0
+    num_processes = max(1, min(num_processes or multiprocessing.cpu_count() - 2, len(frame_numbers)))
+    chunk_size = (len(frame_numbers) + num_processes - 1) // num_processes
+    chunks = [frame_numbers[i:i + chunk_size] for i in range(0, len(frame_numbers), chunk_size)]
+    with multiprocessing.Pool(len(chunks)) as pool:
+        counts = pool.starmap(extract_selected_range, [(video_path, output_dir, c, scale) for c in chunks])
+    return sum(counts)
+
+
+class AdaptiveSampler:
+    """أخذ عينات على مرحلتين: مرور خشن (كل coarse_step إطار بدقة منخفضة) يقيّم الإطارات بقواعد
+    ImportantMomentsDetector ومعه لحظات الإثارة الصوتية، ثم مرور كثيف (كل dense_step) داخل النوافذ
+    المرشحة فقط. هكذا يتناسب العمل مع أحداث المباراة لا مع طولها."""
+
+    def __init__(self, video_path, coarse_step=10, coarse_scale=0.5, dense_step=2,
+                 window_before=15.0, window_after=15.0, num_processes=None):
+        self.video_path = video_path
+        self.coarse_step = coarse_step
+        self.coarse_scale = coarse_scale
+        self.dense_step = dense_step
+        # نوافذ بالثواني؛ يجب أن تكون أطول من min_duration في group_events حتى تبقى اللحظة
+        self.window_before = window_before
+        self.window_after = window_after
+        self.num_processes = num_processes
+
+        cap = cv2.VideoCapture(video_path)
+        self.fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+        cap.release()
+        self.total_frames = get_total_frames(video_path)
+        self.report = {}
+
+    def coarse_pass(self, tracker, coarse_dir, detection_file):
+        """الكشف على الإطارات الخشنة وإرجاع أرقام الإطارات التي حققت قاعدة واحدة على الأقل."""
+        from important import ImportantMomentsDetector
+
+        frames = range(0, self.total_frames, self.coarse_step)
+        parallel_extract_frames(self.video_path, coarse_dir, frames, self.coarse_scale, self.num_processes)
+        tracker.detect_frames_from_folder(coarse_dir, detection_file, index_step=1)
+
+        # نعيد الصناديق لإحداثيات الدقة الكاملة لأن عتبات القواعد بالبكسل
+        scorer = ImportantMomentsDetector(None, None)
+        hot_frames = []
+        processed = 0
+        with open(detection_file, "rb") as f:
+            try:
+                while True:
+                    detection = pickle.load(f)
+                    processed += 1
+                    simplified = {
+                        "frame_index": detection["frame_index"],
+                        "boxes": [[v / self.coarse_scale for v in box] for box in detection["boxes"]],
+                        "class_ids": [int(c) for c in detection["class_ids"]],
+                    }
+                    if scorer.analyze_frame(simplified):
+                        hot_frames.append(detection["frame_index"])
+            except EOFError:
+                pass
+        self.report["coarse_frames"] = processed
+        self.report["coarse_hits"] = len(hot_frames)
+        return hot_frames
+
+    def candidate_windows(self, hot_frames, excitement_moments=()):
+        """نوافذ [بداية، نهاية) بأرقام الإطارات حول الإطارات المرشحة ولحظات الإثارة، بعد الدمج."""
+        before = int(self.window_before * self.fps)
+        after = int(self.window_after * self.fps)
+        spans = [(f - before, f + after) for f in hot_frames]
+        spans += [(int(m["start"] * self.fps) - before, int(m["end"] * self.fps) + after) for m in excitement_moments]
+
+        windows = []
+        for start, end in sorted(spans):
+            start, end = max(0, start), min(self.total_frames, end)
+            if windows and start <= windows[-1][1]:
+                windows[-1][1] = max(windows[-1][1], end)
+            elif start < end:
+                windows.append([start, end])
+        return windows
+
+    def dense_frames(self, windows):
+        # نفس شبكة الأخذ الثابت (مضاعفات dense_step) حتى تبقى frame_index // dense_step متوافقة
+        frames = []
+        for start, end in windows:
+            first = (start + self.dense_step - 1) // self.dense_step * self.dense_step
+            frames.extend(range(first, end, self.dense_step))
+        return frames
+
+    def plan(self, tracker, coarse_dir, detection_file, excitement_moments=()):
+        hot_frames = self.coarse_pass(tracker, coarse_dir, detection_file)
+        windows = self.candidate_windows(hot_frames, excitement_moments)
+        frames = self.dense_frames(windows)
+        fixed = (self.total_frames + self.dense_step - 1) // self.dense_step
+        self.report.update({
+            "total_frames": self.total_frames,
+            "windows": len(windows),
+            "covered_seconds": round(sum(e - s for s, e in windows) / self.fps, 1),
+            "dense_frames": len(frames),
+            "fixed_step_frames": fixed,
+            "frames_saved_ratio": round(1 - (len(frames) + self.report["coarse_frames"]) / max(1, fixed), 3),
+        })
+        return {"windows": windows, "frames": frames, "report": self.report}
+
+    def save_plan(self, plan, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(plan, f, ensure_ascii=False, indent=2)
+        r = plan["report"]
+        print(f"🔍 المرور الخشن: {r['coarse_frames']} إطار، {r['coarse_hits']} مرشح ← {r['windows']} نافذة "
+              f"({r['covered_seconds']}ث)")
+        print(f"🎯 المرور الكثيف: {r['dense_frames']} إطار بدلاً من {r['fixed_step_frames']} "
+              f"(توفير {r['frames_saved_ratio']:.0%})")
+
+    @staticmethod
+    def load_plan(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def extract_dense(self, plan, output_dir):
+        return parallel_extract_frames(self.video_path, output_dir, plan["frames"], 1.0, self.num_processes)
@@ -0,0 +1,179 @@
+import os
+import json
+import queue
+import pickle
+import threading
+import subprocess
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+from tqdm import tqdm
+
+_END = object()
+
+
+def ffmpeg_encoder_command(output_path, width, height, fps, codec="libx264", preset="veryfast", crf=23):
+    # إطارات BGR خام على stdin ← ترميز مباشر بدون ملفات وسيطة
+    return [
+        "ffmpeg", "-y", "-loglevel", "error",
+        "-f", "rawvideo", "-pix_fmt", "bgr24",
+        "-s", f"{width}x{height}", "-r", str(fps),
+        "-i", "pipe:0",
+        "-c:v", codec, "-preset", preset, "-crf", str(crf),
+        "-pix_fmt", "yuv420p",
+        output_path
+    ]
+
+
+def ranges_from_moments(moments_json, fps, frame_step=2, padding_seconds=0.0):
+    """نطاقات [بداية، نهاية] بوحدات frame_index من لحظات merged_moments.json (بالثواني)."""
+    with open(moments_json, "r", encoding="utf-8") as f:
+        moments = json.load(f)
+    ranges = []
+    for m in sorted(moments, key=lambda m: m["start"]):
+        start = int(max(0.0, m["start"] - padding_seconds) * fps / frame_step)
+        end = int((m["end"] + padding_seconds) * fps / frame_step)
+        if ranges and start <= ranges[-1][1] + 1:
+            ranges[-1][1] = max(ranges[-1][1], end)
+        else:
+            ranges.append([start, end])
+    return [tuple(r) for r in ranges]
+
+
+class AnnotatedVideoRenderer:
+    """رسم التتبع على الإطارات وترميزها بخط أنابيب: خيط قراءة (الملفات + سجلات التتبع والفرق)،
+    خيوط رسم (فك JPEG والرسم، cv2 يحرر الـ GIL)، ثم ffmpeg عبر pipe بالترتيب الأصلي."""
+
+    def __init__(self, tracker, fps, codec="libx264", preset="veryfast", crf=23, num_workers=None,
+                 queue_size=32, debug_dir=None, plan=None):
+        self.tracker = tracker
+        self.plan = plan  # RenderPlan: ألوان الفرق محسومة مسبقاً فلا نحتاج ملف الفرق ولا tracker
+        self.fps = fps
+        self.codec = codec
+        self.preset = preset
+        self.crf = crf
+        self.num_workers = num_workers or max(1, min(8, (os.cpu_count() or 2) - 1))
+        self.queue_size = queue_size
+        self.debug_dir = debug_dir  # None: بدون نسخ JPEG للتصحيح (كانت تُكتب دائماً في out_d)
+        self.stats = {}
+        self._reader_error = None
+
+    @staticmethod
+    def _in_ranges(frame_index, ranges):
+        return ranges is None or any(start <= frame_index <= end for start, end in ranges)
+
+    @staticmethod
+    def _put(out_queue, item, stop):
+        # لا نعلق على طابور ممتلئ إذا توقف المستهلك بسبب خطأ
+        while not stop.is_set():
+            try:
+                out_queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _read(self, frame_files, tracks_file, teams_file, ranges, out_queue, stop):
+        """يقرأ السجلات بالتتابع (لا بد من المرور عليها كلها) ويرسل فقط إطارات النطاقات المطلوبة."""
+        try:
+            with open(tracks_file, "rb") as f_tracks, open(teams_file or os.devnull, "rb") as f_teams:
+                try:
+                    current_team_record = pickle.load(f_teams)
+                except EOFError:
+                    current_team_record = None
+
+                for frame_index, frame_path in enumerate(frame_files):
+                    try:
+                        track_frame_index, track_data = pickle.load(f_tracks)
+                    except EOFError:
+                        break
+
+                    frame_teams = []
+                    while current_team_record and current_team_record["frame_index"] == frame_index:
+                        frame_teams.append(current_team_record)
+                        try:
+                            current_team_record = pickle.load(f_teams)
+                        except EOFError:
+                            current_team_record = None
+
+                    if frame_index != track_frame_index:
+                        print(f"⚠️ تعارض في رقم الإطار. (متوقع {frame_index}، الموجود {track_frame_index})")
+                        continue
+                    if not self._in_ranges(frame_index, ranges):
+                        continue
+                    with open(frame_path, "rb") as f:
+                        data = f.read()
+                    if not self._put(out_queue, (frame_index, data, track_data, frame_teams), stop):
+                        break
+        except BaseException as e:
+            # يُعاد رفعه في render() بدل إنهاء الفيديو مبتوراً بنجاح ظاهري
+            self._reader_error = e
+        finally:
+            self._put(out_queue, _END, stop)
+
+    def _draw(self, item):
+        frame_index, data, track_data, frame_teams = item
+        frame = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        # الإطار مفكوك للتو ولا يشاركه أحد: نرسم عليه مباشرة بدون نسخ
+        if self.plan is not None:
+            annotated = self.plan.draw(frame, track_data, frame_index, in_place=True)
+        else:
+            annotated = self.tracker.draw_annotations_single_frame(frame, track_data, frame_teams, in_place=True)
+        if self.debug_dir:
+            cv2.imwrite(os.path.join(self.debug_dir, f"frame{frame_index}.jpg"), annotated)
+        return annotated
+
+    def render(self, frame_files, tracks_file, teams_file, output_path, frame_ranges=None):
+        """frame_files مرتبة رقمياً. frame_ranges: [(بداية، نهاية)] بوحدات frame_index، أو None للمباراة كاملة.
+        teams_file يمكن أن يكون None عند استخدام plan."""
+        if not frame_files:
+            print("❌ لم يتم العثور على إطارات في المجلد.")
+            return None
+        if self.debug_dir:
+            os.makedirs(self.debug_dir, exist_ok=True)
+
+        height, width = cv2.imread(frame_files[0]).shape[:2]
+        encoder = subprocess.Popen(
+            ffmpeg_encoder_command(output_path, width, height, self.fps, self.codec, self.preset, self.crf),
+            stdin=subprocess.PIPE
+        )
+
+        read_queue = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        self._reader_error = None
+        reader = threading.Thread(target=self._read, name="render-reader",
+                                  args=(frame_files, tracks_file, teams_file, frame_ranges, read_queue, stop), daemon=True)
+        reader.start()
+
+        total = len(frame_files) if frame_ranges is None else sum(
+            1 for i in range(len(frame_files)) if self._in_ranges(i, frame_ranges))
+        written = 0
+        pending = deque()
+        try:
+            with ThreadPoolExecutor(self.num_workers) as pool, \
+                    tqdm(total=total, desc="🔄 معالجة الإطارات") as pbar:
+                while True:
+                    item = read_queue.get()
+                    if item is not _END:
+                        pending.append(pool.submit(self._draw, item))
+                    # نكتب بالترتيب، ونُبقي عدداً محدوداً من الإطارات قيد الرسم
+                    while pending and (item is _END or len(pending) >= 2 * self.num_workers or pending[0].done()):
+                        encoder.stdin.write(memoryview(pending.popleft().result()))
+                        written += 1
+                        pbar.update(1)
+                    if item is _END:
+                        break
+        finally:
+            stop.set()
+            encoder.stdin.close()
+            encoder.wait()
+            reader.join()
+
+        if self._reader_error is not None:
+            raise RuntimeError(f"❌ فشلت قراءة الإطارات أو سجلات التتبع: {self._reader_error}") from self._reader_error
+        if encoder.returncode != 0:
+            raise RuntimeError(f"❌ فشل ترميز الفيديو (ffmpeg exit code {encoder.returncode})")
+        self.stats = {"frames_written": written, "frames_total": len(frame_files)}
+        print(f"🎬 تم حفظ الفيديو في: {output_path} ({written} إطار)")
+        return output_path
@@ -91,9 +91,17 @@ def extract_frame_number(filename):
     """استخراج رقم الإطار من اسم الملف"""
     match = re.search(r'frame(\d+)\.jpg', filename)
     return int(match.group(1)) if match else -1
-def process_and_save_video(frames_folder, tracks_file_path, teams_file_path, output_video_path, input_video_path):
-    tracker = Tracker('models/best.pt')
-    ii=0
+def process_and_save_video(frames_folder, tracks_file_path, teams_file_path, output_video_path, input_video_path,
+                           codec="libx264", preset="veryfast", crf=23, num_workers=None,
+                           debug_dir=None, frame_ranges=None, segment_frames=None, highlight_ids=()):
+    """رسم التتبع وحفظ الفيديو عبر AnnotatedVideoRenderer (قراءة ورسم وترميز متداخلة).
+    debug_dir: نسخة JPEG من كل إطار مرسوم (معطلة افتراضياً). frame_ranges: نطاقات frame_index فقط (مثل اللقطات المهمة).
+    segment_frames: طول مقطع تصويت ألوان الفرق (None = المباراة كاملة). highlight_ids: مسارات تُرسم بالأسود."""
+    from .renderer import AnnotatedVideoRenderer
+    from trackers import RenderPlan
+
+    # لون الفريق لكل مسار يُحسم مرة واحدة؛ الرسم لا يحتاج تحميل YOLO
+    plan = RenderPlan.from_teams_file(teams_file_path, segment_frames=segment_frames, highlight_ids=highlight_ids)
     # استخراج FPS من الفيديو الأصلي
     cap = cv2.VideoCapture(input_video_path)
     fps = cap.get(cv2.CAP_PROP_FPS)
@@ -107,55 +115,6 @@ def process_and_save_video(frames_folder, tracks_file_path, teams_file_path, out
         if f.endswith(('.jpg', '.png'))
     ], key=lambda x: extract_frame_number(os.path.basename(x)))
 
-    if not frame_files:
-        print("❌ لم يتم العثور على إطارات في المجلد.")
-        return
-
-    first_frame = cv2.imread(frame_files[0])
-    height, width = first_frame.shape[:2]
-    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-    out = cv2.VideoWriter(output_video_path, fourcc, fps, (width, height))
-
-    # فتح ملف التتبع وملف الفرق
-    with open(tracks_file_path, 'rb') as f_tracks, open(teams_file_path, 'rb') as f_teams, tqdm(total=len(frame_files), desc="🔄 معالجة الإطارات") as pbar:
-        try:
-            # قراءة أول سجل فرق (للتأكد من البداية)
-            current_team_record = None
-            try:
-                current_team_record = pickle.load(f_teams)
-            except EOFError:
-                current_team_record = None
-
-            for frame_index, frame_path in enumerate(frame_files):
-                frame = cv2.imread(frame_path)
-
-                # قراءة بيانات التتبع للإطار الحالي
-                track_frame_index, track_data = pickle.load(f_tracks)
-
-                if frame_index != track_frame_index:
-                    print(f"⚠️ تعارض في رقم الإطار. (متوقع {frame_index}، الموجود {track_frame_index})")
-                    continue
-
-                # تجميع بيانات الفرق الخاصة بالإطار الحالي
-                # الفريق عبارة عن قائمة من dicts لكل لاعب، نحتاج فقط بيانات اللاعبين للإطار الحالي
-                frame_teams = []
-                while current_team_record and current_team_record["frame_index"] == frame_index:
-                    frame_teams.append(current_team_record)
-                    try:
-                        current_team_record = pickle.load(f_teams)
-                    except EOFError:
-                        current_team_record = None
-                        break
-
-                # تمرير بيانات الفرق مع بيانات التتبع لدالة الرسم
-                annotated_frame = tracker.draw_annotations_single_frame(frame, track_data, frame_teams)
-                cv2.imwrite("out_d/frame{}.jpg".format(ii), annotated_frame)
-                ii+=1
-                out.write(annotated_frame)
-                pbar.update(1)
-
-        except EOFError:
-            print("✅ تم الانتهاء من معالجة جميع الإطارات.")
-
-    out.release()
-    print(f"🎬 تم حفظ الفيديو في: {output_video_path}")
+    renderer = AnnotatedVideoRenderer(None, fps, codec=codec, preset=preset, crf=crf,
+                                      num_workers=num_workers, debug_dir=debug_dir, plan=plan)
+    return renderer.render(frame_files, tracks_file_path, None, output_video_path, frame_ranges=frame_ranges)
@@ -0,0 +1,3 @@
+from .shard_queue import ShardQueue
+from .worker import model_fingerprint, plan_shards, process_shard, run_worker, run_local_workers
+from .stitch import stitch_shards, match_track_ids
@@ -0,0 +1,123 @@
+import os
+import json
+import time
+import shutil
+
+# حقول الخطة التي تحدد نتيجة الجزء: أي اختلاف (عدد أجزاء أو تداخل أو خطوة أو أوزان مختلفة) يعني نتيجة قديمة
+PLAN_KEYS = ("video_path", "frame_step", "start_frame", "end_frame", "core_start", "core_end", "model")
+
+
+class ShardQueue:
+    """طابور مهام بسيط فوق مجلد مشترك (محلي أو NFS) بدلاً من نظام طوابير حقيقي.
+    كل مهمة ملف JSON ينتقل بين pending ← running ← done/failed؛ os.rename ذري لذلك لا يأخذ عاملان نفس المهمة."""
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self.dirs = {name: os.path.join(self.root, "tasks", name) for name in ("pending", "running", "done", "failed")}
+        self.results_dir = os.path.join(self.root, "results")
+        for path in list(self.dirs.values()) + [self.results_dir]:
+            os.makedirs(path, exist_ok=True)
+
+    @staticmethod
+    def task_name(shard_index):
+        return f"shard_{shard_index:04d}.json"
+
+    def result_dir(self, shard_index):
+        path = os.path.join(self.results_dir, f"shard_{shard_index:04d}")
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def _write(self, state, task):
+        path = os.path.join(self.dirs[state], self.task_name(task["index"]))
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(task, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, path)
+
+    def state_of(self, shard_index):
+        name = self.task_name(shard_index)
+        for state, path in self.dirs.items():
+            if os.path.exists(os.path.join(path, name)):
+                return state
+        return None
+
+    def _read(self, state, shard_index):
+        with open(os.path.join(self.dirs[state], self.task_name(shard_index)), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _discard(self, state, shard_index):
+        os.remove(os.path.join(self.dirs[state], self.task_name(shard_index)))
+        shutil.rmtree(os.path.join(self.results_dir, f"shard_{shard_index:04d}"), ignore_errors=True)
+
+    def enqueue(self, tasks):
+        """إضافة المهام غير المكتملة فقط؛ الأجزاء المنتهية من محاولة سابقة بنفس حدود الخطة لا يُعاد تشغيلها.
+        مهام الخطط السابقة (حدود مختلفة أو أجزاء لم تعد في الخطة) تُحذف مع نتائجها."""
+        planned = {task["index"]: task for task in tasks}
+        for state, path in self.dirs.items():
+            for name in os.listdir(path):
+                if not name.endswith(".json"):
+                    continue
+                index = int(name[len("shard_"):-len(".json")])
+                if index not in planned:
+                    self._discard(state, index)
+
+        added = 0
+        for task in tasks:
+            state = self.state_of(task["index"])
+            if state == "done":
+                done = self._read("done", task["index"])
+                if all(done.get(k) == task.get(k) for k in PLAN_KEYS):
+                    continue
+                self._discard("done", task["index"])
+            elif state in ("running", "failed", "pending"):
+                os.remove(os.path.join(self.dirs[state], self.task_name(task["index"])))
+            self._write("pending", task)
+            added += 1
+        return added
+
+    def claim(self):
+        for name in sorted(os.listdir(self.dirs["pending"])):
+            if not name.endswith(".json"):
+                continue
+            target = os.path.join(self.dirs["running"], name)
+            try:
+                os.rename(os.path.join(self.dirs["pending"], name), target)
+            except FileNotFoundError:
+                continue  # أخذها عامل آخر
+            with open(target, "r", encoding="utf-8") as f:
+                return json.load(f)
+        return None
+
+    def complete(self, task):
+        name = self.task_name(task["index"])
+        os.replace(os.path.join(self.dirs["running"], name), os.path.join(self.dirs["done"], name))
+
+    def fail(self, task, error):
+        task = dict(task, error=str(error))
+        self._write("failed", task)
+        running = os.path.join(self.dirs["running"], self.task_name(task["index"]))
+        if os.path.exists(running):
+            os.remove(running)
+
+    def wait(self, total, poll_seconds=2.0, timeout=None, workers=()):
+        """انتظار انتهاء كل الأجزاء (من عمال محليين أو عقد أخرى). يرفع خطأ عند فشل جزء أو انهيار عامل محلي."""
+        t0 = time.time()
+        while True:
+            done = len([n for n in os.listdir(self.dirs["done"]) if n.endswith(".json")])
+            failed = sorted(n for n in os.listdir(self.dirs["failed"]) if n.endswith(".json"))
+            if failed:
+                with open(os.path.join(self.dirs["failed"], failed[0]), "r", encoding="utf-8") as f:
+                    error = json.load(f).get("error")
+                raise RuntimeError(f"❌ فشل الجزء {failed[0]}: {error}")
+            if done >= total:
+                return
+            crashed = [w for w in workers if w.exitcode not in (None, 0)]
+            if crashed:
+                raise RuntimeError(f"❌ توقف العامل {crashed[0].name} (exit code {crashed[0].exitcode}) "
+                                   f"بعد {done} من {total} أجزاء")
+            if timeout and time.time() - t0 > timeout:
+                raise TimeoutError(f"❌ انتهت المهلة بعد {done} من {total} أجزاء")
+            time.sleep(poll_seconds)
+
+    def clear(self):
+        shutil.rmtree(self.root, ignore_errors=True)
@@ -0,0 +1,131 @@
+import os
+import json
+import pickle
+import numpy as np
+
+TRACKED_CATEGORIES = ("players", "referees", "goalkeeper")
+
+
+def load_tracks(tracks_file):
+    frames = []
+    with open(tracks_file, "rb") as f:
+        try:
+            while True:
+                frames.append(pickle.load(f))
+        except EOFError:
+            pass
+    return frames
+
+
+def box_iou_matrix(a, b):
+    """IoU بين كل صندوق في a وكل صندوق في b (xyxy)."""
+    a = np.asarray(a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float32).reshape(-1, 4)
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-6)
+
+
+def match_track_ids(prev_frames, next_frames, iou_threshold=0.5):
+    """ربط معرفات الجزء التالي بمعرفات الجزء السابق حسب متوسط IoU في إطارات التداخل المشتركة.
+    ترجع {category: {next_id: prev_id}} بمطابقة جشعة من الأعلى للأدنى."""
+    prev_by_index = dict(prev_frames)
+    scores = {c: {} for c in TRACKED_CATEGORIES}
+    seen = {c: {} for c in TRACKED_CATEGORIES}
+
+    for frame_index, next_tracks in next_frames:
+        prev_tracks = prev_by_index.get(frame_index)
+        if prev_tracks is None:
+            continue
+        for category in TRACKED_CATEGORIES:
+            prev_items = list(prev_tracks.get(category, {}).items())
+            next_items = list(next_tracks.get(category, {}).items())
+            for pid, _ in prev_items:
+                seen[category][("p", pid)] = seen[category].get(("p", pid), 0) + 1
+            for nid, _ in next_items:
+                seen[category][("n", nid)] = seen[category].get(("n", nid), 0) + 1
+            if not prev_items or not next_items:
+                continue
+            iou = box_iou_matrix([v["bbox"] for _, v in prev_items], [v["bbox"] for _, v in next_items])
+            for i, j in zip(*np.nonzero(iou > 0)):
+                key = (next_items[j][0], prev_items[i][0])
+                scores[category][key] = scores[category].get(key, 0.0) + float(iou[i, j])
+
+    mapping = {}
+    for category in TRACKED_CATEGORIES:
+        # متوسط على عدد الإطارات التي ظهر فيها أي من المسارين حتى لا يفوز مسار ظهر مرة واحدة
+        ranked = sorted(
+            ((total / max(seen[category][("n", nid)], seen[category][("p", pid)]), nid, pid)
+             for (nid, pid), total in scores[category].items()),
+            reverse=True
+        )
+        used_next, used_prev, pairs = set(), set(), {}
+        for score, nid, pid in ranked:
+            if score < iou_threshold:
+                break
+            if nid in used_next or pid in used_prev:
+                continue
+            pairs[nid] = pid
+            used_next.add(nid)
+            used_prev.add(pid)
+        mapping[category] = pairs
+    return mapping
+
+
+def stitch_shards(queue, shards, tracks_output, important_frames_output, iou_threshold=0.5):
+    """دمج نتائج الأجزاء في ملف تتبع واحد وملف لحظات واحد بنفس صيغ المسار غير الموزع.
+    المعرفات غير المربوطة تأخذ أرقاماً جديدة فريدة، ولحظات الحدود تُجمّع مرة واحدة على الإطارات المدمجة."""
+    from important import ImportantMomentsDetector
+
+    next_id = 0
+    prev_frames = None
+    important_frames = []
+    linked = 0
+    with open(tracks_output, "wb") as out:
+        for shard in sorted(shards, key=lambda s: s["index"]):
+            result_dir = queue.result_dir(shard["index"])
+            frames = load_tracks(os.path.join(result_dir, "tracks_file"))
+
+            links = match_track_ids(prev_frames, frames, iou_threshold) if prev_frames else {}
+            id_map = {}
+            for category in TRACKED_CATEGORIES:
+                category_map = {}
+                for _, tracks in frames:
+                    for track_id in tracks.get(category, {}):
+                        if track_id in category_map:
+                            continue
+                        if track_id in links.get(category, {}):
+                            category_map[track_id] = links[category][track_id]
+                            linked += 1
+                        else:
+                            category_map[track_id] = next_id
+                            next_id += 1
+                id_map[category] = category_map
+
+            remapped = []
+            for frame_index, tracks in frames:
+                tracks = dict(tracks)
+                for category in TRACKED_CATEGORIES:
+                    tracks[category] = {id_map[category][tid]: v for tid, v in tracks.get(category, {}).items()}
+                remapped.append((frame_index, tracks))
+
+            step = shard["frame_step"]
+            core = range(shard["core_start"] // step, (shard["core_end"] + step - 1) // step)
+            for item in remapped:
+                if item[0] in core:
+                    pickle.dump(item, out)
+            prev_frames = remapped
+
+            with open(os.path.join(result_dir, "important_frames.json"), "r", encoding="utf-8") as f:
+                important_frames.extend(json.load(f))
+
+    # تجميع الأحداث على كامل المباراة يدمج تلقائياً اللحظات التي تعبر حدود الأجزاء
+    detector = ImportantMomentsDetector(tracks_output, important_frames_output)
+    detector.important_frames = sorted(important_frames, key=lambda f: f["frame_index"])
+    detector.save_events()
+    print(f"🧵 تم دمج {len(shards)} أجزاء: {linked} مسار مربوط عبر الحدود، {next_id} معرّف إجمالي")
@@ -0,0 +1,135 @@
+"""تقسيم المباراة زمنياً إلى أجزاء متداخلة ومعالجة كل جزء بشكل مستقل (كشف ← ByteTrack ← قواعد اللحظات).
+
+تشغيل عامل على عقدة أخرى تشارك نفس المجلد ونفس مسار الفيديو:
+
+    python -m sharding.worker --queue jobs/<job_id>/shards --model models/best.pt
+"""
+import os
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import multiprocessing
+import cv2
+from .shard_queue import ShardQueue
+
+
+def model_fingerprint(model_path):
+    """hash محتوى ملف الأوزان: نفس النموذج على كل العقد حتى لو اختلف المسار أو وقت التعديل."""
+    h = hashlib.sha256()
+    with open(model_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()[:16]
+
+
+def plan_shards(video_path, num_shards, frame_step=2, overlap_seconds=6.0, model_path=None):
+    """حدود الأجزاء بأرقام الإطارات. core هو الجزء الذي يملكه كل عامل في الناتج النهائي،
+    و [start, end) يضيف نصف التداخل على كل جانب لربط المسارات وتهيئة سجل الكرة."""
+    from read.video_utils import get_total_frames
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+    cap.release()
+    total_frames = get_total_frames(video_path)
+
+    num_shards = max(1, min(num_shards, total_frames // max(1, frame_step)))
+    half = int(overlap_seconds * fps / 2) // frame_step * frame_step
+    bounds = [round(i * total_frames / num_shards) // frame_step * frame_step for i in range(num_shards)]
+    bounds.append(total_frames)
+
+    model = model_fingerprint(model_path) if model_path else None
+    shards = []
+    for i in range(num_shards):
+        core_start, core_end = bounds[i], bounds[i + 1]
+        shards.append({
+            "index": i,
+            "video_path": os.path.abspath(video_path),
+            "frame_step": frame_step,
+            "start_frame": max(0, core_start - half),
+            "end_frame": min(total_frames, core_end + half),
+            "core_start": core_start,
+            "core_end": core_end,
+            "fps": fps,
+            "model": model,
+        })
+    return shards
+
+
+def process_shard(task, tracker, result_dir):
+    """معالجة جزء واحد. frame_index = رقم الإطار // frame_step حتى تتطابق الأجزاء في مناطق التداخل."""
+    from read.adaptive_sampling import extract_selected_range
+    from important import ImportantMomentsDetector
+
+    step = task["frame_step"]
+    frames_dir = os.path.join(result_dir, "frames")
+    detection_file = os.path.join(result_dir, "detection_file")
+    tracks_file = os.path.join(result_dir, "tracks_file")
+    os.makedirs(frames_dir, exist_ok=True)
+
+    first = (task["start_frame"] + step - 1) // step * step
+    extract_selected_range(task["video_path"], frames_dir, range(first, task["end_frame"], step))
+    tracker.detect_frames_from_folder(frames_dir, detection_file, index_step=step)
+    # get_object_tracks يبدأ بمسارات جديدة لكل جزء؛ الربط يتم لاحقاً في stitch
+    tracker.get_object_tracks(detection_file, tracks_file)
+
+    # القواعد تعمل على كل إطارات الجزء (التداخل يهيئ سجل سرعة الكرة) لكن نحفظ إطارات core فقط
+    detector = ImportantMomentsDetector(tracks_file, None)
+    core = range(task["core_start"] // step, (task["core_end"] + step - 1) // step)
+    important = [f for f in detector.analyze_frames() if f["frame_index"] in core]
+    with open(os.path.join(result_dir, "important_frames.json"), "w", encoding="utf-8") as f:
+        json.dump(important, f, ensure_ascii=False)
+
+    shutil.rmtree(frames_dir, ignore_errors=True)
+    os.remove(detection_file)
+
+
+def run_worker(queue_root, model_path, idle_exit=True, poll_seconds=5.0):
+    """يحمل YOLO مرة واحدة ثم يأخذ الأجزاء من الطابور حتى يفرغ."""
+    from trackers import Tracker
+    queue = ShardQueue(queue_root)
+    tracker = None
+    model = model_fingerprint(model_path)
+    while True:
+        task = queue.claim()
+        if task is None:
+            if idle_exit:
+                return
+            time.sleep(poll_seconds)
+            continue
+        if task.get("model") not in (None, model):
+            # عقدة بأوزان مختلفة عن الخطة: نتيجتها لا تُخلط مع بقية الأجزاء
+            queue.fail(task, f"أوزان العامل {model} لا تطابق الخطة {task['model']} ({model_path})")
+            continue
+        if tracker is None:
+            tracker = Tracker(model_path)
+        print(f"🧩 الجزء {task['index']}: الإطارات {task['start_frame']} → {task['end_frame']}")
+        t0 = time.time()
+        try:
+            process_shard(task, tracker, queue.result_dir(task["index"]))
+        except Exception as e:
+            queue.fail(task, e)
+            raise
+        queue.complete(task)
+        print(f"✅ الجزء {task['index']} انتهى في {time.time() - t0:.1f}ث")
+
+
+def run_local_workers(queue_root, model_path, num_workers):
+    """عمال محليون في عمليات spawn (حالة CUDA مستقلة لكل عامل)."""
+    ctx = multiprocessing.get_context("spawn")
+    workers = [
+        ctx.Process(target=run_worker, args=(queue_root, model_path), name=f"shard-worker-{i}")
+        for i in range(num_workers)
+    ]
+    for w in workers:
+        w.start()
+    return workers
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queue", required=True)
+    parser.add_argument("--model", required=True)
+    parser.add_argument("--wait", action="store_true", help="الانتظار عند فراغ الطابور بدل الخروج")
+    args = parser.parse_args()
+    run_worker(args.queue, args.model, idle_exit=not args.wait)
@@ -0,0 +1 @@
+from .range_response import RangeFileResponse, parse_range_header, RangeNotSatisfiable
@@ -0,0 +1,195 @@
+import os
+import uuid
+import stat as stat_module
+from email.utils import formatdate, parsedate_to_datetime
+
+import anyio
+from starlette.responses import Response
+
+# حجم القطعة عند القراءة عبر threadpool (قابل للتعديل من متغير البيئة)
+DEFAULT_CHUNK_SIZE = int(os.environ.get("VIDEO_CHUNK_SIZE", 1024 * 1024))
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range_header(range_header, file_size):
+    """تحليل ترويسة Range وإرجاع قائمة (start, end) شاملة. يدعم bytes=a-b و bytes=a- و bytes=-N والنطاقات المتعددة."""
+    units, _, ranges_spec = range_header.partition("=")
+    if units.strip().lower() != "bytes" or not ranges_spec:
+        raise RangeNotSatisfiable(range_header)
+
+    ranges = []
+    for spec in ranges_spec.split(","):
+        spec = spec.strip()
+        if not spec or "-" not in spec:
+            raise RangeNotSatisfiable(range_header)
+        start_str, end_str = (part.strip() for part in spec.split("-", 1))
+        try:
+            if not start_str:
+                # نطاق لاحقة: آخر N بايت
+                length = int(end_str)
+                if length <= 0:
+                    continue
+                start = max(file_size - length, 0)
+                end = file_size - 1
+            else:
+                start = int(start_str)
+                end = int(end_str) if end_str else file_size - 1
+        except ValueError:
+            raise RangeNotSatisfiable(range_header)
+
+        if start >= file_size or end < start:
+            continue
+        ranges.append((start, min(end, file_size - 1)))
+
+    if not ranges:
+        raise RangeNotSatisfiable(range_header)
+    return ranges
+
+
+def make_etag(st):
+    return f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+
+
+class RangeFileResponse(Response):
+    """إرسال ملف فيديو مع دعم Range و If-Range و ETag و Last-Modified و 304.
+    يستخدم zero-copy (امتداد http.response.zerocopysend) إذا دعمه الخادم، وإلا قراءة بقطع كبيرة داخل threadpool."""
+
+    def __init__(self, path, request, media_type="video/mp4", headers=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                 cache_control="public, max-age=3600"):
+        self.path = path
+        self.request = request
+        self.media_type = media_type
+        self.chunk_size = chunk_size
+        self.background = None
+        self.body = b""
+        self.ranges = []
+        self.boundary = None
+        self.send_body = request.method != "HEAD"
+
+        st = os.stat(path)
+        if not stat_module.S_ISREG(st.st_mode):
+            raise RuntimeError(f"File at path {path} is not a file.")
+        self.file_size = st.st_size
+        etag = make_etag(st)
+        last_modified = formatdate(st.st_mtime, usegmt=True)
+
+        base_headers = {
+            "Accept-Ranges": "bytes",
+            "ETag": etag,
+            "Last-Modified": last_modified,
+            "Cache-Control": cache_control,
+        }
+        base_headers.update(headers or {})
+
+        status_code, extra_headers = self._evaluate(request, st, etag)
+        base_headers.update(extra_headers)
+        self.status_code = status_code
+        self.init_headers(base_headers)
+
+    def _not_modified(self, request, st, etag):
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since:
+            try:
+                return int(st.st_mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def _if_range_matches(self, request, st, etag):
+        if_range = request.headers.get("if-range")
+        if if_range is None:
+            return True
+        if if_range.startswith('"') or if_range.startswith("W/"):
+            return if_range == etag
+        try:
+            return int(st.st_mtime) == int(parsedate_to_datetime(if_range).timestamp())
+        except (TypeError, ValueError):
+            return False
+
+    def _evaluate(self, request, st, etag):
+        if self._not_modified(request, st, etag):
+            self.send_body = False
+            return 304, {}
+
+        range_header = request.headers.get("range")
+        if not range_header or not self._if_range_matches(request, st, etag):
+            self.ranges = [(0, self.file_size - 1)] if self.file_size else []
+            return 200, {"Content-Type": self.media_type, "Content-Length": str(self.file_size)}
+
+        try:
+            self.ranges = parse_range_header(range_header, self.file_size)
+        except RangeNotSatisfiable:
+            self.send_body = False
+            return 416, {"Content-Range": f"bytes */{self.file_size}", "Content-Length": "0"}
+
+        if len(self.ranges) == 1:
+            start, end = self.ranges[0]
+            return 206, {
+                "Content-Type": self.media_type,
+                "Content-Range": f"bytes {start}-{end}/{self.file_size}",
+                "Content-Length": str(end - start + 1),
+            }
+
+        self.boundary = uuid.uuid4().hex
+        length = sum(len(self._part_header(start, end)) + (end - start + 1) for start, end in self.ranges)
+        length += len(self._closing_boundary())
+        return 206, {
+            "Content-Type": f"multipart/byteranges; boundary={self.boundary}",
+            "Content-Length": str(length),
+        }
+
+    def _part_header(self, start, end):
+        return (
+            f"\r\n--{self.boundary}\r\n"
+            f"Content-Type: {self.media_type}\r\n"
+            f"Content-Range: bytes {start}-{end}/{self.file_size}\r\n\r\n"
+        ).encode("latin-1")
+
+    def _closing_boundary(self):
+        return f"\r\n--{self.boundary}--\r\n".encode("latin-1")
+
+    async def _send_range(self, send, f, start, end, zerocopy, more_body_after):
+        remaining = end - start + 1
+        offset = start
+        while remaining > 0:
+            count = min(self.chunk_size, remaining)
+            remaining -= count
+            more = remaining > 0 or more_body_after
+            if zerocopy:
+                await send({"type": "http.response.zerocopysend", "file": f.fileno(),
+                            "offset": offset, "count": count, "more_body": more})
+            else:
+                chunk = await anyio.to_thread.run_sync(os.pread, f.fileno(), count, offset)
+                if len(chunk) < count:
+                    # الملف تقلص أثناء الإرسال: Content-Length المُعلن لم يعد ممكناً، فنرفع خطأ ليقطع الخادم
+                    # الاتصال بدل ترك الاستجابة معلقة بدون رسالة more_body=False
+                    raise RuntimeError(f"❌ تغير حجم الملف أثناء الإرسال: {self.path}")
+                await send({"type": "http.response.body", "body": chunk, "more_body": more})
+            offset += count
+
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+
+        if not self.send_body or not self.ranges:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        zerocopy = "http.response.zerocopysend" in scope.get("extensions", {})
+        with open(self.path, "rb") as f:
+            if self.boundary is None:
+                start, end = self.ranges[0]
+                await self._send_range(send, f, start, end, zerocopy, False)
+                return
+
+            for start, end in self.ranges:
+                await send({"type": "http.response.body", "body": self._part_header(start, end), "more_body": True})
+                await self._send_range(send, f, start, end, zerocopy, True)
+            await send({"type": "http.response.body", "body": self._closing_boundary(), "more_body": False})
@@ -1 +1,3 @@
-from .tracker import Tracker
\ No newline at end of file
+from .tracker import Tracker
+from .ball_tracker import BallKalman, BallROITracker
+from .render_plan import RenderPlan, draw_tracks
@@ -0,0 +1,170 @@
+import json
+import time
+import pickle
+import numpy as np
+import cv2
+from tqdm import tqdm
+
+
+class BallKalman:
+    """مرشح كالمان بسرعة ثابتة لمركز الكرة: الحالة [x, y, vx, vy] والقياس [x, y]."""
+
+    def __init__(self, process_noise=30.0, measurement_noise=4.0):
+        self.q = process_noise
+        self.r = measurement_noise
+        self.x = None
+        self.P = None
+
+    @property
+    def initialized(self):
+        return self.x is not None
+
+    def predict(self, dt=1.0):
+        F = np.array([[1, 0, dt, 0], [0, 1, 0, dt], [0, 0, 1, 0], [0, 0, 0, 1]], dtype=np.float64)
+        # ضجيج تسارع عشوائي (نموذج السرعة الثابتة القياسي)
+        G = np.array([[dt ** 2 / 2, 0], [0, dt ** 2 / 2], [dt, 0], [0, dt]], dtype=np.float64)
+        self.x = F @ self.x
+        self.P = F @ self.P @ F.T + G @ G.T * self.q
+        return self.x[:2]
+
+    def update(self, center):
+        z = np.asarray(center, dtype=np.float64)
+        if self.x is None:
+            self.x = np.array([z[0], z[1], 0.0, 0.0])
+            self.P = np.diag([self.r, self.r, 1000.0, 1000.0])
+            return
+        H = np.array([[1, 0, 0, 0], [0, 1, 0, 0]], dtype=np.float64)
+        S = H @ self.P @ H.T + np.eye(2) * self.r
+        K = self.P @ H.T @ np.linalg.inv(S)
+        self.x = self.x + K @ (z - H @ self.x)
+        self.P = (np.eye(4) - K @ H) @ self.P
+
+    def position_std(self):
+        return float(np.sqrt(max(self.P[0, 0], self.P[1, 1])))
+
+
+class BallROITracker:
+    """عند فشل الكشف على الإطار الكامل في إيجاد الكرة نكشف على قص صغير بالدقة الكاملة حول موضعها المتوقع.
+    الكرة في القص لا تُصغّر إلى دقة النموذج فتظهر أكبر، والتكلفة أقل بكثير من كشف الإطار كاملاً بدقة عالية.
+    الناتج ملف كشف بنفس الصيغة مع إضافة الكرة المكتشفة، ليستهلكه get_object_tracks كما هو."""
+
+    def __init__(self, model, roi_size=640, conf=0.15, max_misses=40, ball_class=0, gate_sigmas=4.0):
+        self.model = model
+        self.roi_size = roi_size
+        self.conf = conf
+        self.max_misses = max_misses  # بعدها نتوقف عن التوقع (نفس حد تعويض الكرة)
+        self.ball_class = ball_class
+        self.gate_sigmas = gate_sigmas
+        self.stats = {}
+
+    def crop_window(self, center, frame_shape):
+        h, w = frame_shape[:2]
+        size = min(self.roi_size, w, h)
+        x1 = int(np.clip(center[0] - size / 2, 0, w - size))
+        y1 = int(np.clip(center[1] - size / 2, 0, h - size))
+        return x1, y1, size
+
+    def detect_in_roi(self, frame, center):
+        x1, y1, size = self.crop_window(center, frame.shape)
+        crop = frame[y1:y1 + size, x1:x1 + size]
+        result = self.model.predict(crop, conf=self.conf, classes=[self.ball_class], imgsz=self.roi_size,
+                                    verbose=False)[0]
+        if result.boxes is None or len(result.boxes) == 0:
+            return None
+        boxes = result.boxes.xyxy.cpu().numpy()
+        confs = result.boxes.conf.cpu().numpy()
+        # الأقرب للموضع المتوقع
+        centers = (boxes[:, :2] + boxes[:, 2:]) / 2 + [x1, y1]
+        best = int(np.argmin(np.linalg.norm(centers - center, axis=1)))
+        return (boxes[best] + [x1, y1, x1, y1]).tolist(), float(confs[best])
+
+    def _pick_ball(self, detection, kalman, predicted):
+        """أفضل كرة من كشف الإطار الكامل: الأقرب للتوقع ضمن بوابة، أو الأعلى ثقة قبل بدء التتبع."""
+        candidates = [
+            (box, conf) for box, cls, conf in zip(detection["boxes"], detection["class_ids"], detection["confidences"])
+            if int(cls) == self.ball_class
+        ]
+        if not candidates:
+            return None
+        if predicted is None:
+            return max(candidates, key=lambda c: c[1])
+        gate = self.gate_sigmas * kalman.position_std() + self.roi_size / 2
+        dist = [np.hypot((b[0] + b[2]) / 2 - predicted[0], (b[1] + b[3]) / 2 - predicted[1]) for b, _ in candidates]
+        best = int(np.argmin(dist))
+        return candidates[best] if dist[best] <= gate else None
+
+    def _set_ball(self, detection, ball):
+        """يبقى في الكشف صندوق الكرة الذي قبله مرشح كالمان فقط (أو لا شيء)، حتى لا يأخذ get_object_tracks
+        أول كرة في القائمة وهي ربما خارج البوابة."""
+        others = [
+            (box, cls, conf) for box, cls, conf in zip(detection["boxes"], detection["class_ids"], detection["confidences"])
+            if int(cls) != self.ball_class
+        ]
+        if ball is not None:
+            others.insert(0, (ball[0], float(self.ball_class), ball[1]))
+        detection["boxes"] = [box for box, _, _ in others]
+        detection["class_ids"] = [cls for _, cls, _ in others]
+        detection["confidences"] = [conf for _, _, conf in others]
+
+    def process(self, detection_file, frame_files, output_file):
+        """frame_files بنفس ترتيب سجلات ملف الكشف (كما يرتبها detect_frames_from_folder)."""
+        kalman = BallKalman()
+        misses = 0
+        prev_index = None
+        stats = {"frames": 0, "full_frame_hits": 0, "roi_attempts": 0, "roi_hits": 0, "roi_seconds": 0.0}
+
+        with open(detection_file, "rb") as f_in, open(output_file, "wb") as f_out, \
+                tqdm(total=len(frame_files), desc="⚽ تتبع الكرة (ROI)") as pbar:
+            for frame_path in frame_files:
+                try:
+                    detection = pickle.load(f_in)
+                except EOFError:
+                    break
+                stats["frames"] += 1
+                frame_index = detection["frame_index"]
+
+                if misses > self.max_misses:
+                    kalman = BallKalman()  # ضاعت الكرة طويلاً: نبدأ من جديد عند ظهورها
+                    misses = 0
+                predicted = None
+                if kalman.initialized:
+                    predicted = kalman.predict(dt=frame_index - prev_index if prev_index is not None else 1)
+                prev_index = frame_index
+
+                ball = self._pick_ball(detection, kalman, predicted)
+                if ball is not None:
+                    stats["full_frame_hits"] += 1
+                elif predicted is not None:
+                    stats["roi_attempts"] += 1
+                    t0 = time.perf_counter()
+                    ball = self.detect_in_roi(cv2.imread(frame_path), predicted)
+                    stats["roi_seconds"] += time.perf_counter() - t0
+                    if ball is not None:
+                        stats["roi_hits"] += 1
+                # كرات الإطار الكامل خارج البوابة تُحذف، والكرة المقبولة (من الإطار أو ROI) تصبح الوحيدة
+                self._set_ball(detection, ball)
+
+                if ball is not None:
+                    box = ball[0]
+                    kalman.update(((box[0] + box[2]) / 2, (box[1] + box[3]) / 2))
+                    misses = 0
+                else:
+                    misses += 1
+
+                pickle.dump(detection, f_out)
+                pbar.update(1)
+
+        attempts = stats["roi_attempts"]
+        stats["roi_ms_per_attempt"] = round(1000 * stats["roi_seconds"] / attempts, 2) if attempts else 0.0
+        stats["roi_ms_per_frame"] = round(1000 * stats["roi_seconds"] / max(1, stats["frames"]), 2)
+        stats["ball_presence"] = round((stats["full_frame_hits"] + stats["roi_hits"]) / max(1, stats["frames"]), 3)
+        stats["roi_seconds"] = round(stats["roi_seconds"], 2)
+        self.stats = stats
+        print(f"⚽ الكرة: {stats['full_frame_hits']} من الإطار الكامل + {stats['roi_hits']}/{attempts} من ROI "
+              f"(حضور {stats['ball_presence']:.0%}، {stats['roi_ms_per_attempt']}ms لكل ROI، "
+              f"{stats['roi_ms_per_frame']}ms لكل إطار)")
+        return stats
+
+    def save_report(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.stats, f, ensure_ascii=False, indent=2)
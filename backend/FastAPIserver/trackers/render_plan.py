@@ -0,0 +1,121 @@
+import pickle
+from collections import Counter, defaultdict
+import cv2
+import numpy as np
+
+# ألوان الرسم (BGR)
+TEAM_COLORS = {
+    0: (0, 0, 255),       # فريق 1 - أحمر
+    1: (0, 255, 255),     # فريق 2 - أصفر
+    -1: (128, 128, 128),  # مجهول - رمادي
+}
+CATEGORY_COLORS = {
+    "referees": (255, 0, 255),
+    "goalkeeper": (255, 255, 0),
+}
+BALL_COLOR = (0, 255, 0)
+HIGHLIGHT_COLOR = (0, 0, 0)
+
+# قوس الإطار السفلي (-45° → 235°) كما في Tracker.draw_ellipse، محسوب مرة واحدة على دائرة الوحدة
+_ARC_DEGREES = np.arange(-45, 236, 5, dtype=np.float64)
+_UNIT_ARC = np.stack([np.cos(np.deg2rad(_ARC_DEGREES)), np.sin(np.deg2rad(_ARC_DEGREES))], axis=1)
+_TRIANGLE = np.array([[0, 0], [-10, -20], [10, -20]], dtype=np.int32)
+
+
+def ellipse_polylines(bboxes):
+    """نقاط أقواس كل الصناديق دفعة واحدة: (N, len(arc), 2) int32 لاستدعاء polylines واحد."""
+    b = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)
+    centers = np.stack([((b[:, 0] + b[:, 2]) / 2).astype(np.int32), b[:, 3].astype(np.int32)], axis=1)
+    width = (b[:, 2] - b[:, 0]).astype(np.int32)
+    axes = np.stack([width, (0.35 * width).astype(np.int32)], axis=1)
+    pts = centers[:, None, :] + axes[:, None, :] * _UNIT_ARC[None, :, :]
+    return np.round(pts).astype(np.int32)
+
+
+def triangle_polygons(bboxes):
+    b = np.asarray(bboxes, dtype=np.float64).reshape(-1, 4)
+    tips = np.stack([((b[:, 0] + b[:, 2]) / 2).astype(np.int32), b[:, 1].astype(np.int32)], axis=1)
+    return tips[:, None, :] + _TRIANGLE[None, :, :]
+
+
+def draw_tracks(frame, tracks, team_of, highlight_ids=(), in_place=False):
+    """رسم إطار واحد: نجمع الصناديق حسب اللون ثم polylines/fillPoly واحد لكل لون.
+    team_of(track_id) ← رقم الفريق. in_place=True يرسم على نفس المصفوفة بدون نسخ."""
+    if not in_place:
+        frame = frame.copy()
+
+    ellipses = defaultdict(list)
+    for category in ("players", "referees", "goalkeeper"):
+        for track_id, obj in tracks.get(category, {}).items():
+            bbox = obj.get("bbox")
+            if bbox is None:
+                continue
+            if track_id in highlight_ids:
+                color = HIGHLIGHT_COLOR
+            elif category == "players":
+                color = TEAM_COLORS.get(team_of(track_id), TEAM_COLORS[-1])
+            else:
+                color = CATEGORY_COLORS[category]
+            ellipses[color].append(bbox)
+
+    for color, bboxes in ellipses.items():
+        cv2.polylines(frame, list(ellipse_polylines(bboxes)), False, color, 2, cv2.LINE_4)
+
+    balls = [b["bbox"] for b in tracks.get("ball", {}).values() if b.get("bbox") is not None]
+    if balls:
+        triangles = list(triangle_polygons(balls))
+        cv2.fillPoly(frame, triangles, BALL_COLOR)
+        cv2.polylines(frame, triangles, True, (0, 0, 0), 2)
+    return frame
+
+
+class RenderPlan:
+    """لون الفريق لكل مسار يُحسم مرة واحدة (تصويت الأغلبية على المباراة كاملة أو لكل مقطع)
+    بدل إعادة بناء player_team_map من سجلات الفرق في كل إطار."""
+
+    def __init__(self, teams, segment_frames=None, highlight_ids=()):
+        self.teams = teams  # {segment: {player_id: team}}، المفتاح None للمباراة كاملة
+        self.segment_frames = segment_frames
+        self.highlight_ids = set(highlight_ids)
+
+    @classmethod
+    def from_records(cls, records, segment_frames=None, highlight_ids=()):
+        votes = defaultdict(lambda: defaultdict(Counter))
+        for record in records:
+            pid = record.get("player_id")
+            if pid is None:
+                continue
+            team = record.get("team", -1)
+            votes[None][pid][team] += 1  # تصويت المباراة كاملة: احتياط للمسار الغائب عن مقطع
+            if segment_frames:
+                votes[record["frame_index"] // segment_frames][pid][team] += 1
+        teams = {
+            segment: {pid: counter.most_common(1)[0][0] for pid, counter in players.items()}
+            for segment, players in votes.items()
+        }
+        return cls(teams, segment_frames, highlight_ids)
+
+    @classmethod
+    def from_teams_file(cls, teams_file, segment_frames=None, highlight_ids=()):
+        """ملف الفرق: سجلات pickle متتالية {frame_index, player_id, team} كما يكتبها TeamAssigner."""
+        def records():
+            with open(teams_file, "rb") as f:
+                try:
+                    while True:
+                        yield pickle.load(f)
+                except EOFError:
+                    return
+        return cls.from_records(records(), segment_frames, highlight_ids)
+
+    def _lookup(self, frame_index):
+        match_teams = self.teams.get(None, {})
+        if not self.segment_frames:
+            return lambda tid: match_teams.get(tid, -1)
+        segment_teams = self.teams.get(frame_index // self.segment_frames, {})
+        return lambda tid: segment_teams.get(tid, match_teams.get(tid, -1))
+
+    def team_of(self, track_id, frame_index=0):
+        return self._lookup(frame_index)(track_id)
+
+    def draw(self, frame, tracks, frame_index, in_place=False):
+        return draw_tracks(frame, tracks, self._lookup(frame_index), self.highlight_ids, in_place)
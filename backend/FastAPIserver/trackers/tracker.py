@@ -13,11 +13,20 @@ import gzip
 import numpy as np
 import re
 import pandas as pd
+from .render_plan import RenderPlan, draw_tracks
 def extract_frame_number(filename):
     """استخراج رقم الإطار من اسم الملف"""
     match = re.search(r'frame(\d+)\.(jpg|png)', filename)
     return int(match.group(1)) if match else -1
 
+def sorted_frame_files(frames_folder):
+    """ملفات الإطارات مرتبة رقمياً (نفس ترتيب سجلات ملف الكشف)."""
+    return sorted([
+        os.path.join(frames_folder, f)
+        for f in os.listdir(frames_folder)
+        if f.endswith(('.jpg', '.png'))
+    ], key=lambda x: extract_frame_number(os.path.basename(x)))
+
 class Tracker:
     def __init__(self, model_path):
         self.model = YOLO(model_path)
@@ -116,13 +125,11 @@ class Tracker:
     
 
 
-    def detect_frames_from_folder(self, frames_folder, output_file, batch_size=20):
+    def detect_frames_from_folder(self, frames_folder, output_file, batch_size=20, index_step=None):
+        # index_step=None: frame_index حسب الترتيب (السلوك القديم)
+        # index_step=n: frame_index = رقم الإطار في الاسم // n (للإطارات غير المتتالية في الأخذ التكيفي)
         # --- ترتيب الإطارات ترتيبًا رقميًا باستخدام frame number ---
-        frame_files = sorted([
-            os.path.join(frames_folder, f)
-            for f in os.listdir(frames_folder)
-            if f.endswith(('.jpg', '.png'))
-        ], key=lambda x: extract_frame_number(os.path.basename(x)))
+        frame_files = sorted_frame_files(frames_folder)
 
         print(f"📸 عدد الإطارات: {len(frame_files)}")
 
@@ -134,7 +141,10 @@ class Tracker:
                 detections_batch = self.model.predict(batch_frames, conf=0.3)
 
                 for j, detection in enumerate(detections_batch):
-                    frame_index = i + j  # يعتمد على ترتيب الملفات بعد الفرز
+                    if index_step:
+                        frame_index = extract_frame_number(os.path.basename(batch_files[j])) // index_step
+                    else:
+                        frame_index = i + j  # يعتمد على ترتيب الملفات بعد الفرز
 
                     simplified = {
                         'frame_index': frame_index,
@@ -149,8 +159,20 @@ class Tracker:
 
 
 
-    def get_object_tracks(self, detection_file, output_file):
+    def detect_ball_roi(self, detection_file, frames_folder, output_file, report_file=None, **kwargs):
+        """إكمال الكرة المفقودة في ملف الكشف بالكشف على قص حول موضعها المتوقع (كالمان)."""
+        from .ball_tracker import BallROITracker
+        ball_tracker = BallROITracker(self.model, **kwargs)
+        ball_tracker.process(detection_file, sorted_frame_files(frames_folder), output_file)
+        if report_file:
+            ball_tracker.save_report(report_file)
+        return ball_tracker.stats
+
+    def get_object_tracks(self, detection_file, output_file, reset_gap=None):
+        # reset_gap: إعادة ضبط ByteTrack عند قفزة في frame_index أكبر منها (بين نوافذ الأخذ التكيفي)
         max_frame_index = -1
+        # كل ملف كشف مباراة (أو جزء) مستقل: لا نربط إطاراته بمسارات مفقودة من تشغيل سابق لنفس Tracker
+        self.tracker.reset()
 
         # الخطوة 1: حساب عدد الإطارات
         frame_count = 0
@@ -181,6 +203,8 @@ class Tracker:
                     if confidences.size == 0:
                         confidences = np.zeros((0,), dtype=np.float32)
 
+                    if reset_gap and max_frame_index >= 0 and frame_index - max_frame_index > reset_gap:
+                        self.tracker.reset()
                     max_frame_index = max(max_frame_index, frame_index)
 
                     # تحويل البيانات إلى كائن supervision.Detections
@@ -262,61 +286,17 @@ class Tracker:
 
         return frame
     
-    def draw_annotations_single_frame(self, frame, tracks, frame_teams):
-        frame = frame.copy()
-        player_dict = tracks.get("players", {})
-        ball_dict = tracks.get("ball", {})
-        referee_dict = tracks.get("referees", {})
-        goalkeeper_dict = tracks.get("goalkeeper", {})
-
+    def draw_annotations_single_frame(self, frame, tracks, frame_teams, highlight_ids=(), in_place=False):
+        """رسم إطار واحد من سجلات الفرق الخاصة به. لمباراة كاملة استخدم build_render_plan (الفريق يُحسم مرة واحدة)."""
         # بناء خريطة player_id -> team_id من frame_teams
         player_team_map = {}
         for record in frame_teams:
             pid = record.get("player_id")
-            team = record.get("team", -1)
             if pid is not None:
-                player_team_map[pid] = team
-
-        # ألوان الفريقين (يمكن تعديل أو إضافة ألوان ديناميكياً لو تبي)
-        team_colors = {
-            0: (0, 0, 255),     # فريق 1 - أحمر
-            1: (0, 255, 255),     # فريق 2 - أزرق
-            -1: (128, 128, 128) # مجهول - رمادي
-        }
-
-        # اللاعبين مع تحديد اللون حسب الفريق من player_team_map
-        for track_id, player in player_dict.items():
-            team_id = player_team_map.get(track_id, -1)  # إذا غير موجود اعتبر مجهول
-            color = team_colors.get(team_id, (128, 128, 128))  # لون الفريق أو رمادي
-            bbox = player.get("bbox")
-            if bbox is not None:
-                 if track_id==198 or track_id==239:
-                    frame = self.draw_ellipse(frame, bbox, (0, 0, 0), track_id)
-                 else:
-                    frame = self.draw_ellipse(frame, bbox, color, track_id)
-
-        # الكرة
-        for track_id, ball in ball_dict.items():
-            bbox = ball.get("bbox")
-            if bbox is not None:
-                frame = self.draw_traingle(frame, bbox, (0, 255, 0))
-
-        # الحكّام
-        for track_id, referee in referee_dict.items():
-            bbox = referee.get("bbox")
-            if bbox is not None:
-                if track_id==198 or track_id==239:
-                    frame = self.draw_ellipse(frame, bbox, (0, 0, 0), track_id)
-                else:
-                    frame = self.draw_ellipse(frame, bbox, (255, 0, 255), track_id)
-
-        # الحراس
-        for track_id, goalkeeper in goalkeeper_dict.items():
-            bbox = goalkeeper.get("bbox")
-            if bbox is not None:
-                if track_id==198 or track_id==239:
-                    frame = self.draw_ellipse(frame, bbox, (0, 0, 0), track_id)
-                else:
-                    frame = self.draw_ellipse(frame, bbox, (255, 255, 0), track_id)
-        return frame
+                player_team_map[pid] = record.get("team", -1)
+        return draw_tracks(frame, tracks, lambda tid: player_team_map.get(tid, -1), set(highlight_ids), in_place)
+
+    def build_render_plan(self, teams_file, segment_frames=None, highlight_ids=()):
+        """segment_frames=None: فريق واحد لكل مسار على كامل المباراة، وإلا تصويت لكل مقطع بهذا الطول (frame_index)."""
+        return RenderPlan.from_teams_file(teams_file, segment_frames=segment_frames, highlight_ids=highlight_ids)
 
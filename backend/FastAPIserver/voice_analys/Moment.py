@@ -1,14 +1,43 @@
+import os
 import json
 import re
+import numpy as np
+import torch
 from tqdm import tqdm
-from sentence_transformers import SentenceTransformer, util
+from sentence_transformers import SentenceTransformer
+from .embedding_cache import EmbeddingCache
+from .lexical_filter import LexicalPrefilter
+
+MODEL_NAME = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache", "embeddings.sqlite3")
+DEFAULT_ONNX_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache", "onnx")
 
 class MomentClassifier:
-    def __init__(self, window_size=2, threshold=0.95):
-        print("📦 تحميل نموذج التصنيف...")
-        self.model = SentenceTransformer("sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
+    def __init__(self, window_size=2, threshold=0.95, batch_size=256, chunk_size=8192,
+                 cache_path=DEFAULT_CACHE_PATH, cache_max_entries=500_000,
+                 prefilter=False, prefilter_min_similarity=0.5,
+                 backend="torch", num_threads=None, onnx_dir=DEFAULT_ONNX_DIR,
+                 parity_min_cosine=0.98, parity_min_agreement=0.95, parity_sample=2000):
+        # backend="onnx": نسخة ONNX مكممة INT8 أسرع على المعالج (تحتاج onnxruntime)
+        if backend not in ("torch", "onnx"):
+            raise ValueError(f"❌ backend غير مدعوم: {backend}")
+        self.backend = backend
+        # حدود التطابق مع PyTorch التي يجب أن يحققها ONNX قبل استخدامه (تُفحص مرة واحدة لكل مصنف)
+        self.parity_min_cosine = parity_min_cosine
+        self.parity_min_agreement = parity_min_agreement
+        self.parity_sample = parity_sample
+        self._parity_checked = backend == "torch"
+        self.num_threads = num_threads
+        self.onnx_dir = onnx_dir
+        # تمثيلات ONNX المكممة تختلف قليلاً، لذلك مفتاح التخزين المؤقت مختلف
+        self.model_name = MODEL_NAME if backend == "torch" else f"{MODEL_NAME}:onnx-int8"
+        self._model = None
+        # cache_path=None يعطّل التخزين الدائم
+        self.cache = EmbeddingCache(cache_path, self.model_name, cache_max_entries) if cache_path else None
         self.window_size = window_size
         self.threshold = threshold
+        self.batch_size = batch_size  # حجم الدفعة داخل model.encode
+        self.chunk_size = chunk_size  # عدد المقاطع في كل ضرب مصفوفات (للحد من الذاكرة)
         self.reference_phrases = {
         "goal": ["هدف", "غووول", "سجلها", "الشباك", "المرمى","يسجل","الأول" ,"الثاني"," الثالث","الرابع","الخامس","فعلها","هدفان","يسدد","يسجل","قول","التعادل","تدخل","الرئسية","غول","وتسديده","يحط","التعادل","مش ممكن"," لمن الحل","جول"],
         "chance": ["خطيرة", "هجومية", "مرتدة", "انفراد", "ممكنة","مباشرة","عرضية","ركنية"],
@@ -19,6 +48,45 @@ class MomentClassifier:
         "excitement": ["مجنونة", "خطيرة","ضغط"]
         }
         self.reference_embeddings = self._embed_reference_phrases()
+        self._stack_reference_embeddings()
+        # مع عتبة 0.95 لا يمر عملياً إلا ما يطابق العبارات المرجعية لفظياً، فنتخطى البقية قبل التمثيل.
+        # معطل افتراضياً حتى يُقاس استرجاعه مقابل التصنيف الكامل (benchmarks/bench_lexical_prefilter.py)
+        self.prefilter = LexicalPrefilter(self.reference_phrases, prefilter_min_similarity) if prefilter else None
+
+    @property
+    def model(self):
+        # تحميل النموذج فقط عند الحاجة: إذا كانت كل التمثيلات مخزنة لا نحمله أصلاً
+        if self._model is None:
+            print(f"📦 تحميل نموذج التصنيف ({self.backend})...")
+            if self.backend == "onnx":
+                from .onnx_encoder import OnnxSentenceEncoder
+                self._model = OnnxSentenceEncoder(MODEL_NAME, self.onnx_dir, num_threads=self.num_threads)
+            else:
+                if self.num_threads:
+                    torch.set_num_threads(self.num_threads)
+                self._model = SentenceTransformer(MODEL_NAME)
+        return self._model
+
+    def encode_unique(self, texts):
+        """تمثيلات مُطبّعة للنصوص بعد إزالة التكرار، مع استخدام التخزين الدائم إن وُجد."""
+        unique_texts = list(dict.fromkeys(texts))
+        vectors = self.cache.get_many(unique_texts) if self.cache else {}
+
+        missing = [text for text in unique_texts if text not in vectors]
+        if missing:
+            encoded = self.model.encode(
+                missing,
+                batch_size=self.batch_size,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=False
+            ).astype(np.float32)
+            new_vectors = dict(zip(missing, encoded))
+            vectors.update(new_vectors)
+            if self.cache:
+                self.cache.put_many(new_vectors.items())
+
+        return unique_texts, vectors
 
     def _clean_text(self, text):
         text = re.sub(r'(.)\1{2,}', r'\1', text)
@@ -27,11 +95,24 @@ class MomentClassifier:
 
     def _embed_reference_phrases(self):
         print("🔍 حساب تمثيلات الجمل المرجعية...")
+        all_phrases = [phrase for phrases in self.reference_phrases.values() for phrase in phrases]
+        _, vectors = self.encode_unique(all_phrases)
         embeddings = {}
         for label, phrases in self.reference_phrases.items():
-            embeddings[label] = self.model.encode(phrases, convert_to_tensor=True)
+            embeddings[label] = torch.from_numpy(np.stack([vectors[phrase] for phrase in phrases]))
         return embeddings
 
+    def _stack_reference_embeddings(self):
+        """دمج تمثيلات كل التصنيفات في مصفوفة واحدة مُطبّعة مع حدود كل تصنيف داخلها."""
+        self.labels = list(self.reference_embeddings.keys())
+        refs = [self.reference_embeddings[label] for label in self.labels]
+        self.reference_matrix = torch.nn.functional.normalize(torch.cat(refs), dim=1)
+        self.label_bounds = []
+        offset = 0
+        for emb in refs:
+            self.label_bounds.append((offset, offset + len(emb)))
+            offset += len(emb)
+
     def load_transcription(self, file_path):
         with open(file_path, encoding="utf-8") as f:
             return json.load(f)
@@ -47,26 +128,81 @@ class MomentClassifier:
             })
         return segments
 
+    def score_texts(self, texts):
+        """أعلى تشابه لكل نص مع كل تصنيف: مصفوفة (عدد النصوص × عدد التصنيفات).
+        النصوص المكررة (أسماء اللاعبين، "هدف"...) تُمثّل مرة واحدة فقط."""
+        unique_texts, vectors = self.encode_unique(texts)
+        unique_matrix = torch.from_numpy(np.stack([vectors[text] for text in unique_texts]))
+        row_of = {text: i for i, text in enumerate(unique_texts)}
+        embeddings = unique_matrix[[row_of[text] for text in texts]]
+        similarity = embeddings @ self.reference_matrix.T
+        return torch.stack([similarity[:, start:end].max(dim=1).values for start, end in self.label_bounds], dim=1)
+
+    def _best_labels(self, vectors, reference):
+        """رقم أفضل تصنيف يتجاوز العتبة لكل تمثيل (-1 بدون تصنيف)، بنفس قاعدة classify_segments."""
+        similarity = vectors @ reference.T
+        scores = np.stack([similarity[:, start:end].max(axis=1) for start, end in self.label_bounds], axis=1)
+        best = scores.argmax(axis=1)
+        return np.where(scores.max(axis=1) > max(self.threshold, 0.0), best, -1)
+
+    def check_backend_parity(self, texts):
+        """مقارنة ONNX INT8 مع PyTorch على عينة من نصوص المباراة: متوسط تشابه التمثيلات وتطابق التصنيفات.
+        يرفع خطأ إذا قل أحدهما عن الحد بدل إكمال التصنيف بنموذج أفسده التكميم."""
+        phrases = [phrase for label in self.labels for phrase in self.reference_phrases[label]]
+        sample = list(dict.fromkeys(texts))[:self.parity_sample]
+        probe = list(dict.fromkeys(phrases + sample))
+        row_of = {text: i for i, text in enumerate(probe)}
+
+        print(f"🔬 فحص تطابق ONNX مع PyTorch على {len(sample)} مقطع...")
+        options = dict(batch_size=self.batch_size, convert_to_numpy=True, normalize_embeddings=True,
+                       show_progress_bar=False)
+        onnx_vectors = np.asarray(self.model.encode(probe, **options), dtype=np.float32)
+        torch_vectors = np.asarray(SentenceTransformer(MODEL_NAME, device="cpu").encode(probe, **options),
+                                   dtype=np.float32)
+
+        cosine = float((onnx_vectors * torch_vectors).sum(axis=1).mean())
+        # كل طرف يُصنف بعباراته المرجعية من نفس المحرك
+        reference_rows = [row_of[phrase] for phrase in phrases]
+        sample_rows = [row_of[text] for text in sample]
+        onnx_labels = self._best_labels(onnx_vectors[sample_rows], onnx_vectors[reference_rows])
+        torch_labels = self._best_labels(torch_vectors[sample_rows], torch_vectors[reference_rows])
+        # التطابق على المقاطع التي صنفها أحد الطرفين فقط؛ الأغلبية بدون تصنيف تضخم النسبة
+        labeled = (onnx_labels >= 0) | (torch_labels >= 0)
+        agreement = float((onnx_labels[labeled] == torch_labels[labeled]).mean()) if labeled.any() else 1.0
+
+        print(f"🎯 ONNX مقابل PyTorch: تشابه التمثيلات {cosine:.4f}، تطابق التصنيفات {agreement:.2%} "
+              f"({int(labeled.sum())} مقطع مصنف)")
+        if cosine < self.parity_min_cosine or agreement < self.parity_min_agreement:
+            raise RuntimeError(
+                f"❌ نموذج ONNX لا يطابق PyTorch (تشابه {cosine:.4f} < {self.parity_min_cosine} "
+                f"أو تطابق {agreement:.2%} < {self.parity_min_agreement:.0%}): استخدم backend=torch أو أعد التصدير"
+            )
+        self._parity_checked = True
+
     def classify_segments(self, segments):
         important_moments = []
-        for seg in tqdm(segments, desc="🧠 تصنيف الجمل"):
-            seg_embedding = self.model.encode(seg['text'], convert_to_tensor=True)
-            best_label = None
-            best_score = 0.0
-
-            for label, refs in self.reference_embeddings.items():
-                score = util.pytorch_cos_sim(seg_embedding, refs).max().item()
-                if score > self.threshold and score > best_score:
-                    best_label = label
-                    best_score = score
-
-            if best_label:
+        for chunk_start in tqdm(range(0, len(segments), self.chunk_size), desc="🧠 تصنيف الجمل", unit="chunk"):
+            chunk = segments[chunk_start:chunk_start + self.chunk_size]
+            if self.prefilter is not None:
+                chunk = [chunk[i] for i in self.prefilter.filter_indexes([seg['text'] for seg in chunk])]
+            if not chunk:
+                continue
+            label_scores = self.score_texts([seg['text'] for seg in chunk])
+
+            # نفس قاعدة الحلقة القديمة: أعلى درجة تتجاوز العتبة، وعند التساوي يفوز التصنيف الأول
+            passing = label_scores > max(self.threshold, 0.0)
+            masked = torch.where(passing, label_scores, torch.full_like(label_scores, float("-inf")))
+            best_scores, best_indexes = masked.max(dim=1)
+            has_label = passing.any(dim=1)
+
+            for i in torch.nonzero(has_label).flatten().tolist():
+                seg = chunk[i]
                 important_moments.append({
-                    "label": best_label,
+                    "label": self.labels[best_indexes[i].item()],
                     "text": seg['text'],
                     "start": seg['start'],
                     "end": seg['end'],
-                    "score": round(best_score, 2)
+                    "score": round(best_scores[i].item(), 2)
                 })
 
         return important_moments
@@ -76,12 +212,26 @@ class MomentClassifier:
             json.dump(results, f, ensure_ascii=False, indent=2)
         print(f"✅ تم حفظ اللحظات المهمة في: {output_file}")
 
+    def reset_stats(self):
+        """عدادات الفلتر والتخزين المؤقت لكل مباراة: المصنف نفسه يُستخدم لكل مباريات الدفعة."""
+        if self.prefilter is not None:
+            self.prefilter.checked = self.prefilter.skipped = 0
+        if self.cache:
+            self.cache.hits = self.cache.misses = 0
+
     def process(self, transcription_path, output_path="important_moments.json"):
+        self.reset_stats()
         print("📂 تحميل تفريغ Whisper...")
         words = self.load_transcription(transcription_path)
         print("📄 إنشاء مقاطع قصيرة...")
         segments = self.generate_segments(words)
+        if not self._parity_checked:
+            self.check_backend_parity([seg['text'] for seg in segments])
         print("🔎 تصنيف اللحظات المهمة...")
         moments = self.classify_segments(segments)
+        if self.prefilter is not None:
+            print(f"⚡ الفلتر المعجمي تخطى {self.prefilter.skipped} من {self.prefilter.checked} مقطع")
+        if self.cache:
+            print(f"💾 التخزين المؤقت للتمثيلات: {self.cache.hits} موجود، {self.cache.misses} جديد")
         self.save_results(moments, output_path)
         return moments
@@ -1,58 +1,149 @@
 import os
 import subprocess
-import whisper
+import tempfile
 import json
+import numpy as np
 from tqdm import tqdm
-import torch
+from .asr_backends import get_backend
+from .vad import EnergyVAD
+
+SAMPLE_RATE = 16000
+
+
+def ffmpeg_audio_command(video_path, sample_rate=SAMPLE_RATE):
+    # فك ترميز الصوت مباشرة إلى float32 أحادي القناة على stdout بدون ملف مؤقت
+    return [
+        "ffmpeg", "-nostdin",
+        "-i", video_path,
+        "-vn",              # بدون فيديو
+        "-ac", "1",         # قناة صوتية واحدة
+        "-ar", str(sample_rate),  # 16 kHz
+        "-f", "f32le",
+        "-acodec", "pcm_f32le",
+        "pipe:1"
+    ]
+
+
+def load_audio_from_ffmpeg(video_path, sample_rate=SAMPLE_RATE):
+    """الصوت كاملاً كمصفوفة NumPy float32 (16 kHz mono) عبر pipe من ffmpeg."""
+    result = subprocess.run(ffmpeg_audio_command(video_path, sample_rate), capture_output=True, check=False)
+    if result.returncode != 0:
+        raise RuntimeError(f"❌ فشل استخراج الصوت: {result.stderr.decode('utf-8', 'ignore')[-500:]}")
+    return np.frombuffer(result.stdout, dtype=np.float32).copy()
+
+
+def iter_audio_chunks(video_path, chunk_seconds, sample_rate=SAMPLE_RATE, vad=None):
+    """قراءة الصوت على دفعات (offset بالثواني، المصفوفة) للمباريات الطويلة بدل تحميله كاملاً في الذاكرة.
+    كل دفعة تنتهي عند أهدأ نقطة في نصفها الثاني (مثل EnergyVAD.chunks) لا عند عدد عينات ثابت،
+    والباقي يُضاف لبداية الدفعة التالية حتى لا تنقطع كلمة بين دفعتين."""
+    vad = vad or EnergyVAD()
+    chunk_bytes = int(chunk_seconds * sample_rate) * 4
+    # stderr في ملف مؤقت لا pipe: لا نقرؤه أثناء البث فقد يمتلئ ويوقف ffmpeg
+    stderr = tempfile.TemporaryFile()
+    process = subprocess.Popen(ffmpeg_audio_command(video_path, sample_rate),
+                               stdout=subprocess.PIPE, stderr=stderr)
+    offset = 0
+    pending = np.zeros(0, dtype=np.float32)
+    try:
+        while True:
+            data = process.stdout.read(chunk_bytes)
+            samples = np.concatenate((pending, np.frombuffer(data[:len(data) - len(data) % 4], dtype=np.float32)))
+            if not data:
+                if len(samples):
+                    yield offset / sample_rate, samples
+                break
+            energy_db, frame_len = vad.frame_energy_db(samples, sample_rate)
+            cut = vad.split_point(energy_db, frame_len, 0, len(samples))
+            yield offset / sample_rate, samples[:cut]
+            pending = samples[cut:]
+            offset += cut
+        if process.wait() != 0:
+            stderr.seek(0)
+            raise RuntimeError(f"❌ فشل استخراج الصوت: {stderr.read().decode('utf-8', 'ignore')[-500:]}")
+    finally:
+        process.stdout.close()
+        process.wait()
+        stderr.close()
+
 
 class WhisperTranscriber:
-    def __init__(self, model_size="medium"):
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+    def __init__(self, model_size="medium", backend="openai", language=None, **backend_kwargs):
+        # backend="faster": محرك CTranslate2 بتكميم int8 (أسرع على المعالج)
+        print(f"📦 تحميل نموذج Whisper بالحجم: {model_size} (محرك: {backend})")
+        self.backend = get_backend(backend, model_size, **backend_kwargs)
+        self.device = self.backend.device
+        self.language = language
         print(f"🚀 استخدام الجهاز: {self.device.upper()}")
-        print(f"📦 تحميل نموذج Whisper بالحجم: {model_size}")
-        self.model = whisper.load_model(model_size).to(self.device)
-
-    def extract_audio_with_ffmpeg(self, video_path, output_audio_path="temp_audio.wav"):
-        print("🎞️ استخراج الصوت من الفيديو...")
-        command = [
-            "ffmpeg", "-y",
-            "-i", video_path,
-            "-ac", "1",         # قناة صوتية واحدة
-            "-ar", "16000",     # 16 kHz
-            "-vn",              # بدون فيديو
-            output_audio_path
-        ]
-        subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        return output_audio_path
-
-    def transcribe_audio_to_json(self, audio_path, json_path="transcription.json"):
-        print("🧠 بدء التفريغ الصوتي...")
-        result = self.model.transcribe(
-            audio_path,
-            word_timestamps=True,
-            verbose=False,
-            fp16=(self.device == "cuda")
-        )
 
+    def _transcribe(self, audio, language=None):
+        # audio يمكن أن يكون مسار ملف أو مصفوفة float32 بتردد 16 kHz
+        return self.backend.transcribe(audio, language=language or self.language)
+
+    def _resolve_language(self, samples):
+        """اللغة مرة واحدة للمباراة: الكشف التلقائي على كل نافذة قصيرة بمفردها قد يخطئ ويفسدها."""
+        if self.language:
+            return self.language
+        language = self.backend.detect_language(samples)
+        print(f"🌐 اللغة المكتشفة: {language}")
+        return language
+
+    @staticmethod
+    def words_from_result(result, offset=0.0):
         words_data = []
         for segment in tqdm(result["segments"], desc="🔎 تحليل الكلمات"):
             for word_info in segment.get("words", []):
                 words_data.append({
                     "word": word_info["word"].strip(),
-                    "start": round(word_info["start"], 2),
-                    "end": round(word_info["end"], 2)
+                    "start": round(word_info["start"] + offset, 2),
+                    "end": round(word_info["end"] + offset, 2)
                 })
+        return words_data
 
+    @staticmethod
+    def save_words(words_data, json_path):
         with open(json_path, "w", encoding="utf-8") as f:
             json.dump(words_data, f, ensure_ascii=False, indent=2)
-
         print(f"💾 تم حفظ النتائج في {json_path}")
+
+    def transcribe_audio_to_json(self, audio, json_path="transcription.json"):
+        print("🧠 بدء التفريغ الصوتي...")
+        result = self._transcribe(audio)
+        self.save_words(self.words_from_result(result), json_path)
         return result["text"]
 
-    def transcribe_video(self, video_path, json_path="transcription.json"):
-        audio_path = self.extract_audio_with_ffmpeg(video_path)
-        full_text = self.transcribe_audio_to_json(audio_path, json_path)
-        os.remove(audio_path)
+    def transcribe_video(self, video_path, json_path="transcription.json", chunk_seconds=None, regions=None):
+        """تفريغ صوت الفيديو دون ملف wav مؤقت. chunk_seconds يحدد حجم الدفعة للمباريات الطويلة،
+        و regions (أزواج ثوانٍ) تقصر التفريغ على نوافذ محددة مثل لحظات الإثارة."""
+        print("🎞️ استخراج الصوت من الفيديو (pipe)...")
+        if regions is not None:
+            samples = load_audio_from_ffmpeg(video_path)
+            words_data = []
+            texts = []
+            language = None
+            for start, end in regions:
+                print(f"🧠 تفريغ النافذة {start:.0f}ث → {end:.0f}ث...")
+                window = samples[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)]
+                language = language or self._resolve_language(window)
+                result = self._transcribe(window, language)
+                words_data.extend(self.words_from_result(result, start))
+                texts.append(result["text"])
+            self.save_words(words_data, json_path)
+            full_text = " ".join(texts)
+        elif not chunk_seconds:
+            full_text = self.transcribe_audio_to_json(load_audio_from_ffmpeg(video_path), json_path)
+        else:
+            words_data = []
+            texts = []
+            language = None
+            for offset, samples in iter_audio_chunks(video_path, chunk_seconds):
+                print(f"🧠 تفريغ الدفعة عند {offset:.0f}ث...")
+                language = language or self._resolve_language(samples)
+                result = self._transcribe(samples, language)
+                words_data.extend(self.words_from_result(result, offset))
+                texts.append(result["text"])
+            self.save_words(words_data, json_path)
+            full_text = " ".join(texts)
+
         print("\n📝 النص الكامل:")
         print(full_text)
         return full_text
@@ -1,2 +1,6 @@
 from .Moment import MomentClassifier
-from .Whisper import WhisperTranscriber
\ No newline at end of file
+from .Whisper import WhisperTranscriber
+from .parallel_transcribe import ParallelWhisperTranscriber
+from .vad import EnergyVAD
+from .asr_backends import TranscriptionBackend, get_backend
+from .excitement import ExcitementDetector
\ No newline at end of file
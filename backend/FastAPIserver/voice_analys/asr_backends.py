@@ -0,0 +1,95 @@
+from abc import ABC, abstractmethod
+
+
+class TranscriptionBackend(ABC):
+    """واجهة موحدة لمحركات التفريغ. transcribe ترجع dict بنفس شكل openai-whisper:
+    {"text": ..., "segments": [{"words": [{"word", "start", "end"}, ...]}, ...]}"""
+
+    name = None
+
+    @abstractmethod
+    def transcribe(self, audio, language=None):
+        pass
+
+    @abstractmethod
+    def detect_language(self, audio):
+        """رمز اللغة (مثل "ar") من أول 30 ثانية من audio."""
+
+
+class OpenAIWhisperBackend(TranscriptionBackend):
+    name = "openai"
+
+    def __init__(self, model_size="medium", device=None, threads=None):
+        import torch
+        import whisper
+        if threads:
+            torch.set_num_threads(threads)
+        self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+        self.model = whisper.load_model(model_size, device=self.device)
+
+    def transcribe(self, audio, language=None):
+        options = {"language": language} if language else {}
+        return self.model.transcribe(
+            audio,
+            word_timestamps=True,
+            verbose=False,
+            fp16=(self.device == "cuda"),
+            **options
+        )
+
+    def detect_language(self, audio):
+        import whisper
+        mel = whisper.log_mel_spectrogram(whisper.pad_or_trim(audio), n_mels=self.model.dims.n_mels)
+        _, probs = self.model.detect_language(mel.to(self.device))
+        return max(probs, key=probs.get)
+
+
+class FasterWhisperBackend(TranscriptionBackend):
+    """CTranslate2 (faster-whisper) مع int8 على المعالج: أسرع بكثير وذاكرة أقل مع نفس الأوزان."""
+
+    name = "faster"
+
+    def __init__(self, model_size="medium", device=None, threads=None, compute_type=None):
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError:
+            raise ImportError("❌ مكتبة faster-whisper غير مثبتة: pip install faster-whisper")
+        import torch
+        self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+        compute_type = compute_type or ("float16" if self.device == "cuda" else "int8")
+        self.model = WhisperModel(model_size, device=self.device, compute_type=compute_type,
+                                  cpu_threads=threads or 0)
+
+    def transcribe(self, audio, language=None):
+        segments, _ = self.model.transcribe(audio, word_timestamps=True, language=language)
+        result_segments = []
+        texts = []
+        for segment in segments:  # مولّد: التفريغ يحدث أثناء المرور عليه
+            texts.append(segment.text)
+            result_segments.append({
+                "start": segment.start,
+                "end": segment.end,
+                "text": segment.text,
+                "words": [
+                    {"word": w.word, "start": w.start, "end": w.end}
+                    for w in (segment.words or [])
+                ],
+            })
+        return {"text": "".join(texts), "segments": result_segments}
+
+    def detect_language(self, audio):
+        # الكشف يتم داخل transcribe قبل إرجاع المولّد، فلا نمر على المقاطع
+        _, info = self.model.transcribe(audio[:30 * 16000])
+        return info.language
+
+
+BACKENDS = {
+    OpenAIWhisperBackend.name: OpenAIWhisperBackend,
+    FasterWhisperBackend.name: FasterWhisperBackend,
+}
+
+
+def get_backend(name="openai", model_size="medium", **kwargs):
+    if name not in BACKENDS:
+        raise ValueError(f"❌ محرك تفريغ غير معروف: {name} (المتاح: {', '.join(BACKENDS)})")
+    return BACKENDS[name](model_size=model_size, **kwargs)
@@ -0,0 +1,76 @@
+import os
+import time
+import sqlite3
+import numpy as np
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    model TEXT NOT NULL,
+    text TEXT NOT NULL,
+    vector BLOB NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (model, text)
+);
+CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used);
+"""
+
+
+class EmbeddingCache:
+    """تخزين دائم لتمثيلات النصوص (model, text) → vector مشترك بين المباريات، مع حد أقصى للحجم (حذف الأقدم استخداماً)."""
+
+    def __init__(self, db_path, model_name, max_entries=500_000):
+        self.db_path = db_path
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def get_many(self, texts):
+        texts = list(texts)
+        found = {}
+        now = time.time()
+        with self._connect() as conn:
+            # SQLite يحد عدد المعاملات في الاستعلام الواحد
+            for i in range(0, len(texts), 900):
+                batch = texts[i:i + 900]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT text, vector FROM embeddings WHERE model = ? AND text IN ({placeholders})",
+                    [self.model_name] + batch
+                ).fetchall()
+                for text, blob in rows:
+                    found[text] = np.frombuffer(blob, dtype=np.float32)
+            conn.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE model = ? AND text = ?",
+                [(now, self.model_name, text) for text in found]
+            )
+        self.hits += len(found)
+        self.misses += len(texts) - len(found)
+        return found
+
+    def put_many(self, items):
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text, vector, last_used) VALUES (?, ?, ?, ?)",
+                [(self.model_name, text, np.asarray(vector, dtype=np.float32).tobytes(), now)
+                 for text, vector in items]
+            )
+        self.evict()
+
+    def evict(self):
+        with self._connect() as conn:
+            count = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            excess = count - self.max_entries
+            if excess > 0:
+                conn.execute(
+                    "DELETE FROM embeddings WHERE rowid IN "
+                    "(SELECT rowid FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                    (excess,)
+                )
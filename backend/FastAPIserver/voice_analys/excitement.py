@@ -0,0 +1,138 @@
+import json
+import numpy as np
+from .Whisper import SAMPLE_RATE, load_audio_from_ffmpeg
+
+
+class ExcitementDetector:
+    """كشف لحظات الإثارة من الصوت مباشرة (هدير الجمهور وارتفاع صوت/نبرة المعلق) بدون ASR.
+    الخصائص لكل إطار: طاقة RMS، التدفق الطيفي (spectral flux)، وحدة الصوت (pitch) بالارتباط الذاتي،
+    وكلها محسوبة بـ STFT متجهي على دفعات حتى لا تستهلك المباراة الكاملة الذاكرة."""
+
+    def __init__(self, n_fft=1024, hop_ms=20, block_seconds=60, smooth_seconds=1.0, threshold=2.0,
+                 min_duration=1.0, min_gap=2.0, pad_seconds=1.0, pitch_range=(80.0, 500.0),
+                 voicing_threshold=0.4, weights=(0.5, 0.3, 0.2), label="excitement"):
+        self.n_fft = n_fft
+        self.hop_ms = hop_ms
+        self.block_seconds = block_seconds
+        self.smooth_seconds = smooth_seconds
+        self.threshold = threshold
+        self.min_duration = min_duration
+        self.min_gap = min_gap
+        self.pad_seconds = pad_seconds
+        self.pitch_range = pitch_range
+        self.voicing_threshold = voicing_threshold
+        self.weights = weights
+        self.label = label
+
+    def features(self, samples, sample_rate=SAMPLE_RATE):
+        """(rms_db, flux, pitch_hz) لكل إطار. pitch = 0 للإطارات غير المجهورة."""
+        hop = int(sample_rate * self.hop_ms / 1000)
+        n_frames = max(0, 1 + (len(samples) - self.n_fft) // hop)
+        rms_db = np.zeros(n_frames, dtype=np.float32)
+        flux = np.zeros(n_frames, dtype=np.float32)
+        pitch = np.zeros(n_frames, dtype=np.float32)
+        if n_frames == 0:
+            return rms_db, flux, pitch
+
+        window = np.hanning(self.n_fft).astype(np.float32)
+        min_lag = int(sample_rate / self.pitch_range[1])
+        max_lag = min(int(sample_rate / self.pitch_range[0]), self.n_fft - 1)
+        block_frames = max(1, int(self.block_seconds * 1000 / self.hop_ms))
+        prev_mag = None
+
+        for first in range(0, n_frames, block_frames):
+            last = min(n_frames, first + block_frames)
+            span = samples[first * hop:(last - 1) * hop + self.n_fft]
+            frames = np.lib.stride_tricks.sliding_window_view(span, self.n_fft)[::hop]
+
+            rms_db[first:last] = 20 * np.log10(np.sqrt(np.mean(frames ** 2, axis=1)) + 1e-10)
+
+            spectrum = np.fft.rfft(frames * window, axis=1)
+            mag = np.log1p(np.abs(spectrum))
+            diff = np.diff(mag, axis=0, prepend=mag[:1] if prev_mag is None else prev_mag[None, :])
+            flux[first:last] = np.maximum(diff, 0).sum(axis=1)
+            prev_mag = mag[-1]
+
+            # الارتباط الذاتي عبر FFT بحشو صفري (2×) ثم أعلى قمة ضمن مدى الصوت البشري
+            power = np.abs(np.fft.rfft(frames, n=2 * self.n_fft, axis=1)) ** 2
+            autocorr = np.fft.irfft(power, axis=1)[:, :max_lag + 1]
+            lags = autocorr[:, min_lag:] / (autocorr[:, :1] + 1e-10)
+            best = np.argmax(lags, axis=1)
+            voiced = lags[np.arange(len(lags)), best] > self.voicing_threshold
+            pitch[first:last] = np.where(voiced, sample_rate / (best + min_lag), 0.0)
+
+        return rms_db, flux, pitch
+
+    @staticmethod
+    def _robust_z(values, mask=None):
+        """z-score بالوسيط و MAD حتى لا تؤثر لحظات الإثارة نفسها على خط الأساس."""
+        ref = values if mask is None else values[mask]
+        if len(ref) == 0:
+            return np.zeros_like(values)
+        median = np.median(ref)
+        mad = np.median(np.abs(ref - median)) * 1.4826 + 1e-6
+        return (values - median) / mad
+
+    def excitement_curve(self, samples, sample_rate=SAMPLE_RATE):
+        """درجة إثارة مُنعّمة لكل إطار."""
+        rms_db, flux, pitch = self.features(samples, sample_rate)
+        if len(rms_db) == 0:
+            return rms_db
+        voiced = pitch > 0
+        z_pitch = np.where(voiced, self._robust_z(pitch, voiced), 0.0)
+        w_rms, w_flux, w_pitch = self.weights
+        score = w_rms * self._robust_z(rms_db) + w_flux * self._robust_z(np.log1p(flux)) + w_pitch * z_pitch
+
+        smooth = max(1, int(self.smooth_seconds * 1000 / self.hop_ms))
+        return np.convolve(score, np.ones(smooth) / smooth, mode="same")
+
+    def detect(self, samples, sample_rate=SAMPLE_RATE):
+        """لحظات الإثارة بنفس شكل important_moments.json: {label, text, start, end, score}."""
+        curve = self.excitement_curve(samples, sample_rate)
+        if len(curve) == 0:
+            return []
+        frame_seconds = self.hop_ms / 1000
+        active = curve > self.threshold
+        changes = np.flatnonzero(np.diff(np.concatenate(([0], active.astype(np.int8), [0]))))
+
+        runs = []
+        for start, end in zip(changes[::2], changes[1::2]):
+            if runs and (start - runs[-1][1]) * frame_seconds < self.min_gap:
+                runs[-1][1] = end
+            else:
+                runs.append([start, end])
+
+        duration = len(samples) / sample_rate
+        moments = []
+        for start, end in runs:
+            if (end - start) * frame_seconds < self.min_duration:
+                continue
+            moments.append({
+                "label": self.label,
+                "text": "",
+                "start": round(max(0.0, float(start) * frame_seconds - self.pad_seconds), 2),
+                "end": round(min(duration, float(end) * frame_seconds + self.pad_seconds), 2),
+                "score": round(float(curve[start:end].max()), 2)
+            })
+        return moments
+
+    @staticmethod
+    def transcription_windows(moments, before=20.0, after=10.0, duration=None):
+        """نوافذ (بداية، نهاية) بالثواني حول القمم لتقييد Whisper بها؛ المعلق يصف اللعبة قبل الهدف وبعده."""
+        windows = []
+        for m in sorted(moments, key=lambda m: m["start"]):
+            start = max(0.0, m["start"] - before)
+            end = m["end"] + after if duration is None else min(duration, m["end"] + after)
+            if windows and start <= windows[-1][1]:
+                windows[-1][1] = max(windows[-1][1], end)
+            else:
+                windows.append([start, end])
+        return [(s, e) for s, e in windows]
+
+    def process(self, video_path, output_path="excitement_moments.json"):
+        print("📣 تحليل إثارة الصوت (الطاقة، التدفق الطيفي، النبرة)...")
+        moments = self.detect(load_audio_from_ffmpeg(video_path))
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(moments, f, ensure_ascii=False, indent=2)
+        print(f"✅ {len(moments)} لحظة إثارة محفوظة في: {output_path}")
+        return moments
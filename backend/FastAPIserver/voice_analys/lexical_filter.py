@@ -0,0 +1,99 @@
+import re
+
+# توحيد أشكال الحروف العربية الشائعة في التفريغ
+_NORMALIZE_MAP = str.maketrans({"أ": "ا", "إ": "ا", "آ": "ا", "ة": "ه", "ى": "ي", "ؤ": "و", "ئ": "ي"})
+_DIACRITICS = re.compile(r"[ً-ْـ]")  # التشكيل والتطويل
+_PREFIXES = ("وال", "بال", "فال", "كال", "لل", "ال", "و", "ف", "ب", "ل")
+# "ا" الأخيرة: ألف تنوين النصب بعد حذف التشكيل (هدفاً ← هدفا ← هدف)
+_SUFFIXES = ("ها", "هم", "ات", "ون", "ين", "ان", "ه", "ي", "ا")
+
+
+def normalize_token(token):
+    token = _DIACRITICS.sub("", token).translate(_NORMALIZE_MAP)
+    return re.sub(r"(.)\1{2,}", r"\1", token).lower()
+
+
+def light_stem(token):
+    """تجذيع خفيف: إزالة أداة التعريف وحروف العطف وبعض اللواحق (ومنها ألف النصب) مع إبقاء حرفين على الأقل."""
+    for prefix in _PREFIXES:
+        if token.startswith(prefix) and len(token) - len(prefix) >= 2:
+            token = token[len(prefix):]
+            break
+    for suffix in _SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 2:
+            token = token[:-len(suffix)]
+            break
+    return token
+
+
+def char_ngrams(token, n=3):
+    padded = f"#{token}#"
+    if len(padded) <= n:
+        return {padded}
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+class LexicalPrefilter:
+    """فلتر معجمي سريع قبل التصنيف الدلالي: المقاطع التي لا تشترك لفظياً مع أي عبارة مرجعية لا تُمثّل أصلاً.
+    min_similarity هو هامش الأمان للاسترجاع: تشابه حروف ثلاثية (Jaccard) بين كلمة المقطع وأي كلمة مرجعية.
+    كلما قلّ زاد عدد المقاطع التي تمر (1.0 = تطابق الجذع فقط، 0 = تعطيل الفلتر)."""
+
+    def __init__(self, reference_phrases, min_similarity=0.5, ngram=3):
+        self.min_similarity = min_similarity
+        self.ngram = ngram
+        self.stems = set()
+        self.gram_index = {}  # حرف ثلاثي → الجذوع المرجعية التي تحتويه
+        self.stem_grams = {}
+        self.checked = 0
+        self.skipped = 0
+        self._token_cache = {}
+
+        for phrases in reference_phrases.values():
+            for phrase in phrases:
+                for token in phrase.split():
+                    normalized = normalize_token(token)
+                    for stem in {normalized, light_stem(normalized)}:
+                        self._index_stem(stem)
+
+    def _index_stem(self, stem):
+        if not stem or stem in self.stems:
+            return
+        self.stems.add(stem)
+        grams = char_ngrams(stem, self.ngram)
+        self.stem_grams[stem] = grams
+        for gram in grams:
+            self.gram_index.setdefault(gram, set()).add(stem)
+
+    def token_matches(self, token):
+        if token in self._token_cache:
+            return self._token_cache[token]
+
+        normalized = normalize_token(token)
+        stem = light_stem(normalized)
+        matched = normalized in self.stems or stem in self.stems
+        if not matched and self.min_similarity < 1.0:
+            grams = char_ngrams(stem, self.ngram)
+            candidates = set()
+            for gram in grams:
+                candidates |= self.gram_index.get(gram, set())
+            for candidate in candidates:
+                ref_grams = self.stem_grams[candidate]
+                similarity = len(grams & ref_grams) / len(grams | ref_grams)
+                if similarity >= self.min_similarity:
+                    matched = True
+                    break
+
+        self._token_cache[token] = matched
+        return matched
+
+    def keep(self, text):
+        if self.min_similarity <= 0:
+            return True
+        return any(self.token_matches(token) for token in text.split())
+
+    def filter_indexes(self, texts):
+        """أرقام النصوص التي يجب تمريرها للتصنيف الدلالي."""
+        kept = [i for i, text in enumerate(texts) if self.keep(text)]
+        self.checked += len(texts)
+        self.skipped += len(texts) - len(kept)
+        return kept
@@ -0,0 +1,105 @@
+import os
+import numpy as np
+
+
+class OnnxSentenceEncoder:
+    """بديل أخف لـ SentenceTransformer على المعالج: تصدير النموذج إلى ONNX مع تكميم INT8 ديناميكي.
+    التصدير يتم مرة واحدة ويُخزن في export_dir، ويمكن تحديد عدد الأنوية المستخدمة."""
+
+    def __init__(self, model_name, export_dir, num_threads=None, quantize=True, max_seq_length=128):
+        self.model_name = model_name
+        self.export_dir = os.path.join(export_dir, model_name.replace("/", "__"))
+        self.num_threads = num_threads
+        self.quantize = quantize
+        self.max_seq_length = max_seq_length
+        self.fp32_path = os.path.join(self.export_dir, "model.onnx")
+        self.int8_path = os.path.join(self.export_dir, "model_int8.onnx")
+        self.tokenizer_dir = os.path.join(self.export_dir, "tokenizer")
+
+        if not os.path.exists(self.model_path):
+            self.export()
+        self._load()
+
+    @property
+    def model_path(self):
+        return self.int8_path if self.quantize else self.fp32_path
+
+    def export(self):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        print(f"📤 تصدير {self.model_name} إلى ONNX...")
+        os.makedirs(self.export_dir, exist_ok=True)
+        st_model = SentenceTransformer(self.model_name, device="cpu")
+        transformer = st_model[0].auto_model.eval()
+        tokenizer = st_model.tokenizer
+        tokenizer.save_pretrained(self.tokenizer_dir)
+
+        dummy = tokenizer(["هدف رائع"], return_tensors="pt", padding=True)
+        with torch.no_grad():
+            torch.onnx.export(
+                transformer,
+                (dummy["input_ids"], dummy["attention_mask"]),
+                self.fp32_path,
+                input_names=["input_ids", "attention_mask"],
+                output_names=["last_hidden_state"],
+                dynamic_axes={
+                    "input_ids": {0: "batch", 1: "sequence"},
+                    "attention_mask": {0: "batch", 1: "sequence"},
+                    "last_hidden_state": {0: "batch", 1: "sequence"},
+                },
+                opset_version=14,
+            )
+
+        if self.quantize:
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+            print("🗜️ تكميم النموذج إلى INT8...")
+            quantize_dynamic(self.fp32_path, self.int8_path, weight_type=QuantType.QInt8)
+        print(f"✅ تم حفظ النموذج في: {self.model_path}")
+
+    def _load(self):
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise ImportError("❌ مكتبة onnxruntime غير مثبتة: pip install onnxruntime")
+        from transformers import AutoTokenizer
+
+        options = ort.SessionOptions()
+        if self.num_threads:
+            options.intra_op_num_threads = self.num_threads
+            options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(self.model_path, options, providers=["CPUExecutionProvider"])
+        self.tokenizer = AutoTokenizer.from_pretrained(self.tokenizer_dir)
+
+    def encode(self, texts, batch_size=256, normalize_embeddings=True, show_progress_bar=False, **kwargs):
+        """نفس شكل SentenceTransformer.encode (مع convert_to_numpy): تمثيل mean pooling لكل نص."""
+        if isinstance(texts, str):
+            texts = [texts]
+        # ترتيب حسب الطول يقلل الحشو داخل كل دفعة، ثم نعيد الترتيب الأصلي
+        order = np.argsort([len(text) for text in texts])
+        outputs = [None] * len(texts)
+
+        for i in range(0, len(texts), batch_size):
+            batch_idx = order[i:i + batch_size]
+            batch = self.tokenizer(
+                [texts[j] for j in batch_idx],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np",
+            )
+            input_ids = batch["input_ids"].astype(np.int64)
+            attention_mask = batch["attention_mask"].astype(np.int64)
+            hidden = self.session.run(None, {"input_ids": input_ids, "attention_mask": attention_mask})[0]
+
+            mask = attention_mask[..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            if normalize_embeddings:
+                pooled = pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            for j, vector in zip(batch_idx, pooled):
+                outputs[j] = vector
+
+        if not outputs:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.stack(outputs).astype(np.float32)
@@ -0,0 +1,131 @@
+import os
+import time
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+from .vad import EnergyVAD
+from .Whisper import SAMPLE_RATE, WhisperTranscriber, load_audio_from_ffmpeg
+
+_worker_model = None
+
+
+def _init_worker(backend, model_size, threads_per_worker):
+    """كل عملية تحمل نموذج Whisper الخاص بها مرة واحدة."""
+    global _worker_model
+    from .asr_backends import get_backend
+    _worker_model = get_backend(backend, model_size, device="cpu", threads=threads_per_worker)
+
+
+def _detect_language(samples):
+    return _worker_model.detect_language(samples)
+
+
+def _transcribe_chunk(args):
+    index, offset, samples, language = args
+    result = _worker_model.transcribe(samples, language=language)
+    words = []
+    for segment in result["segments"]:
+        for word_info in segment.get("words", []):
+            words.append({
+                "word": word_info["word"].strip(),
+                "start": round(word_info["start"] + offset, 2),
+                "end": round(word_info["end"] + offset, 2)
+            })
+    return index, words, result["text"]
+
+
+class ParallelWhisperTranscriber:
+    """تفريغ على المعالج بعدة عمليات: تقسيم الصوت عند الصمت (VAD) وتوزيع مقاطع الكلام على العمليات،
+    ثم إعادة تجميع الكلمات بأزمنتها الصحيحة في نفس شكل transcription.json."""
+
+    def __init__(self, model_size="medium", num_workers=None, threads_per_worker=2, vad=None, language=None,
+                 backend="openai", keep_pool=False):
+        self.model_size = model_size
+        # keep_pool: إبقاء العمليات ونماذجها محملة بين المباريات (وضع الدفعات)
+        self.keep_pool = keep_pool
+        self._pool = None
+        self.backend = backend
+        self.threads_per_worker = threads_per_worker
+        self.num_workers = num_workers or max(1, (os.cpu_count() or 1) // threads_per_worker)
+        self.vad = vad or EnergyVAD()
+        # None: تُكشف مرة واحدة على أول 30 ثانية كلام ثم تُمرر لكل المقاطع
+        self.language = language
+        self.stats = {}
+
+    def transcribe_samples(self, samples, regions=None):
+        t0 = time.time()
+        if regions is None:
+            chunks = self.vad.chunks(samples, SAMPLE_RATE)
+        else:
+            # VAD داخل كل نافذة فقط (مثلاً نوافذ الإثارة) ثم إزاحة المقاطع لمكانها في المباراة
+            chunks = []
+            for start, end in regions:
+                first = int(start * SAMPLE_RATE)
+                for s, e in self.vad.chunks(samples[first:int(end * SAMPLE_RATE)], SAMPLE_RATE):
+                    chunks.append((first + s, first + e))
+        audio_seconds = len(samples) / SAMPLE_RATE
+        speech_seconds = sum(e - s for s, e in chunks) / SAMPLE_RATE
+        print(f"🔇 VAD: {len(chunks)} مقطع كلام، {speech_seconds:.0f}ث من أصل {audio_seconds:.0f}ث")
+
+        results = [None] * len(chunks)
+        pool = self._get_pool()
+        try:
+            language = self.language
+            if language is None and chunks:
+                language = pool.submit(_detect_language, self.language_probe(samples, chunks)).result()
+                print(f"🌐 اللغة المكتشفة: {language}")
+            jobs = [(i, s / SAMPLE_RATE, samples[s:e], language) for i, (s, e) in enumerate(chunks)]
+            for index, words, text in pool.map(_transcribe_chunk, jobs):
+                results[index] = (words, text)
+        finally:
+            if not self.keep_pool:
+                self.close()
+
+        words_data = [word for words, _ in results for word in words]
+        words_data.sort(key=lambda w: w["start"])
+        full_text = " ".join(text.strip() for _, text in results)
+
+        elapsed = time.time() - t0
+        self.stats = {
+            "workers": self.num_workers,
+            "threads_per_worker": self.threads_per_worker,
+            "chunks": len(chunks),
+            "audio_seconds": audio_seconds,
+            "speech_seconds": speech_seconds,
+            "elapsed_seconds": elapsed,
+            "realtime_factor": audio_seconds / elapsed if elapsed else 0.0,
+        }
+        print(f"⏱️ التفريغ: {elapsed:.1f}ث بـ {self.num_workers} عمليات ({self.stats['realtime_factor']:.2f}x الزمن الحقيقي)")
+        return words_data, full_text
+
+    @staticmethod
+    def language_probe(samples, chunks, seconds=30.0):
+        """أول 30 ثانية من الكلام الفعلي (مقاطع VAD متتالية) لكشف اللغة، بدل مقطع واحد قصير."""
+        limit = int(seconds * SAMPLE_RATE)
+        parts, total = [], 0
+        for s, e in chunks:
+            parts.append(samples[s:min(e, s + limit - total)])
+            total += len(parts[-1])
+            if total >= limit:
+                break
+        return np.concatenate(parts)
+
+    def _get_pool(self):
+        if self._pool is None:
+            # spawn حتى لا ترث العمليات حالة torch/CUDA من العملية الأم
+            ctx = multiprocessing.get_context("spawn")
+            self._pool = ProcessPoolExecutor(max_workers=self.num_workers, mp_context=ctx, initializer=_init_worker,
+                                             initargs=(self.backend, self.model_size, self.threads_per_worker))
+        return self._pool
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def transcribe_video(self, video_path, json_path="transcription.json", regions=None):
+        print("🎞️ استخراج الصوت من الفيديو (pipe)...")
+        words_data, full_text = self.transcribe_samples(load_audio_from_ffmpeg(video_path), regions)
+        WhisperTranscriber.save_words(words_data, json_path)
+        return full_text
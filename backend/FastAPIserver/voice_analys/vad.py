@@ -0,0 +1,80 @@
+import numpy as np
+
+
+class EnergyVAD:
+    """تقسيم الصوت إلى مقاطع كلام عند فترات الصمت بالاعتماد على طاقة الإطارات (بدون نموذج).
+    العتبة تكيفية: أرضية الضجيج (نسبة مئوية منخفضة من الطاقة) + هامش بالديسيبل."""
+
+    def __init__(self, frame_ms=30, margin_db=10.0, noise_percentile=10, min_silence_ms=500,
+                 min_speech_ms=250, pad_ms=200, max_chunk_seconds=30.0):
+        self.frame_ms = frame_ms
+        self.margin_db = margin_db
+        self.noise_percentile = noise_percentile
+        self.min_silence_ms = min_silence_ms
+        self.min_speech_ms = min_speech_ms
+        self.pad_ms = pad_ms
+        self.max_chunk_seconds = max_chunk_seconds  # نافذة Whisper 30 ثانية
+
+    def frame_energy_db(self, samples, sample_rate):
+        frame_len = int(sample_rate * self.frame_ms / 1000)
+        n_frames = len(samples) // frame_len
+        if n_frames == 0:
+            return np.zeros(0), frame_len
+        frames = samples[:n_frames * frame_len].reshape(n_frames, frame_len)
+        rms = np.sqrt(np.mean(frames.astype(np.float64) ** 2, axis=1))
+        return 20 * np.log10(rms + 1e-10), frame_len
+
+    def speech_regions(self, samples, sample_rate, energy=None):
+        """مناطق الكلام كأزواج (بداية، نهاية) بالعينات. energy: ناتج frame_energy_db إن كان محسوباً."""
+        energy_db, frame_len = energy or self.frame_energy_db(samples, sample_rate)
+        if len(energy_db) == 0:
+            return []
+
+        threshold = np.percentile(energy_db, self.noise_percentile) + self.margin_db
+        active = energy_db > threshold
+
+        # إغلاق فجوات الصمت القصيرة ثم حذف النبضات القصيرة
+        min_silence = max(1, self.min_silence_ms // self.frame_ms)
+        min_speech = max(1, self.min_speech_ms // self.frame_ms)
+        changes = np.flatnonzero(np.diff(np.concatenate(([0], active.astype(np.int8), [0]))))
+        runs = list(zip(changes[::2], changes[1::2]))  # [start, end) بالإطارات
+
+        merged = []
+        for start, end in runs:
+            if merged and start - merged[-1][1] < min_silence:
+                merged[-1][1] = end
+            else:
+                merged.append([start, end])
+        merged = [(s, e) for s, e in merged if e - s >= min_speech]
+
+        pad = int(sample_rate * self.pad_ms / 1000)
+        return [
+            (max(0, s * frame_len - pad), min(len(samples), e * frame_len + pad))
+            for s, e in merged
+        ]
+
+    @staticmethod
+    def split_point(energy_db, frame_len, start, max_len):
+        """أهدأ إطار في النصف الثاني من النافذة المسموحة: القطع عند توقف قصير بدل منتصف كلمة."""
+        lo = (start + max_len // 2) // frame_len + 1
+        hi = min((start + max_len) // frame_len, len(energy_db))
+        if hi <= lo:
+            return start + max_len
+        return (lo + int(np.argmin(energy_db[lo:hi]))) * frame_len
+
+    def chunks(self, samples, sample_rate):
+        """تجميع مناطق الكلام المتتالية في مقاطع لا تتجاوز max_chunk_seconds، مع تقسيم المناطق الأطول
+        عند أقل نقطة طاقة."""
+        max_len = int(self.max_chunk_seconds * sample_rate)
+        energy_db, frame_len = energy = self.frame_energy_db(samples, sample_rate)
+        chunks = []
+        for start, end in self.speech_regions(samples, sample_rate, energy):
+            while end - start > max_len:
+                cut = self.split_point(energy_db, frame_len, start, max_len)
+                chunks.append([start, cut])
+                start = cut
+            if chunks and end - chunks[-1][0] <= max_len:
+                chunks[-1][1] = max(chunks[-1][1], end)
+            else:
+                chunks.append([start, end])
+        return [(s, e) for s, e in chunks]
@@ -0,0 +1 @@
+from .job_workspace import JobWorkspace
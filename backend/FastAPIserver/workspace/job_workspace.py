@@ -0,0 +1,68 @@
+import os
+import shutil
+import uuid
+import hashlib
+
+
+class JobWorkspace:
+    """مجلد عمل مستقل لكل مهمة تلخيص حتى لا تتداخل ملفات المباريات المتزامنة."""
+
+    def __init__(self, root_dir="jobs", job_id=None, keep=False):
+        self.job_id = job_id or uuid.uuid4().hex[:12]
+        self.root_dir = os.path.abspath(root_dir)
+        self.path = os.path.join(self.root_dir, self.job_id)
+        self.keep = keep  # إذا True لا نحذف المجلد بعد الانتهاء (للتصحيح)
+
+        self.frames_dir = os.path.join(self.path, "output_frame")
+        self.coarse_frames_dir = os.path.join(self.path, "coarse_frames")
+        self.stubs_dir = os.path.join(self.path, "stubs")
+        self.detection_file = os.path.join(self.stubs_dir, "detection_file")
+        self.coarse_detection_file = os.path.join(self.stubs_dir, "coarse_detection_file")
+        self.ball_detection_file = os.path.join(self.stubs_dir, "ball_detection_file")
+        self.ball_roi_report_json = os.path.join(self.path, "ball_roi_report.json")
+        self.sampling_plan_json = os.path.join(self.path, "sampling_plan.json")
+        self.tracks_file = os.path.join(self.stubs_dir, "tracks_file")
+        self.tracks_inter_ball_file = os.path.join(self.stubs_dir, "tracks_file_inter_ball")
+        self.important_frames_json = os.path.join(self.path, "important_frames.json")
+        self.transcription_json = os.path.join(self.path, "transcription.json")
+        self.important_moments_json = os.path.join(self.path, "important_moments.json")
+        self.excitement_json = os.path.join(self.path, "excitement_moments.json")
+        self.merged_moments_json = os.path.join(self.path, "merged_moments.json")
+        self.early_moments_json = os.path.join(self.path, "early_moments.json")
+        self.clips_dir = os.path.join(self.path, "temp_clips")
+        self.early_clips_dir = os.path.join(self.path, "temp_clips_early")
+        self.shards_dir = os.path.join(self.path, "shards")
+
+    @classmethod
+    def for_video(cls, root_dir, video_path, keep=False):
+        """معرّف ثابت مشتق من الفيديو حتى تستأنف المحاولة التالية من نفس المجلد."""
+        video_path = os.path.abspath(video_path)
+        key = f"{video_path}:{os.path.getsize(video_path)}"
+        job_id = hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+        return cls(root_dir, job_id=job_id, keep=keep)
+
+    def create(self):
+        os.makedirs(self.frames_dir, exist_ok=True)
+        os.makedirs(self.stubs_dir, exist_ok=True)
+        os.makedirs(self.clips_dir, exist_ok=True)
+        return self
+
+    def file(self, name):
+        """مسار ملف إضافي داخل مجلد المهمة."""
+        return os.path.join(self.path, name)
+
+    def cleanup(self):
+        if os.path.isdir(self.path):
+            shutil.rmtree(self.path, ignore_errors=True)
+            print(f"🧹 تم حذف مجلد المهمة: {self.path}")
+
+    def __enter__(self):
+        return self.create()
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            # نحتفظ بالمجلد عند الفشل حتى تستأنف المحاولة التالية من آخر مرحلة مكتملة
+            print(f"⚠️ تم الاحتفاظ بمجلد المهمة للاستئناف: {self.path}")
+        elif not self.keep:
+            self.cleanup()
+        return False
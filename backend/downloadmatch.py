@@ -47,9 +47,13 @@ def download_video(url, resolution='bestvideo[height>=720]+bestaudio/best[height
             except yt_dlp.utils.DownloadError:
                 return {'success': False, 'error': '❌ Unsupported site'}
 
+            downloads = info_dict.get('requested_downloads') or [{}]
+            filepath = downloads[0].get('filepath') or ydl.prepare_filename(info_dict)
+
             return {
                 'success': True,
                 'title': info_dict.get('title'),
+                'filepath': filepath,
                 'resolution': info_dict.get('height'),
                 'vcodec': info_dict.get('vcodec')
             }